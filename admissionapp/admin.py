@@ -7,6 +7,7 @@ from .models import (
     Application,
     UserContact,
     PaymentDetail,
+    ExportJob,
 )
 
 # Register your models here.
@@ -89,4 +90,20 @@ class PaymentDetailAdmin(admin.ModelAdmin):
         'status',
         'is_payment_completed',
         'payment_date',
-    ] 
\ No newline at end of file
+    ] 
+
+
+#ExportJob
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = [
+        'export',
+        'export_format',
+        'status',
+        'rows_written',
+        'rows_total',
+        'created_by',
+        'created_at',
+        'expires_at',
+    ]
+    list_filter = ['status', 'export']
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class AdmissionappConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "admissionapp"
+
+    def ready(self):
+        from . import document_storage, documents, images, renditions, signals
+
+        signals.connect()
+        document_storage.connect()
+        images.connect()
+        documents.connect()
+        renditions.connect()
@@ -0,0 +1,293 @@
+# admissionapp/callback_replay.py
+"""
+Payment callback replay harness.
+
+Builds realistic ``esewa_success`` / ``khalti_return`` callback requests
+(either synthesized or re-keyed from a recording), fires them at a running
+server with a fixed concurrency and collects latency, error and DB lock
+statistics. The gateways' server-to-server verification calls are answered
+by FakeGateway so the numbers only reflect this application.
+
+Used by the ``bench_payment_callbacks`` management command.
+"""
+import base64
+import http.client
+import json
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from django.conf import settings
+from django.db import OperationalError
+
+from .payments.esewa import esewa_signature
+
+
+ESEWA_SUCCESS_PATH = "/pay/payment/esewa/success/"
+KHALTI_RETURN_PATH = "/pay/khalti/return/"
+
+
+# -----------------------------
+# Payload synthesis
+# -----------------------------
+def esewa_callback_query(transaction_uuid, total_amount, product_code=None):
+    """Query string eSewa appends to success_url: ?data=<base64 JSON>."""
+    product_code = product_code or settings.ESEWA_PRODUCT_CODE
+    payload = {
+        "transaction_code": uuid.uuid4().hex[:7].upper(),
+        "status": "COMPLETE",
+        "total_amount": total_amount,
+        "transaction_uuid": transaction_uuid,
+        "product_code": product_code,
+        "signed_field_names": "transaction_code,status,total_amount,"
+        "transaction_uuid,product_code,signed_field_names",
+    }
+    payload["signature"] = esewa_signature(
+        settings.ESEWA_SECRET_KEY,
+        total_amount=total_amount,
+        transaction_uuid=transaction_uuid,
+        product_code=product_code,
+    )
+    data = base64.b64encode(json.dumps(payload).encode()).decode()
+    return urlencode({"data": data})
+
+
+def khalti_callback_query(pidx, application_id, amount_paisa):
+    """Query string Khalti appends to return_url after checkout."""
+    txn_id = uuid.uuid4().hex[:22]
+    return urlencode(
+        {
+            "pidx": pidx,
+            "transaction_id": txn_id,
+            "tidx": txn_id,
+            "amount": amount_paisa,
+            "total_amount": amount_paisa,
+            "mobile": "98XXXXX904",
+            "status": "Completed",
+            "purchase_order_id": f"APP-{application_id}-{uuid.uuid4().hex[:6]}",
+            "purchase_order_name": "BENCH",
+        }
+    )
+
+
+def rekey_recorded(entry, transaction_id, application_id, amount):
+    """
+    Re-target a recorded callback at a seeded payment, keeping every other
+    field (and therefore the payload size/shape) as it was captured.
+    """
+    params = dict(parse_qsl(entry["query"], keep_blank_values=True))
+    if entry["gateway"] == "esewa":
+        payload = json.loads(base64.b64decode(params["data"]))
+        payload["transaction_uuid"] = transaction_id
+        payload["total_amount"] = amount
+        params["data"] = base64.b64encode(json.dumps(payload).encode()).decode()
+    else:
+        params["pidx"] = transaction_id
+        params["purchase_order_id"] = f"APP-{application_id}-{uuid.uuid4().hex[:6]}"
+        params.pop("merchant_application_id", None)
+    return urlencode(params)
+
+
+def read_recording(path):
+    with open(path) as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def write_recording(path, entries):
+    with open(path, "w") as fh:
+        for entry in entries:
+            fh.write(json.dumps(entry) + "\n")
+
+
+# -----------------------------
+# Fake gateway
+# -----------------------------
+class _FakeResponse:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self._data = data
+        self.content = json.dumps(data).encode()
+
+    def json(self):
+        return self._data
+
+
+class FakeGateway:
+    """
+    Stands in for ``requests.get`` (eSewa status check) and ``requests.post``
+    (Khalti lookup). Every transaction is reported as complete for the
+    amount it was registered with; ``error_rate`` of calls return HTTP 500.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.khalti_amounts = {}
+
+    def _should_fail(self):
+        return self.error_rate and random.random() < self.error_rate
+
+    def get(self, url, *args, **kwargs):
+        time.sleep(self.latency)
+        if self._should_fail():
+            return _FakeResponse(500, {"error": "fake gateway failure"})
+        params = dict(parse_qsl(urlsplit(url).query))
+        return _FakeResponse(
+            200,
+            {
+                "product_code": params.get("product_code"),
+                "transaction_uuid": params.get("transaction_uuid"),
+                "total_amount": params.get("total_amount"),
+                "status": "COMPLETE",
+                "ref_id": uuid.uuid4().hex[:7].upper(),
+            },
+        )
+
+    def post(self, url, json=None, *args, **kwargs):
+        time.sleep(self.latency)
+        if self._should_fail():
+            return _FakeResponse(500, {"error": "fake gateway failure"})
+        pidx = (json or {}).get("pidx")
+        return _FakeResponse(
+            200,
+            {
+                "pidx": pidx,
+                "total_amount": self.khalti_amounts.get(pidx, 5000),
+                "status": "Completed",
+                "transaction_id": uuid.uuid4().hex[:22],
+                "fee": 0,
+                "refunded": False,
+            },
+        )
+
+
+# -----------------------------
+# DB lock statistics
+# -----------------------------
+class LockStats:
+    """
+    Django execute wrapper that times lock-taking statements (writes and
+    SELECT ... FOR UPDATE). On SQLite the wait for the database write lock
+    happens inside the first write of a transaction; on PostgreSQL/MySQL the
+    row-lock wait happens inside SELECT ... FOR UPDATE. Their duration is
+    therefore an upper bound on the time spent waiting for locks.
+    """
+
+    LOCKING_PREFIXES = ("INSERT", "UPDATE", "DELETE")
+
+    def __init__(self):
+        self.durations = []
+        self.lock_errors = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        statement = sql.lstrip().upper()
+        if not (statement.startswith(self.LOCKING_PREFIXES) or "FOR UPDATE" in statement):
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as e:
+            if "locked" in str(e) or "deadlock" in str(e).lower():
+                with self._lock:
+                    self.lock_errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.durations.append(elapsed)
+
+    def install(self, sender, connection, **kwargs):
+        """connection_created receiver: wrap every new DB connection."""
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+# -----------------------------
+# Replay
+# -----------------------------
+class CallbackResult:
+    __slots__ = ("gateway", "status", "latency", "error")
+
+    def __init__(self, gateway, status, latency, error=None):
+        self.gateway = gateway
+        self.status = status
+        self.latency = latency
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None and self.status is not None and self.status < 400
+
+
+def _fire(host, port, request, timeout):
+    path = f"{request['path']}?{request['query']}"
+    headers = {}
+    if request.get("session_key"):
+        headers["Cookie"] = f"{settings.SESSION_COOKIE_NAME}={request['session_key']}"
+    started = time.perf_counter()
+    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        conn.request("GET", path, headers=headers)
+        resp = conn.getresponse()
+        resp.read()
+        return CallbackResult(request["gateway"], resp.status, time.perf_counter() - started)
+    except (OSError, http.client.HTTPException) as e:
+        return CallbackResult(request["gateway"], None, time.perf_counter() - started, str(e))
+    finally:
+        conn.close()
+
+
+def replay(requests_, host, port, concurrency=8, timeout=30):
+    """Fire every request with ``concurrency`` in flight; returns (results, wall time)."""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda r: _fire(host, port, r, timeout), requests_))
+    return results, time.perf_counter() - started
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(results, wall_time, lock_stats=None):
+    latencies = sorted(r.latency for r in results)
+    errors = [r for r in results if not r.ok]
+    summary = {
+        "requests": len(results),
+        "wall_time": wall_time,
+        "throughput": len(results) / wall_time if wall_time else 0.0,
+        "error_rate": len(errors) / len(results) if results else 0.0,
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "max": latencies[-1] if latencies else 0.0,
+    }
+    if lock_stats is not None:
+        waits = sorted(lock_stats.durations)
+        summary.update(
+            {
+                "lock_statements": len(waits),
+                "lock_wait_total": sum(waits),
+                "lock_wait_p95": percentile(waits, 95),
+                "lock_wait_max": waits[-1] if waits else 0.0,
+                "lock_errors": lock_stats.lock_errors,
+            }
+        )
+    return summary
+
+
+def amount_str(value):
+    return f"{Decimal(value):.2f}"
@@ -0,0 +1,275 @@
+# admissionapp/chunked_uploads.py
+"""
+Resumable chunked uploads for large documents (tus-like).
+
+    POST   uploads/                    create: filename + Upload-Length
+    HEAD   uploads/<id>/               current Upload-Offset (resume point)
+    PATCH  uploads/<id>/               one chunk at Upload-Offset
+    POST   uploads/<id>/finalize/      assemble + validate
+    DELETE uploads/<id>/               abandon
+
+Each chunk is streamed from the request into its own part file under
+CHUNKED_UPLOAD_DIR/<id>/ and only counted once it is complete, so a dropped
+connection loses at most the chunk in flight: the client asks for the
+offset and carries on from there. The offset is advanced with a conditional
+UPDATE, so two retries of the same chunk cannot both be accepted.
+
+finalize_upload() claims the upload (UPLOADING -> ASSEMBLING, again a
+conditional UPDATE) and concatenates the parts into one file. Forms then
+attach it by sending ``<field>_upload=<id>`` instead of the file itself;
+AssembledUpload exposes temporary_file_path(), so FileSystemStorage moves
+it into MEDIA_ROOT instead of copying it. Abandoned uploads are removed by
+``python manage.py purge_chunked_uploads``.
+"""
+import glob
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (
+    MAX_UPLOAD_SIZE,
+    ChunkedUpload,
+    validate_file_content,
+    validate_file_extensions,
+)
+
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+class ChunkedUploadError(Exception):
+    """A request the upload endpoints answer with ``status``."""
+
+    status = 400
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        if status is not None:
+            self.status = status
+
+
+class OffsetMismatch(ChunkedUploadError):
+    status = 409
+
+    def __init__(self, offset):
+        super().__init__(f"Upload-Offset must be {offset}.")
+        self.offset = offset
+
+
+class AssembledUpload(File):
+    """A finalized upload; storage moves it via temporary_file_path()."""
+
+    def __init__(self, upload):
+        super().__init__(open(assembled_path(upload), "rb"), name=upload.filename)
+        self.content_type = upload.content_type or None
+        self.upload = upload
+
+    def temporary_file_path(self):
+        return assembled_path(self.upload)
+
+
+def upload_dir(upload):
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, str(upload.pk))
+
+
+def assembled_path(upload):
+    return os.path.join(upload_dir(upload), "assembled")
+
+
+def _part_paths(upload):
+    return sorted(glob.glob(os.path.join(upload_dir(upload), "*.part")))
+
+
+def create_upload(user, filename, size, content_type=""):
+    filename = os.path.basename(filename or "").strip()
+    if not filename:
+        raise ChunkedUploadError("A filename is required.")
+    if size is None or size <= 0:
+        raise ChunkedUploadError("Upload-Length must be a positive integer.")
+    if size > MAX_UPLOAD_SIZE:
+        raise ChunkedUploadError("File size must be equal or less than 100 MB.", 413)
+    try:
+        validate_file_extensions(File(None, name=filename))
+    except ValidationError as e:
+        raise ChunkedUploadError(" ".join(e.messages), 415)
+
+    upload = ChunkedUpload.objects.create(
+        user=user,
+        filename=filename,
+        size=size,
+        # Client-declared, like UploadedFile.content_type; only a fallback
+        # for validate_file_content when python-magic is unavailable.
+        content_type=(content_type or "")[:100],
+    )
+    os.makedirs(upload_dir(upload), exist_ok=True)
+    return upload
+
+
+def append_chunk(upload, offset, stream, length):
+    """
+    Stream ``length`` bytes from ``stream`` into a part file at ``offset``.
+    The chunk only counts (advances upload.offset) once all of it arrived.
+    """
+    if upload.status != ChunkedUpload.UPLOADING:
+        raise ChunkedUploadError("This upload is already finalized.", 409)
+    if offset != upload.offset:
+        raise OffsetMismatch(upload.offset)
+    if length <= 0 or length > settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+        raise ChunkedUploadError(
+            f"Chunks must be 1 to {settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE} bytes.", 413
+        )
+    if offset + length > upload.size:
+        raise ChunkedUploadError("Chunk goes past Upload-Length.", 413)
+
+    directory = upload_dir(upload)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while written < length:
+                data = stream.read(min(STREAM_BLOCK_SIZE, length - written))
+                if not data:
+                    break
+                out.write(data)
+                written += len(data)
+    except OSError:  # client went away mid-chunk (UnreadablePostError)
+        written = -1
+    if written != length:
+        os.unlink(tmp)
+        raise ChunkedUploadError("Connection closed before the chunk was complete.")
+
+    # Unique per attempt: a losing duplicate must not remove the winner's part.
+    part = os.path.join(directory, f"{offset:012d}-{uuid.uuid4().hex[:8]}.part")
+    os.replace(tmp, part)
+    advanced = ChunkedUpload.objects.filter(
+        pk=upload.pk, offset=offset, status=ChunkedUpload.UPLOADING
+    ).update(offset=F("offset") + length, updated_at=timezone.now())
+    if not advanced:
+        os.unlink(part)
+        upload.refresh_from_db(fields=["offset"])
+        raise OffsetMismatch(upload.offset)
+    upload.offset = offset + length
+    return upload.offset
+
+
+def finalize_upload(upload):
+    """Concatenate the parts into one file and validate it like a form upload."""
+    if upload.status == ChunkedUpload.COMPLETE:
+        return upload
+    if upload.offset != upload.size:
+        raise ChunkedUploadError(
+            f"Upload is incomplete ({upload.offset} of {upload.size} bytes).", 409
+        )
+    # Claim it: of two concurrent finalize requests only one assembles.
+    claimed = ChunkedUpload.objects.filter(
+        pk=upload.pk, status=ChunkedUpload.UPLOADING, offset=upload.size
+    ).update(status=ChunkedUpload.ASSEMBLING, updated_at=timezone.now())
+    if not claimed:
+        upload.refresh_from_db(fields=["status", "offset"])
+        if upload.status == ChunkedUpload.COMPLETE:
+            return upload
+        raise ChunkedUploadError("This upload is being finalized.", 409)
+    upload.status = ChunkedUpload.ASSEMBLING
+
+    directory = upload_dir(upload)
+    try:
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as out:
+            for part in _part_paths(upload):
+                with open(part, "rb") as src:
+                    shutil.copyfileobj(src, out, 1024 * 1024)
+    except OSError:
+        # Let a retry assemble it again.
+        ChunkedUpload.objects.filter(pk=upload.pk, status=ChunkedUpload.ASSEMBLING).update(
+            status=ChunkedUpload.UPLOADING
+        )
+        raise
+    if os.path.getsize(tmp) != upload.size:
+        # Parts went missing: no retry can fix it, the client starts over.
+        discard_upload(upload)
+        raise ChunkedUploadError("Assembled file does not match Upload-Length.", 409)
+    os.replace(tmp, assembled_path(upload))
+    for part in _part_paths(upload):
+        os.unlink(part)
+
+    with AssembledUpload(upload) as assembled:
+        try:
+            validate_file_content(assembled)
+        except ValidationError as e:
+            discard_upload(upload)
+            raise ChunkedUploadError(" ".join(e.messages), 415)
+
+    ChunkedUpload.objects.filter(pk=upload.pk, status=ChunkedUpload.ASSEMBLING).update(
+        status=ChunkedUpload.COMPLETE, updated_at=timezone.now()
+    )
+    upload.status = ChunkedUpload.COMPLETE
+    return upload
+
+
+def discard_upload(upload):
+    shutil.rmtree(upload_dir(upload), ignore_errors=True)
+    if upload.pk:
+        ChunkedUpload.objects.filter(pk=upload.pk).delete()
+
+
+def attach_uploads(request, fields):
+    """
+    request.FILES plus, for every ``field`` posted as ``<field>_upload``,
+    the finished chunked upload of this user with that id. Pass the result
+    to forms/models like request.FILES, then call release_uploads() on it
+    once the instance is saved.
+    """
+    files = request.FILES.copy()
+    ids = {}
+    for field in fields:
+        upload_id = request.POST.get(f"{field}_upload")
+        if upload_id and field not in files:
+            ids[field] = upload_id
+    if not ids:
+        return files
+
+    try:
+        uploads = ChunkedUpload.objects.in_bulk(
+            [uuid.UUID(value) for value in ids.values()]
+        )
+    except ValueError:
+        raise ChunkedUploadError("Unknown upload.")
+    for field, upload_id in ids.items():
+        upload = uploads.get(uuid.UUID(upload_id))
+        if (
+            upload is None
+            or upload.user_id != request.user.pk
+            or upload.status != ChunkedUpload.COMPLETE
+            or not os.path.exists(assembled_path(upload))
+        ):
+            raise ChunkedUploadError(f"{field}: the uploaded file is no longer available.")
+        files[field] = AssembledUpload(upload)
+    return files
+
+
+def release_uploads(files):
+    """Close and forget the chunked uploads attached by attach_uploads()."""
+    for field in files:
+        for f in files.getlist(field):
+            if isinstance(f, AssembledUpload):
+                f.close()
+                discard_upload(f.upload)
+
+
+def purge_stale_uploads(hours=None):
+    """Delete uploads untouched for CHUNKED_UPLOAD_TTL_HOURS; returns the count."""
+    hours = settings.CHUNKED_UPLOAD_TTL_HOURS if hours is None else hours
+    cutoff = timezone.now() - timedelta(hours=hours)
+    stale = list(ChunkedUpload.objects.filter(updated_at__lt=cutoff))
+    for upload in stale:
+        discard_upload(upload)
+    return len(stale)
@@ -0,0 +1,293 @@
+# admissionapp/columnar.py
+"""
+Columnar (Parquet / Arrow IPC) exports for analytics.
+
+Each ColumnarDataset lists the model lookups to project and the Arrow type
+of each column. Rows come straight from a ``values_list`` iterator and are
+transposed into one RecordBatch per chunk, so memory stays bounded by the
+batch size whatever the table size. Low-cardinality text columns (statuses,
+course names, ...) are dictionary-encoded against a dictionary read once
+up front with ``SELECT DISTINCT``, so every batch shares the same
+dictionary and the Arrow IPC file format accepts it. The dictionaries and
+the rows are read in one transaction, which is a single snapshot on
+SQLite; where it is not (READ COMMITTED), a value written in between
+stops the export with ColumnarDataChanged instead of a KeyError.
+
+pyarrow is optional; ``pyarrow_available()`` reports whether it is
+installed and the writers raise ColumnarUnavailable when it is not.
+"""
+import itertools
+import tempfile
+
+from django.apps import apps
+from django.db import transaction
+from django.http import FileResponse
+
+from .exports import APPLICATION_FILTERS, EXPORT_CHUNK_SIZE, iter_values
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.ipc as ipc  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    pa = ipc = pq = None
+
+
+COLUMNAR_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+class ColumnarUnavailable(RuntimeError):
+    pass
+
+
+class ColumnarDataChanged(RuntimeError):
+    """A dictionary column got a value the export's dictionary lacks."""
+
+
+def pyarrow_available():
+    return pa is not None
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ColumnarUnavailable(
+            "Parquet/Arrow exports need pyarrow (pip install pyarrow)."
+        )
+
+
+# Arrow types by short name, resolved lazily because pyarrow is optional.
+def _arrow_type(kind):
+    return {
+        "int": pa.int64,
+        "float": pa.float64,
+        "bool": pa.bool_,
+        "string": pa.string,
+        "date": pa.date32,
+        "timestamp": lambda: pa.timestamp("us", tz="UTC"),
+        "decimal": lambda: pa.decimal128(10, 2),
+    }[kind]()
+
+
+# -----------------------------
+# Dataset specs
+# -----------------------------
+class ArrowColumn:
+    """
+    One output column read from the model lookup ``field``. ``dictionary``
+    columns are written as dictionary<int32, string>.
+    """
+
+    def __init__(self, name, field, kind="string", dictionary=False):
+        self.name = name
+        self.field = field
+        self.kind = kind
+        self.dictionary = dictionary
+
+    def arrow_type(self):
+        if self.dictionary:
+            return pa.dictionary(pa.int32(), pa.string())
+        return _arrow_type(self.kind)
+
+
+class ColumnarDataset:
+    def __init__(self, name, model, columns, filters=(), order_by=("pk",)):
+        self.name = name
+        self.model = model
+        self.columns = columns
+        self.filters = filters
+        self.order_by = order_by
+
+    @property
+    def fields(self):
+        return [c.field for c in self.columns]
+
+    def queryset(self, params=None):
+        qs = apps.get_model(self.model).objects.all()
+        for spec in self.filters:
+            qs = spec.apply(qs, params or {})
+        return qs.order_by(*self.order_by)
+
+    def schema(self):
+        return pa.schema([pa.field(c.name, c.arrow_type()) for c in self.columns])
+
+    def filename(self, extension):
+        return f"{self.name}.{extension}"
+
+    def _dictionaries(self, qs):
+        """value -> index maps and dictionary arrays for the dictionary columns."""
+        dictionaries = {}
+        for idx, column in enumerate(self.columns):
+            if not column.dictionary:
+                continue
+            values = sorted(
+                v
+                for v in qs.order_by()
+                .values_list(column.field, flat=True)
+                .distinct()
+                if v is not None
+            )
+            dictionaries[idx] = (
+                {v: i for i, v in enumerate(values)},
+                pa.array(values, type=pa.string()),
+            )
+        return dictionaries
+
+    def record_batches(self, params=None, batch_size=EXPORT_CHUNK_SIZE):
+        """Yield one RecordBatch per ``batch_size`` rows of the projection."""
+        _require_pyarrow()
+        qs = self.queryset(params)
+        schema = self.schema()
+        with transaction.atomic(using=qs.db):
+            dictionaries = self._dictionaries(qs)
+            rows = iter_values(qs, self.fields, chunk_size=batch_size)
+            while True:
+                chunk = list(itertools.islice(rows, batch_size))
+                if not chunk:
+                    return
+                arrays = []
+                for idx, values in enumerate(zip(*chunk)):
+                    if idx in dictionaries:
+                        index, dictionary = dictionaries[idx]
+                        indices = pa.array(
+                            [self._dictionary_index(idx, index, v) for v in values],
+                            type=pa.int32(),
+                        )
+                        arrays.append(pa.DictionaryArray.from_arrays(indices, dictionary))
+                    else:
+                        arrays.append(pa.array(values, type=schema.field(idx).type))
+                yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    def _dictionary_index(self, idx, index, value):
+        if value is None:
+            return None
+        try:
+            return index[value]
+        except KeyError:
+            raise ColumnarDataChanged(
+                f"{self.name}.{self.columns[idx].name}: {value!r} was written while "
+                "the export was running; run it again."
+            ) from None
+
+
+COLUMNAR_DATASETS = {
+    "applications": ColumnarDataset(
+        "applications",
+        "admissionapp.Application",
+        [
+            ArrowColumn("id", "pk", "int"),
+            ArrowColumn("application_no", "application_no"),
+            ArrowColumn("user_id", "user_id", "int"),
+            ArrowColumn("username", "user__username"),
+            ArrowColumn("course_id", "course_id", "int"),
+            ArrowColumn("course", "course__course_name", dictionary=True),
+            ArrowColumn("degree", "course__degree", dictionary=True),
+            ArrowColumn("status", "application_status", dictionary=True),
+            ArrowColumn("submitted_at", "submitted_at", "timestamp"),
+            ArrowColumn("decided_at", "approved_rejected_date", "timestamp"),
+            ArrowColumn("is_paid", "is_paid", "bool"),
+        ],
+        filters=APPLICATION_FILTERS,
+    ),
+    "courses": ColumnarDataset(
+        "courses",
+        "admissionapp.CourseDetails",
+        [
+            ArrowColumn("id", "pk", "int"),
+            ArrowColumn("course", "course_name", dictionary=True),
+            ArrowColumn("course_full_name", "course_full_name"),
+            ArrowColumn("course_code", "course_code"),
+            ArrowColumn("degree", "degree", dictionary=True),
+            ArrowColumn("duration", "course_duration", dictionary=True),
+            ArrowColumn("total_seats", "total_seats", "int"),
+            ArrowColumn("seats_filled", "seats_filled", "int"),
+            ArrowColumn("course_fee", "course_fee", "decimal"),
+            ArrowColumn("added_at", "course_add_date", "timestamp"),
+        ],
+    ),
+    "educational_info": ColumnarDataset(
+        "educational_info",
+        "admissionapp.EducationalInfo",
+        [
+            ArrowColumn("id", "pk", "int"),
+            ArrowColumn("user_id", "user_id", "int"),
+            ArrowColumn("username", "user__username"),
+            ArrowColumn("level", "level", dictionary=True),
+            ArrowColumn("faculty", "faculty", dictionary=True),
+            ArrowColumn("course", "course_name", dictionary=True),
+            ArrowColumn("university", "university_name", dictionary=True),
+            ArrowColumn("college", "college_name"),
+            ArrowColumn("passed_year", "passed_year", "int"),
+            ArrowColumn("grade_percent", "grade_percent", "float"),
+            ArrowColumn("created_at", "created_at", "timestamp"),
+        ],
+    ),
+    "payments": ColumnarDataset(
+        "payments",
+        "admissionapp.PaymentDetail",
+        [
+            ArrowColumn("id", "pk", "int"),
+            ArrowColumn("application_id", "application_id", "int"),
+            ArrowColumn("application_no", "application__application_no"),
+            ArrowColumn("user_id", "user_id", "int"),
+            ArrowColumn("amount_paid", "amount_paid", "decimal"),
+            ArrowColumn("status", "status", dictionary=True),
+            ArrowColumn("payment_method", "payment_method", dictionary=True),
+            ArrowColumn("is_payment_completed", "is_payment_completed", "bool"),
+            ArrowColumn("transaction_uuid", "transaction_uuid"),
+            ArrowColumn("transaction_reference", "transaction_reference"),
+            ArrowColumn("payment_date", "payment_date", "timestamp"),
+        ],
+    ),
+}
+
+
+# -----------------------------
+# Writers
+# -----------------------------
+def write_parquet(fileobj, dataset, params=None, batch_size=EXPORT_CHUNK_SIZE):
+    """Write ``dataset`` as Parquet (one row group per batch); returns rows written."""
+    _require_pyarrow()
+    rows = 0
+    with pq.ParquetWriter(fileobj, dataset.schema(), compression="zstd") as writer:
+        for batch in dataset.record_batches(params, batch_size=batch_size):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def write_arrow(fileobj, dataset, params=None, batch_size=EXPORT_CHUNK_SIZE):
+    """Write ``dataset`` as an Arrow IPC file (Feather v2); returns rows written."""
+    _require_pyarrow()
+    rows = 0
+    with ipc.new_file(fileobj, dataset.schema()) as writer:
+        for batch in dataset.record_batches(params, batch_size=batch_size):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+class ColumnarFormat:
+    def __init__(self, extension, content_type, write):
+        self.extension = extension
+        self.content_type = content_type
+        self.write = write
+
+
+COLUMNAR_FORMATS = {
+    "parquet": ColumnarFormat("parquet", "application/vnd.apache.parquet", write_parquet),
+    "arrow": ColumnarFormat("arrow", "application/vnd.apache.arrow.file", write_arrow),
+}
+
+
+def columnar_file_response(dataset, fmt, params=None):
+    """Build the file in a spooled temp file and stream it with FileResponse."""
+    output = COLUMNAR_FORMATS[fmt]
+    spool = tempfile.SpooledTemporaryFile(max_size=COLUMNAR_SPOOL_MAX_SIZE)
+    output.write(spool, dataset, params)
+    spool.seek(0)
+    return FileResponse(
+        spool,
+        as_attachment=True,
+        filename=dataset.filename(output.extension),
+        content_type=output.content_type,
+    )
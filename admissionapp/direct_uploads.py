@@ -0,0 +1,252 @@
+# admissionapp/direct_uploads.py
+"""
+Browser-to-bucket uploads of student documents (optional).
+
+With DIRECT_UPLOADS on, citizenship and educational documents can be
+uploaded into storages["documents"] (an S3-compatible bucket). Their
+bytes never pass through a Django worker:
+
+    POST direct-uploads/            field, filename, size, content_type
+                                    -> presigned POST (url, fields) + token
+    (browser)                       POST the file straight to the bucket,
+                                    under incoming/<user id>/<uuid><ext>
+    POST direct-uploads/complete/   token
+                                    -> HEAD + a 2 KB ranged GET, validated
+                                       like a form upload; a new token
+
+The form then sends ``<field>_direct=<token>`` instead of the file.
+attach_direct_uploads() server-side copies the object to
+direct/<user id>/<uuid><ext> and hands the form a FieldFile that is
+already stored, so saving the record uploads nothing. The fields'
+DocumentStorage resolves direct/ names in the bucket and everything
+else locally; protected_media redirects owners to a presigned GET
+(download_url) that expires after DIRECT_DOWNLOAD_EXPIRES.
+
+Tokens are signed (django.core.signing) and bound to the user. A bucket
+lifecycle rule expiring incoming/ after a day removes uploads that were
+abandoned or failed validation.
+
+boto3 and django-storages are only needed when DIRECT_UPLOADS is on.
+"""
+import os
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile, File
+from django.db.models.fields.files import FieldFile
+
+from .chunked_uploads import ChunkedUploadError
+from .document_storage import BUCKET_PREFIX
+from .models import (
+    EDUCATIONAL_FILE_FIELDS,
+    MAX_UPLOAD_SIZE,
+    sniff_mime_type,
+    validate_file_content,
+    validate_file_extensions,
+    validate_file_size,
+)
+
+try:
+    import boto3  # type: ignore
+    from botocore.exceptions import ClientError  # type: ignore
+except ImportError:  # optional: only needed with DIRECT_UPLOADS
+    boto3 = None
+    ClientError = OSError
+
+
+DIRECT_UPLOAD_FIELDS = frozenset(
+    ["ctz_file"] + [field for field, _ in EDUCATIONAL_FILE_FIELDS]
+)
+INCOMING_PREFIX = "incoming"
+STORED_PREFIX = BUCKET_PREFIX
+SNIFF_BYTES = 2048
+
+_SALT = "admissionapp.direct_uploads"
+_client = None
+
+
+class DirectUploadError(ChunkedUploadError):
+    """A direct-upload request the endpoints answer with ``status``."""
+
+
+class DirectUploadFieldFile(FieldFile):
+    """
+    A document already in the bucket, validated by complete_upload(). The
+    size and MIME type come from the signed token, so validators don't go
+    back to the bucket for them.
+    """
+
+    def __init__(self, field, name, size, sniffed_content_type):
+        super().__init__(None, field, name)
+        self._direct_size = size
+        self.sniffed_content_type = sniffed_content_type
+
+    @property
+    def size(self):
+        return self._direct_size
+
+
+def direct_uploads_enabled():
+    return bool(settings.DIRECT_UPLOADS) and "documents" in settings.STORAGES
+
+
+def _options():
+    return settings.STORAGES["documents"].get("OPTIONS", {})
+
+
+def _bucket():
+    return _options()["bucket_name"]
+
+
+def _s3():
+    global _client
+    if boto3 is None:
+        raise DirectUploadError("Direct uploads need boto3.", 503)
+    if _client is None:
+        options = _options()
+        _client = boto3.client(
+            "s3",
+            endpoint_url=options.get("endpoint_url"),
+            region_name=options.get("region_name"),
+            aws_access_key_id=options.get("access_key"),
+            aws_secret_access_key=options.get("secret_key"),
+        )
+    return _client
+
+
+def _token(stage, user, **data):
+    return signing.dumps(dict(data, stage=stage, user=user.pk), salt=_SALT)
+
+
+def _load_token(token, stage, user):
+    try:
+        data = signing.loads(
+            token or "", salt=_SALT, max_age=settings.DIRECT_UPLOAD_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:  # includes SignatureExpired
+        raise DirectUploadError("Unknown or expired upload.", 404)
+    if data.get("stage") != stage or data.get("user") != user.pk:
+        raise DirectUploadError("Unknown or expired upload.", 404)
+    return data
+
+
+def presign_upload(user, field, filename, size, content_type=""):
+    """
+    A presigned POST letting the browser upload exactly ``size`` bytes of
+    ``filename`` for ``field``: {"url", "fields", "token"}.
+    """
+    if field not in DIRECT_UPLOAD_FIELDS:
+        raise DirectUploadError("This field does not take direct uploads.")
+    filename = os.path.basename(filename or "").strip()
+    if not filename:
+        raise DirectUploadError("A filename is required.")
+    if size is None or size <= 0:
+        raise DirectUploadError("size must be a positive integer.")
+    if size > MAX_UPLOAD_SIZE:
+        raise DirectUploadError("File size must be equal or less than 100 MB.", 413)
+    try:
+        validate_file_extensions(File(None, name=filename))
+    except ValidationError as e:
+        raise DirectUploadError(" ".join(e.messages), 415)
+
+    ext = os.path.splitext(filename)[1].lower()
+    key = f"{INCOMING_PREFIX}/{user.pk}/{uuid.uuid4().hex}{ext}"
+    content_type = (content_type or "application/octet-stream")[:100]
+    post = _s3().generate_presigned_post(
+        Bucket=_bucket(),
+        Key=key,
+        Fields={"Content-Type": content_type},
+        Conditions=[
+            {"Content-Type": content_type},
+            # The bucket refuses anything but the announced size.
+            ["content-length-range", size, size],
+        ],
+        ExpiresIn=settings.DIRECT_UPLOAD_EXPIRES,
+    )
+    return {
+        "url": post["url"],
+        "fields": post["fields"],
+        "token": _token("pending", user, key=key, field=field, filename=filename),
+    }
+
+
+def complete_upload(user, token):
+    """
+    Validate an uploaded object from its size and first SNIFF_BYTES, like
+    validate_file_* do for a form upload. Returns {"token", "size"}; the
+    token goes into the form as ``<field>_direct``. Rejected objects are
+    deleted.
+    """
+    data = _load_token(token, "pending", user)
+    client, bucket, key = _s3(), _bucket(), data["key"]
+    try:
+        head = client.head_object(Bucket=bucket, Key=key)
+        first = client.get_object(
+            Bucket=bucket, Key=key, Range=f"bytes=0-{SNIFF_BYTES - 1}"
+        )["Body"].read()
+    except ClientError:
+        raise DirectUploadError("The file has not been uploaded.", 409)
+
+    probe = ContentFile(first, name=data["filename"])
+    probe.size = head["ContentLength"]
+    probe.content_type = head.get("ContentType")
+    probe.sniffed_content_type = sniff_mime_type(first)
+    try:
+        for validate in (validate_file_extensions, validate_file_size, validate_file_content):
+            validate(probe)
+    except ValidationError as e:
+        client.delete_object(Bucket=bucket, Key=key)
+        raise DirectUploadError(" ".join(e.messages), 415)
+
+    return {
+        "token": _token(
+            "complete",
+            user,
+            key=key,
+            field=data["field"],
+            size=probe.size,
+            mime=probe.sniffed_content_type or probe.content_type,
+        ),
+        "size": probe.size,
+    }
+
+
+def attach_direct_uploads(request, model, files):
+    """
+    ``files`` (request.FILES or attach_uploads() output) plus, for every
+    DIRECT_UPLOAD_FIELDS field of ``model`` posted as ``<field>_direct``,
+    the completed direct upload, moved out of incoming/ by a server-side
+    copy.
+    """
+    for field_name in DIRECT_UPLOAD_FIELDS:
+        token = request.POST.get(f"{field_name}_direct")
+        if not token or field_name in files:
+            continue
+        data = _load_token(token, "complete", request.user)
+        if data["field"] != field_name:
+            raise DirectUploadError(f"{field_name}: the upload belongs to another field.")
+        field = model._meta.get_field(field_name)
+        key = f"{STORED_PREFIX}/{request.user.pk}/{os.path.basename(data['key'])}"
+        try:
+            # Deterministic target: re-posting the same form copies again
+            # onto the same key instead of making another object.
+            _s3().copy_object(
+                Bucket=_bucket(),
+                Key=key,
+                CopySource={"Bucket": _bucket(), "Key": data["key"]},
+            )
+        except ClientError:
+            raise DirectUploadError(f"{field_name}: the uploaded file is no longer available.")
+        files[field_name] = DirectUploadFieldFile(field, key, data["size"], data["mime"])
+    return files
+
+
+def download_url(name):
+    """A presigned GET of the stored direct upload ``name``, valid briefly."""
+    return _s3().generate_presigned_url(
+        "get_object",
+        Params={"Bucket": _bucket(), "Key": name},
+        ExpiresIn=settings.DIRECT_DOWNLOAD_EXPIRES,
+    )
@@ -0,0 +1,165 @@
+# admissionapp/document_archive.py
+"""
+Streaming ZIP of applicant documents.
+
+The archive is produced while it is being downloaded: zipfile writes into
+a small in-memory sink that the response generator drains after every
+chunk, each file is copied from storage in DOCUMENT_CHUNK_SIZE pieces, and
+applicants are loaded in batches with values_list(). Memory stays flat no
+matter how many gigabytes of uploads the archive covers.
+
+Images and PDFs are already compressed, so entries are ZIP_STORED; only
+the occasional other file type is deflated.
+
+Layout:
+    <application_no>/profile_pic.jpg
+    <application_no>/citizenship.pdf
+    <application_no>/<level>/transcript1.pdf ...
+    MISSING.txt        files referenced in the database but not in storage
+"""
+import os
+import zipfile
+from datetime import datetime
+
+from django.core.files.storage import default_storage
+
+from .models import (
+    EDUCATIONAL_FILE_FIELDS,
+    PERSONAL_FILE_FIELDS,
+    Application,
+    EducationalInfo,
+    PersonalInfo,
+)
+
+
+DOCUMENT_CHUNK_SIZE = 256 * 1024
+APPLICANT_BATCH_SIZE = 200
+
+STORED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp", ".pdf"}
+
+
+
+class ZipSink:
+    """Write-only, unseekable buffer; zipfile falls back to data descriptors."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def write(self, data):
+        self._buffer += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def _zip_info(arcname):
+    ext = os.path.splitext(arcname)[1].lower()
+    info = zipfile.ZipInfo(arcname, date_time=datetime.now().timetuple()[:6])
+    info.compress_type = (
+        zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+    )
+    info.external_attr = 0o644 << 16
+    return info
+
+
+def applicant_documents(applications, batch_size=APPLICANT_BATCH_SIZE):
+    """
+    Yield (arcname, storage name, storage) for every uploaded document of
+    the ``applications`` queryset, grouped by application number.
+    """
+    rows = applications.order_by("application_no").values_list(
+        "application_no", "user_id"
+    )
+    personal_fields = [f for f, _ in PERSONAL_FILE_FIELDS]
+    edu_fields = [f for f, _ in EDUCATIONAL_FILE_FIELDS]
+
+    batch = []
+    for row in rows.iterator(chunk_size=batch_size):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield from _batch_documents(batch, personal_fields, edu_fields)
+            batch = []
+    if batch:
+        yield from _batch_documents(batch, personal_fields, edu_fields)
+
+
+def _batch_documents(batch, personal_fields, edu_fields):
+    user_ids = [user_id for _, user_id in batch]
+    personal = {
+        values[0]: values[1:]
+        for values in PersonalInfo.objects.filter(user_id__in=user_ids).values_list(
+            "user_id", *personal_fields
+        )
+    }
+    educational = {}
+    for values in (
+        EducationalInfo.objects.filter(user_id__in=user_ids)
+        .order_by("user_id", "level")
+        .values_list("user_id", "level", *edu_fields)
+    ):
+        educational.setdefault(values[0], []).append(values[1:])
+
+    # Documents may live in another storage than profile pictures
+    # (DIRECT_UPLOADS), so every entry carries its field's storage.
+    personal_storages = [PersonalInfo._meta.get_field(f).storage for f in personal_fields]
+    edu_storages = [EducationalInfo._meta.get_field(f).storage for f in edu_fields]
+
+    for application_no, user_id in batch:
+        for (_, label), name, storage in zip(
+            PERSONAL_FILE_FIELDS, personal.get(user_id, ()), personal_storages
+        ):
+            if name:
+                ext = os.path.splitext(name)[1].lower()
+                yield f"{application_no}/{label}{ext}", name, storage
+        for level, *names in educational.get(user_id, ()):
+            for (_, label), name, storage in zip(EDUCATIONAL_FILE_FIELDS, names, edu_storages):
+                if name:
+                    ext = os.path.splitext(name)[1].lower()
+                    yield f"{application_no}/{level}/{label}{ext}", name, storage
+
+
+def iter_zip(documents, storage=default_storage, chunk_size=DOCUMENT_CHUNK_SIZE):
+    """
+    Yield the bytes of a ZIP containing ``documents`` as it is built:
+    (arcname, name) pairs read from ``storage``, or (arcname, name, storage).
+    """
+    sink = ZipSink()
+    missing = []
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as zf:
+        for arcname, name, *source_storage in documents:
+            try:
+                source = (source_storage[0] if source_storage else storage).open(name, "rb")
+            except OSError:
+                missing.append(f"{arcname}\t{name}")
+                continue
+            with source, zf.open(_zip_info(arcname), "w", force_zip64=True) as dest:
+                for chunk in source.chunks(chunk_size):
+                    dest.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+        if missing:
+            zf.writestr(_zip_info("MISSING.txt"), "\n".join(missing) + "\n")
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def documents_archive_name(course=None, status=None):
+    parts = [course.course_code if course else "all", status or "applicants"]
+    return "_".join(parts) + "_documents.zip"
+
+
+def applications_for_archive(course_id=None, status=None):
+    qs = Application.objects.all()
+    if course_id:
+        qs = qs.filter(course_id=course_id)
+    if status:
+        qs = qs.filter(application_status=status)
+    return qs
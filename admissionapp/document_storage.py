@@ -0,0 +1,296 @@
+# admissionapp/document_storage.py
+"""
+Content-addressed storage for student documents.
+
+The citizenship and educational document fields store their files with
+ContentAddressedStorage: a file is named after the SHA-256 of its bytes,
+
+    documents/<aa>/<bb>/<sha256><ext>
+
+so a marksheet uploaded to several fields, by several students, or again
+on every edit is written to disk once. Every stored file has a
+DocumentBlob row whose ref_count is the number of model fields pointing
+at it. The signal handlers below keep that count up to date on save and
+delete. Nothing is deleted at save time. ``python manage.py gc_documents``
+later removes blobs that stayed unreferenced for DOCUMENT_GC_GRACE_HOURS,
+and ``--recount`` rebuilds the counts from the model fields.
+
+Files stored before this (uploads/<username>/..., citizenship/...) have
+no DocumentBlob and are never collected until ``relocate_media`` moves
+them into the store.
+
+Direct uploads (DIRECT_UPLOADS, see direct_uploads.py) are the one
+exception: they are stored in storages["documents"], an S3 bucket, under
+direct/... . DocumentStorage sends those names, and only those, to the
+bucket, so documents stored before the bucket was configured keep
+resolving locally. Bucket objects have no DocumentBlob either.
+"""
+import hashlib
+import os
+import tempfile
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+
+DOCUMENT_PREFIX = "documents"
+# Names under this prefix live in storages["documents"] (direct uploads).
+BUCKET_PREFIX = "direct"
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def _blobs():
+    return apps.get_model("admissionapp", "DocumentBlob").objects
+
+
+def content_sha256(content):
+    """Hex SHA-256 of a File; reuses the digest upload_handlers.py computed."""
+    digest = getattr(content, "sha256", None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks(HASH_BLOCK_SIZE):
+        hasher.update(chunk)
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return hasher.hexdigest()
+
+
+def blob_name(digest, filename):
+    ext = os.path.splitext(filename)[1].lower()
+    return f"{DOCUMENT_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage that ignores the name it is given (apart from the
+    extension) and stores each distinct content once, under its hash.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # _save() picks the final name; identical names mean identical bytes.
+        return name
+
+    def _save(self, name, content):
+        digest = content_sha256(content)
+        name = blob_name(digest, name)
+        now = timezone.now()
+
+        # Touch (or create) the blob row before looking at the file: a
+        # running gc_documents either already deleted both, or now skips it.
+        if not _blobs().filter(name=name).update(updated_at=now):
+            _blobs().get_or_create(
+                name=name, defaults={"sha256": digest, "size": content.size}
+            )
+        if self.exists(name):
+            return name
+
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        if hasattr(content, "temporary_file_path"):
+            try:
+                file_move_safe(content.temporary_file_path(), full_path)
+            except FileExistsError:  # same bytes stored concurrently
+                pass
+        else:
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as out:
+                for chunk in content.chunks():
+                    out.write(chunk)
+            os.replace(tmp, full_path)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        return name
+
+
+def is_bucket_name(name):
+    """Whether the document ``name`` is a direct upload, kept in the bucket."""
+    return bool(name) and name.startswith(BUCKET_PREFIX + "/")
+
+
+class DocumentStorage(ContentAddressedStorage):
+    """
+    ContentAddressedStorage that leaves BUCKET_PREFIX names to
+    storages["documents"] when it is configured. Those objects are only
+    ever written by direct_uploads.py, so saving never goes to the bucket.
+    """
+
+    def _bucket(self, name):
+        if is_bucket_name(name) and "documents" in settings.STORAGES:
+            return storages["documents"]
+        return None
+
+    def _open(self, name, mode="rb"):
+        bucket = self._bucket(name)
+        return bucket.open(name, mode) if bucket else super()._open(name, mode)
+
+    def path(self, name):
+        if self._bucket(name):
+            raise NotImplementedError("Direct uploads have no local path.")
+        return super().path(name)
+
+    def exists(self, name):
+        bucket = self._bucket(name)
+        return bucket.exists(name) if bucket else super().exists(name)
+
+    def delete(self, name):
+        bucket = self._bucket(name)
+        return bucket.delete(name) if bucket else super().delete(name)
+
+    def size(self, name):
+        bucket = self._bucket(name)
+        return bucket.size(name) if bucket else super().size(name)
+
+    def url(self, name):
+        bucket = self._bucket(name)
+        return bucket.url(name) if bucket else super().url(name)
+
+    def get_modified_time(self, name):
+        bucket = self._bucket(name)
+        return bucket.get_modified_time(name) if bucket else super().get_modified_time(name)
+
+
+def get_document_storage():
+    """Storage of the citizenship and educational document fields."""
+    return DocumentStorage()
+
+
+# -----------------------------
+# Reference counting
+# -----------------------------
+def document_fields(model):
+    """Attribute names of ``model``'s fields stored content-addressed."""
+    return [
+        field.attname
+        for field in model._meta.concrete_fields
+        if isinstance(getattr(field, "storage", None), ContentAddressedStorage)
+    ]
+
+
+def _names(values):
+    return Counter(name for name in values if name)
+
+
+def _adjust(counts, sign):
+    by_delta = {}
+    for name, count in counts.items():
+        by_delta.setdefault(sign * count, []).append(name)
+    for delta, names in by_delta.items():
+        _blobs().filter(name__in=names).update(
+            ref_count=F("ref_count") + delta, updated_at=timezone.now()
+        )
+
+
+def remember_documents(sender, instance, raw=False, update_fields=None, **kwargs):
+    fields = document_fields(sender)
+    if update_fields is not None:
+        fields = [f for f in fields if f in update_fields]
+    instance._stored_documents = None
+    if raw or not fields or instance._state.adding or instance.pk is None:
+        return
+    row = sender._default_manager.filter(pk=instance.pk).values_list(*fields).first()
+    instance._stored_documents = dict(zip(fields, row or ()))
+
+
+def count_saved_documents(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_stored_documents", None) or {}
+    fields = document_fields(sender)
+    if update_fields is not None:
+        fields = [f for f in fields if f in update_fields]
+    if not fields:
+        return
+    old = _names(previous.get(f) for f in fields)
+    new = _names(getattr(instance, f).name for f in fields)
+    _adjust(new - old, +1)
+    _adjust(old - new, -1)
+
+
+def count_deleted_documents(sender, instance, **kwargs):
+    _adjust(_names(getattr(instance, f).name for f in document_fields(sender)), -1)
+
+
+def recount_references():
+    """
+    Recompute every DocumentBlob.ref_count from the model fields (repairs
+    drift from queryset.update(), raw SQL, ...). Returns the number fixed.
+    """
+    counts = Counter()
+    for model in apps.get_app_config("admissionapp").get_models():
+        fields = document_fields(model)
+        if not fields:
+            continue
+        for row in model._default_manager.values_list(*fields).iterator(chunk_size=2000):
+            counts.update(name for name in row if name)
+
+    stale = []
+    with transaction.atomic():
+        for blob in _blobs().select_for_update().only("pk", "name", "ref_count"):
+            if blob.ref_count != counts.get(blob.name, 0):
+                blob.ref_count = counts.get(blob.name, 0)
+                stale.append(blob)
+        _blobs().bulk_update(stale, ["ref_count"], batch_size=500)
+    return len(stale)
+
+
+def discard_stored_file(storage, name):
+    """
+    Undo storing ``name`` after the save that stored it failed. A
+    content-addressed file is only deleted if no committed DocumentBlob
+    claims it, since other records may share it.
+    """
+    if isinstance(storage, ContentAddressedStorage) and _blobs().filter(name=name).exists():
+        return
+    storage.delete(name)
+
+
+def collect_garbage(grace_hours=None, dry_run=False, batch_size=500):
+    """
+    Delete blobs (file and row) unreferenced for ``grace_hours``.
+    Returns (files deleted, bytes reclaimed).
+    """
+    grace_hours = settings.DOCUMENT_GC_GRACE_HOURS if grace_hours is None else grace_hours
+    cutoff = timezone.now() - timedelta(hours=grace_hours)
+    storage = ContentAddressedStorage()
+    deleted = reclaimed = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                _blobs()
+                .select_for_update()
+                .filter(ref_count__lte=0, updated_at__lt=cutoff, pk__gt=last_pk)
+                .order_by("pk")[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            deleted += len(batch)
+            reclaimed += sum(blob.size for blob in batch)
+            if dry_run:
+                continue
+            for blob in batch:
+                storage.delete(blob.name)
+            _blobs().filter(pk__in=[blob.pk for blob in batch]).delete()
+    return deleted, reclaimed
+
+
+def connect():
+    for model_name in ("PersonalInfo", "EducationalInfo"):
+        model = apps.get_model("admissionapp", model_name)
+        uid = f"documents_{model._meta.model_name}"
+        pre_save.connect(remember_documents, sender=model, dispatch_uid=f"{uid}_pre")
+        post_save.connect(count_saved_documents, sender=model, dispatch_uid=f"{uid}_post")
+        post_delete.connect(count_deleted_documents, sender=model, dispatch_uid=f"{uid}_del")
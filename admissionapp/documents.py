@@ -0,0 +1,279 @@
+# admissionapp/documents.py
+"""
+Document rows for the files in PersonalInfo and EducationalInfo.
+
+Each stored file has a Document (models.py) recording its owner, kind,
+storage key, size, MIME type, SHA-256 and page count. Pages can then
+list and describe documents without loading the six EducationalInfo file
+columns or opening a single file.
+
+The file fields are authoritative: uploads, access checks
+(protected_media.owns_media) and garbage collection read them, and a
+Document is only an index derived from them. The rows follow the fields
+(see connect()):
+
+- pre_save describes every new upload while its bytes are still at hand
+  (the upload handlers have usually hashed and sniffed it already);
+- post_save creates, updates or deletes the rows of the fields that
+  changed;
+- deleting the record cascades to its rows.
+
+Writes that skip save() (queryset.update(), raw SQL, restores) leave the
+rows behind; ``python manage.py sync_documents`` (resync_documents())
+rebuilds them from the fields. Migration 0018 only created rows from the
+stored names; that command also describes those files. Page counts are
+read from the PDF page objects and stay empty when a PDF hides them in
+compressed object streams.
+"""
+import hashlib
+import mimetypes
+import re
+from collections import Counter
+
+from django.apps import apps
+from django.db.models.signals import post_save, pre_save
+
+from .document_storage import DOCUMENT_PREFIX, HASH_BLOCK_SIZE
+from .models import sniff_mime_type
+
+
+PDF_MIME = "application/pdf"
+
+_PAGE_OBJECT = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+_PAGE_OVERLAP = 64
+_BLOB_DIGEST = re.compile(
+    rf"^{DOCUMENT_PREFIX}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/([0-9a-f]{{64}})(\.\w+)?$"
+)
+
+
+def _digest_from_name(name):
+    # Content-addressed names are the digest (document_storage.blob_name).
+    match = _BLOB_DIGEST.match(name or "")
+    return match.group(1) if match else None
+
+
+class _PageCounter:
+    """Counts PDF page objects in a stream fed chunk by chunk."""
+
+    def __init__(self):
+        self.pages = 0
+        self._tail = b""
+
+    def feed(self, chunk, final=False):
+        window = self._tail + chunk
+        # A match ending at the very end may continue into the next chunk
+        # (e.g. "/Pages"), so it is counted from the next window instead.
+        last = len(window) if final else len(window) - 1
+        for match in _PAGE_OBJECT.finditer(window):
+            if len(self._tail) <= match.end() <= last:
+                self.pages += 1
+        self._tail = window[-_PAGE_OVERLAP:]
+
+
+def describe_file(file, name=""):
+    """
+    {"size", "mime", "sha256", "page_count"} of a File, read at most once.
+    Digests and sniffed types the upload handlers attached are reused.
+    """
+    name = name or getattr(file, "name", "") or ""
+    digest = getattr(file, "sha256", None) or _digest_from_name(name)
+    mime = getattr(file, "sniffed_content_type", None)
+    size = file.size
+
+    if not (digest and mime and mime != PDF_MIME):
+        hasher = None if digest else hashlib.sha256()
+        counter = _PageCounter()
+        if hasattr(file, "seek"):
+            file.seek(0)
+        first = True
+        for chunk in file.chunks(HASH_BLOCK_SIZE):
+            if first:
+                mime = mime or sniff_mime_type(chunk[:2048])
+                first = False
+                if digest and mime != PDF_MIME:
+                    break
+            if hasher:
+                hasher.update(chunk)
+            if mime == PDF_MIME:
+                counter.feed(chunk)
+        if hasattr(file, "seek"):
+            file.seek(0)
+        if hasher:
+            digest = hasher.hexdigest()
+        if mime == PDF_MIME:
+            counter.feed(b"", final=True)
+
+    mime = mime or mimetypes.guess_type(name)[0] or ""
+    if mime == PDF_MIME:
+        page_count = counter.pages or None
+    else:
+        page_count = 1 if mime.startswith("image/") else None
+    return {"size": size, "mime": mime, "sha256": digest or "", "page_count": page_count}
+
+
+def describe_stored(storage, name):
+    """describe_file() of a stored file; a best guess from the name if it is gone."""
+    try:
+        with storage.open(name) as file:
+            return describe_file(file, name)
+    except OSError:
+        return {
+            "size": 0,
+            "mime": mimetypes.guess_type(name)[0] or "",
+            "sha256": _digest_from_name(name) or "",
+            "page_count": None,
+        }
+
+
+# -----------------------------
+# Keeping the rows in step
+# -----------------------------
+def _document_model():
+    return apps.get_model("admissionapp", "Document")
+
+
+def document_kinds(model):
+    """(field name, kind) of the Document kinds stored on ``model``."""
+    fields = {f.name for f in model._meta.concrete_fields}
+    return [
+        (field, kind)
+        for kind, field in _document_model().FIELD_NAMES.items()
+        if field in fields
+    ]
+
+
+def _source_fk(model):
+    return "personal_info" if model._meta.model_name == "personalinfo" else "educational_info"
+
+
+def describe_uploads(sender, instance, raw=False, update_fields=None, **kwargs):
+    """pre_save: describe the files this save is about to store."""
+    described = {}
+    instance._described_documents = described
+    if raw:
+        return
+    for field, _ in document_kinds(sender):
+        if update_fields is not None and field not in update_fields:
+            continue
+        value = getattr(instance, field)
+        if not value:
+            continue
+        if not value._committed:
+            info = described[field] = describe_file(value.file, value.name)
+            # ContentAddressedStorage names the file after this digest.
+            value.file.sha256 = info["sha256"]
+        elif hasattr(value, "sniffed_content_type"):
+            # Direct upload: already in the bucket, checked by complete_upload().
+            described[field] = {
+                "size": value.size,
+                "mime": value.sniffed_content_type or "",
+                "sha256": "",
+                "page_count": None,
+            }
+
+
+def sync_documents(sender, instance, raw=False, update_fields=None, **kwargs):
+    """post_save: create, update or delete the Document rows of ``instance``."""
+    if raw:
+        return
+    described = getattr(instance, "_described_documents", None) or {}
+    instance._described_documents = None
+    kinds = [
+        (field, kind)
+        for field, kind in document_kinds(sender)
+        if update_fields is None or field in update_fields
+    ]
+    if not kinds:
+        return
+
+    Document = _document_model()
+    source = {_source_fk(sender): instance}
+    existing = {
+        doc.kind: doc
+        for doc in Document.objects.filter(**source, kind__in=[k for _, k in kinds])
+    }
+    removed = []
+    for field, kind in kinds:
+        value = getattr(instance, field)
+        doc = existing.get(kind)
+        if not value:
+            if doc:
+                removed.append(doc.pk)
+            continue
+        if doc and doc.storage_key == value.name and field not in described:
+            continue
+        info = described.get(field) or describe_stored(value.storage, value.name)
+        Document.objects.update_or_create(
+            **source,
+            kind=kind,
+            defaults=dict(info, owner_id=instance.user_id, storage_key=value.name),
+        )
+    if removed:
+        Document.objects.filter(pk__in=removed).delete()
+
+
+def connect():
+    # After images.connect(): normalize_images may replace the upload first.
+    for model_name in ("PersonalInfo", "EducationalInfo"):
+        model = apps.get_model("admissionapp", model_name)
+        uid = f"documents_rows_{model._meta.model_name}"
+        pre_save.connect(describe_uploads, sender=model, dispatch_uid=f"{uid}_pre")
+        post_save.connect(sync_documents, sender=model, dispatch_uid=f"{uid}_post")
+
+
+def _needs_description(doc):
+    # Rows created from a bare name (migration 0018) have no size or digest.
+    return not doc.size or not doc.sha256
+
+
+def resync_documents(batch_size=200):
+    """
+    Make the Document rows match the file fields of every PersonalInfo and
+    EducationalInfo: create missing rows, fix stale ones, delete rows of
+    emptied fields and describe rows that were never described. Returns a
+    Counter of "created", "updated", "deleted" and "missing" (rows left
+    undescribed because their file is gone).
+    """
+    Document = _document_model()
+    counts = Counter()
+    for model_name in ("PersonalInfo", "EducationalInfo"):
+        model = apps.get_model("admissionapp", model_name)
+        kinds = document_kinds(model)
+        fk = _source_fk(model)
+        pks = list(model._default_manager.order_by("pk").values_list("pk", flat=True))
+        for start in range(0, len(pks), batch_size):
+            batch = pks[start:start + batch_size]
+            existing = {
+                (getattr(doc, f"{fk}_id"), doc.kind): doc
+                for doc in Document.objects.filter(**{f"{fk}_id__in": batch})
+            }
+            instances = model._default_manager.filter(pk__in=batch).only(
+                "pk", "user_id", *(field for field, _ in kinds)
+            )
+            stale = []
+            for instance in instances:
+                for field, kind in kinds:
+                    value = getattr(instance, field)
+                    doc = existing.pop((instance.pk, kind), None)
+                    if not value:
+                        if doc:
+                            stale.append(doc.pk)
+                        continue
+                    if doc and doc.storage_key == value.name and doc.owner_id == instance.user_id:
+                        if not _needs_description(doc):
+                            continue
+                        if not value.storage.exists(value.name):
+                            counts["missing"] += 1  # nothing more to learn
+                            continue
+                    info = describe_stored(value.storage, value.name)
+                    _, created = Document.objects.update_or_create(
+                        **{fk: instance},
+                        kind=kind,
+                        defaults=dict(info, owner_id=instance.user_id, storage_key=value.name),
+                    )
+                    counts["created" if created else "updated"] += 1
+            # Rows of kinds the model no longer stores.
+            stale.extend(doc.pk for doc in existing.values())
+            if stale:
+                counts["deleted"] += Document.objects.filter(pk__in=stale).delete()[0]
+    return counts
@@ -0,0 +1,311 @@
+# admissionapp/dossier_pdf.py
+"""
+Applicant dossier PDF (ReportLab).
+
+render_dossier() works on the plain dict built by dossiers.load_dossiers()
+and never touches the ORM, so it can run in ProcessPoolExecutor workers
+started with "spawn". Keep this module free of Django model imports.
+
+Everything that does not depend on the applicant (the sample stylesheet,
+paragraph and table styles) is built once per process at import time.
+Profile pictures are embedded as a PROFILE_PIC_PIXELS JPEG instead of the
+original upload: the box is 1.5in wide, so anything above ~200 dpi only
+made the PDF bigger. With an ``image_cache_dir`` the downscaled copy is
+kept on disk, keyed by the source path, size and mtime, so re-rendering a
+dossier does not decode the photo again.
+"""
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+
+from PIL import Image as PILImage
+from PIL import ImageOps
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import (
+    Image,
+    Paragraph,
+    SimpleDocTemplate,
+    Spacer,
+    Table,
+    TableStyle,
+)
+
+
+PROFILE_PIC_PIXELS = 300  # 1.5in at 200 dpi
+PROFILE_PIC_QUALITY = 80
+
+
+def _label_table_style(label_background, font_size=10):
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor(label_background)),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), font_size),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 8),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+        ('TOPPADDING', (0, 0), (-1, -1), 6),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ])
+
+
+STYLES = getSampleStyleSheet()
+
+TITLE_STYLE = ParagraphStyle(
+    'Title',
+    parent=STYLES['Heading1'],
+    fontSize=20,
+    textColor=colors.HexColor('#1a1a1a'),
+    spaceAfter=20,
+    alignment=TA_CENTER,
+    fontName='Helvetica-Bold'
+)
+
+SECTION_STYLE = ParagraphStyle(
+    'Section',
+    parent=STYLES['Heading2'],
+    fontSize=14,
+    textColor=colors.white,
+    spaceAfter=12,
+    spaceBefore=12,
+    fontName='Helvetica-Bold',
+    backColor=colors.HexColor('#0d6efd')
+)
+
+INFO_TABLE_STYLE = _label_table_style('#f8f9fa')
+STATUS_TABLE_STYLE = _label_table_style('#fff3cd')
+PAYMENT_TABLE_STYLE = _label_table_style('#d4edda')
+
+PICTURE_ROW_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('ALIGN', (1, 0), (1, 0), 'CENTER'),
+])
+
+EDUCATION_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#d1ecf1')),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 4),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+])
+
+
+def _downscale_profile_pic(path):
+    """JPEG bytes of ``path`` fitted into PROFILE_PIC_PIXELS, EXIF-rotated."""
+    with PILImage.open(path) as im:
+        # Lets the JPEG decoder skip straight to a 1/2..1/8 scale.
+        im.draft("RGB", (PROFILE_PIC_PIXELS, PROFILE_PIC_PIXELS))
+        im = ImageOps.exif_transpose(im)
+        if im.mode in ("RGBA", "LA", "P"):
+            im = im.convert("RGBA")
+            flat = PILImage.new("RGB", im.size, "white")
+            flat.paste(im, mask=im.getchannel("A"))
+            im = flat
+        elif im.mode != "RGB":
+            im = im.convert("RGB")
+        im.thumbnail((PROFILE_PIC_PIXELS, PROFILE_PIC_PIXELS), PILImage.LANCZOS)
+        out = BytesIO()
+        im.save(out, "JPEG", quality=PROFILE_PIC_QUALITY, optimize=True)
+    return out.getvalue()
+
+
+def profile_pic_source(path, image_cache_dir=None):
+    """
+    Something ReportLab's Image() can embed for the profile picture at
+    ``path``: a cached rendition path, or an in-memory JPEG when there is no
+    cache directory. None when the picture is missing or unreadable.
+    """
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return None
+
+    cached = None
+    if image_cache_dir:
+        key = hashlib.sha256(
+            f"{os.path.abspath(path)}\0{stat.st_size}\0{stat.st_mtime_ns}\0"
+            f"{PROFILE_PIC_PIXELS}\0{PROFILE_PIC_QUALITY}".encode()
+        ).hexdigest()
+        cached = os.path.join(image_cache_dir, key[:2], f"{key}.jpg")
+        if os.path.exists(cached):
+            return cached
+
+    try:
+        data = _downscale_profile_pic(path)
+    except Exception:  # noqa: BLE001 - unreadable upload drops the picture, not the dossier
+        return None
+
+    if cached is None:
+        return BytesIO(data)
+    # Pool workers may build the same rendition at once; os.replace keeps
+    # readers from ever seeing a partial file.
+    os.makedirs(os.path.dirname(cached), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(cached), suffix=".tmp")
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, cached)
+    return cached
+
+
+def render_dossier(data, image_cache_dir=None, downscale_pictures=True):
+    """
+    Return the dossier PDF for one applicant as bytes. ``downscale_pictures``
+    False embeds the original upload (benchmark_dossier_pdf compares both).
+    """
+    app = data["application"]
+    per_info = data["personal"]
+    edu_info = data["educational"]
+    payment_info = data["payment"]
+
+    buffer = BytesIO()
+    pdf = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=40,
+        leftMargin=40,
+        topMargin=40,
+        bottomMargin=40
+    )
+
+    elements = []
+
+    # Title
+    elements.append(Paragraph("Course Applicant Detail", TITLE_STYLE))
+    elements.append(Spacer(1, 20))
+
+    # 1. Application Information Section
+    elements.append(Paragraph("Application Information", SECTION_STYLE))
+    app_data = [
+        ['Applicant:', app["applicant_name"]],
+        ['Email:', app["email"] or '—'],
+        ['Mobile No.:', app["mobile"] or '—'],
+        ['User Created at:', str(app["user_created_at"]) if app["user_created_at"] else '—'],
+        ['Submitted:', app["submitted_at"].strftime('%Y-%m-%d %H:%M:%S')],
+    ]
+    app_table = Table(app_data, colWidths=[2*inch, 4.5*inch])
+    app_table.setStyle(INFO_TABLE_STYLE)
+    elements.append(app_table)
+    elements.append(Spacer(1, 15))
+
+    # 2. Personal Information Section with Profile Picture
+    if per_info:
+        elements.append(Paragraph("Personal Information", SECTION_STYLE))
+
+        profile_pic = None
+        pic_path = per_info["profile_pic_path"]
+        if downscale_pictures:
+            pic_source = profile_pic_source(pic_path, image_cache_dir)
+        else:
+            pic_source = pic_path if pic_path and os.path.exists(pic_path) else None
+        if pic_source is not None:
+            profile_pic = Image(pic_source, width=1.5*inch, height=1.5*inch)
+
+        personal_data = [
+            ['Address:', per_info["address"] or '—'],
+            ['Gender:', per_info["gender"] or '—'],
+            ['Date of Birth:', per_info["dob"].strftime('%Y-%m-%d') if per_info["dob"] else '—'],
+            ['Father\'s Name:', per_info["father"] or '—'],
+            ['Mother\'s Name:', per_info["mother"] or '—'],
+            ['Grandfather\'s Name:', per_info["grandfather"] or '—'],
+            ['Citizenship No.:', per_info["citizenship_no"] or '—'],
+        ]
+
+        # If profile pic exists, add it to the right side
+        if profile_pic:
+            per_table = Table(personal_data, colWidths=[2*inch, 3*inch])
+            per_table.setStyle(INFO_TABLE_STYLE)
+            combined_table = Table([[per_table, profile_pic]], colWidths=[5*inch, 1.8*inch])
+            combined_table.setStyle(PICTURE_ROW_STYLE)
+            elements.append(combined_table)
+        else:
+            per_table = Table(personal_data, colWidths=[2*inch, 4.5*inch])
+            per_table.setStyle(INFO_TABLE_STYLE)
+            elements.append(per_table)
+
+        elements.append(Spacer(1, 15))
+
+    # 3. Educational Background Section
+    elements.append(Paragraph("Educational Background", SECTION_STYLE))
+
+    if edu_info:
+        edu_data = [['Level', 'Faculty', 'Course', 'University', 'College', 'Year', 'Grade/CGPA']]
+        for edu in edu_info:
+            edu_data.append([
+                edu["level"] or '—',
+                edu["faculty"] or '—',
+                edu["course_name"] or '—',
+                edu["university_name"] or '—',
+                edu["college_name"] or '—',
+                str(edu["passed_year"]) if edu["passed_year"] else '—',
+                str(edu["grade_percent"]) if edu["grade_percent"] else '—',
+            ])
+
+        edu_table = Table(edu_data, colWidths=[0.9*inch, 1*inch, 1*inch, 1.3*inch, 1.3*inch, 0.7*inch, 0.8*inch])
+        edu_table.setStyle(EDUCATION_TABLE_STYLE)
+        elements.append(edu_table)
+    else:
+        elements.append(Paragraph("No educational information available.", STYLES['Normal']))
+
+    elements.append(Spacer(1, 15))
+
+    # 4. Application Status Section
+    elements.append(Paragraph("Application Status", SECTION_STYLE))
+
+    status_data = [
+        ['Degree:', app["degree"]],
+        ['Course:', app["course_name"]],
+        ['Application No.:', app["application_no"]],
+        ['Submitted At:', str(app["submitted_at"])],
+        ['Status:', app["application_status"]],
+    ]
+
+    if app["application_status"] == 'approved' and app["approved_rejected_date"]:
+        status_data.append(['Approved Date:', str(app["approved_rejected_date"])])
+    elif app["application_status"] == 'rejected':
+        if app["reason_to_reject"]:
+            status_data.append(['Rejection Reason:', app["reason_to_reject"]])
+        if app["approved_rejected_date"]:
+            status_data.append(['Rejection Date:', str(app["approved_rejected_date"])])
+
+    status_table = Table(status_data, colWidths=[2*inch, 4.5*inch])
+    status_table.setStyle(STATUS_TABLE_STYLE)
+    elements.append(status_table)
+    elements.append(Spacer(1, 15))
+
+    # 5. Payment Details Section
+    elements.append(Paragraph("Payment Details", SECTION_STYLE))
+
+    if payment_info:
+        payment_data = [
+            ['Transaction ID:', payment_info["transaction_uuid"]],
+            ['Status:', payment_info["status"]],
+            ['Payment Method:', payment_info["payment_method"]],
+            ['Amount:', str(payment_info["amount_paid"])],
+            ['Payment Date:', str(payment_info["payment_date"])],
+            ['Paid Course:', app["course_name"] or '—'],
+        ]
+        payment_table = Table(payment_data, colWidths=[2*inch, 4.5*inch])
+        payment_table.setStyle(PAYMENT_TABLE_STYLE)
+        elements.append(payment_table)
+    else:
+        elements.append(Paragraph("No payment has been recorded for this application.", STYLES['Normal']))
+
+    pdf.build(elements)
+    return buffer.getvalue()
+
+
+def render_dossier_entry(data, image_cache_dir=None):
+    """(application_no, pdf bytes); the unit of work for the process pool."""
+    return data["application"]["application_no"], render_dossier(data, image_cache_dir)
@@ -0,0 +1,211 @@
+# admissionapp/dossiers.py
+"""
+Applicant dossiers, one or in bulk.
+
+load_dossiers() gathers everything a dossier shows for a batch of
+applications with four queries (applications + user + course, personal
+info, educational info, payments) instead of four per applicant, and
+returns plain dicts. iter_rendered_dossiers() renders them with
+dossier_pdf.render_dossier, for ``bulk_dossiers`` in a ProcessPoolExecutor
+because ReportLab is CPU-bound and holds the GIL, keeping only a bounded
+window of dossiers in flight and yielding results in order. The admin
+download renders serially (workers=1): a pool per web request would fork
+processes inside the web worker and block on shutdown when the client
+goes away.
+"""
+import multiprocessing
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .document_archive import ZipSink
+from .dossier_pdf import render_dossier_entry
+from .models import Application, EducationalInfo, PaymentDetail, PersonalInfo
+
+
+DOSSIER_BATCH_SIZE = 200
+DEFAULT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+APPLICATION_FIELDS = (
+    "pk",
+    "user_id",
+    "user__first_name",
+    "user__last_name",
+    "user__username",
+    "user__email",
+    "user__mobile",
+    "user__user_created_at",
+    "submitted_at",
+    "course__degree",
+    "course__course_name",
+    "application_no",
+    "application_status",
+    "approved_rejected_date",
+    "reason_to_reject",
+)
+PERSONAL_FIELDS = (
+    "user_id",
+    "address",
+    "gender",
+    "dob",
+    "father",
+    "mother",
+    "grandfather",
+    "citizenship_no",
+    "profile_pic",
+)
+EDUCATIONAL_FIELDS = (
+    "user_id",
+    "level",
+    "faculty",
+    "course_name",
+    "university_name",
+    "college_name",
+    "passed_year",
+    "grade_percent",
+)
+PAYMENT_FIELDS = (
+    "application_id",
+    "transaction_uuid",
+    "status",
+    "payment_method",
+    "amount_paid",
+    "payment_date",
+)
+
+
+def _storage_path(name):
+    if not name:
+        return None
+    try:
+        return default_storage.path(name)
+    except NotImplementedError:  # remote storage: no local file for ReportLab
+        return None
+
+
+def load_dossiers(application_ids):
+    """Dossier dicts for ``application_ids``, in the same order, in four queries."""
+    rows = Application.objects.filter(pk__in=application_ids).values_list(
+        *APPLICATION_FIELDS
+    )
+    applications = {row[0]: dict(zip(APPLICATION_FIELDS, row)) for row in rows}
+    user_ids = {a["user_id"] for a in applications.values()}
+
+    genders = dict(PersonalInfo.GENDER_CHOICES)
+    personal = {}
+    for row in PersonalInfo.objects.filter(user_id__in=user_ids).values_list(
+        *PERSONAL_FIELDS
+    ):
+        info = dict(zip(PERSONAL_FIELDS, row))
+        info["gender"] = genders.get(info["gender"], info["gender"])
+        info["profile_pic_path"] = _storage_path(info.pop("profile_pic"))
+        personal[info["user_id"]] = info
+
+    educational = {}
+    for row in (
+        EducationalInfo.objects.filter(user_id__in=user_ids)
+        .order_by("pk")
+        .values_list(*EDUCATIONAL_FIELDS)
+    ):
+        educational.setdefault(row[0], []).append(dict(zip(EDUCATIONAL_FIELDS, row)))
+
+    payments = {
+        row[0]: dict(zip(PAYMENT_FIELDS, row))
+        for row in PaymentDetail.objects.filter(
+            application_id__in=applications
+        ).values_list(*PAYMENT_FIELDS)
+    }
+
+    dossiers = []
+    for pk in application_ids:
+        app = applications.get(pk)
+        if app is None:
+            continue
+        name = f"{app['user__first_name'] or ''} {app['user__last_name'] or ''}".strip()
+        dossiers.append(
+            {
+                "application": {
+                    "applicant_name": name or app["user__username"],
+                    "email": app["user__email"],
+                    "mobile": app["user__mobile"],
+                    "user_created_at": app["user__user_created_at"],
+                    "submitted_at": app["submitted_at"],
+                    "degree": app["course__degree"],
+                    "course_name": app["course__course_name"],
+                    "application_no": app["application_no"],
+                    "application_status": app["application_status"],
+                    "approved_rejected_date": app["approved_rejected_date"],
+                    "reason_to_reject": app["reason_to_reject"],
+                },
+                "personal": personal.get(app["user_id"]),
+                "educational": educational.get(app["user_id"], []),
+                "payment": payments.get(pk),
+            }
+        )
+    return dossiers
+
+
+def iter_dossier_data(applications, batch_size=DOSSIER_BATCH_SIZE):
+    """Dossier dicts for an Application queryset, loaded batch by batch."""
+    ids = applications.order_by("application_no").values_list("pk", flat=True)
+    ids = ids.iterator(chunk_size=batch_size)
+    while True:
+        batch = list(islice(ids, batch_size))
+        if not batch:
+            return
+        yield from load_dossiers(batch)
+
+
+def iter_rendered_dossiers(dossiers, workers=DEFAULT_WORKERS):
+    """
+    Yield (application_no, pdf bytes) in input order. ``workers`` > 1 renders
+    in a spawned process pool with at most ``workers * 2`` dossiers queued.
+    """
+    render = partial(
+        render_dossier_entry, image_cache_dir=settings.DOSSIER_IMAGE_CACHE_DIR
+    )
+    if workers <= 1:
+        for data in dossiers:
+            yield render(data)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        dossiers = iter(dossiers)
+        pending = deque(
+            pool.submit(render, data)
+            for data in islice(dossiers, workers * 2)
+        )
+        while pending:
+            result = pending.popleft().result()
+            for data in islice(dossiers, 1):
+                pending.append(pool.submit(render, data))
+            yield result
+
+
+def iter_dossier_zip(rendered, stats=None):
+    """ZIP bytes with one ``<application_no>.pdf`` per rendered dossier."""
+    sink = ZipSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+        for application_no, pdf in rendered:
+            zf.writestr(f"{application_no}.pdf", pdf)
+            if stats is not None:
+                stats["dossiers"] = stats.get("dossiers", 0) + 1
+                stats["pdf_bytes"] = stats.get("pdf_bytes", 0) + len(pdf)
+            data = sink.drain()
+            if data:
+                yield data
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def dossier_archive_name(course=None, status=None):
+    parts = [course.course_code if course else "all", status or "applicants"]
+    return "_".join(parts) + "_dossiers.zip"
@@ -16,6 +16,7 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 from .models import Application, PaymentDetail, Notification
+from .receipts import request_receipt
 
 
 #Helper Function 
@@ -284,6 +285,8 @@ def esewa_success(request):
                     "is_payment_completed", "updated_at"
                 ]
             )
+            # Rendered by the build_payment_receipts worker once this commits
+            request_receipt(payment.pk)
 
             # Mark application as paid
             application = payment.application
@@ -0,0 +1,160 @@
+# admissionapp/export_jobs.py
+"""
+Background export jobs.
+
+Admins queue an ExportJob from the reports page; the ``run_export_worker``
+management command claims queued jobs one at a time, writes the export
+through the regular ExportSpec writers into a temp file and saves it to
+``ExportJob.file`` (under MEDIA_ROOT/exports/). Progress is written back
+every PROGRESS_EVERY rows with a plain UPDATE so the polling endpoint sees
+it while the export is still running. Finished files are deleted once
+``expires_at`` passes.
+
+A claim is a lease: the worker bumps ``heartbeat_at`` with every progress
+write, and recover_stale_jobs() takes back RUNNING jobs whose heartbeat is
+older than EXPORT_JOB_LEASE_SECONDS (the worker was killed or restarted).
+They are queued again, or failed after EXPORT_JOB_MAX_ATTEMPTS claims.
+Every write a worker makes is conditional on the job still being its own
+claim (same ``attempts``), so a worker that was only slow cannot overwrite
+the job another worker has taken over.
+"""
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .exports import APPLICATION_EXPORTS, EXPORT_FORMATS
+from .models import ExportJob
+
+
+PROGRESS_EVERY = 1000
+
+
+def export_job_ttl():
+    return timedelta(hours=getattr(settings, "EXPORT_JOB_TTL_HOURS", 24))
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest queued job to RUNNING and return it, or
+    None. The conditional UPDATE is the claim, so several workers can poll
+    the same table without taking the same job.
+    """
+    candidates = ExportJob.objects.filter(status=ExportJob.QUEUED).order_by(
+        "created_at"
+    )
+    for pk in candidates.values_list("pk", flat=True)[:10]:
+        now = timezone.now()
+        claimed = ExportJob.objects.filter(pk=pk, status=ExportJob.QUEUED).update(
+            status=ExportJob.RUNNING,
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            return ExportJob.objects.get(pk=pk)
+    return None
+
+
+def _owned(job):
+    """``job`` while it is still this worker's claim."""
+    return ExportJob.objects.filter(
+        pk=job.pk, status=ExportJob.RUNNING, attempts=job.attempts
+    )
+
+
+def recover_stale_jobs(now=None):
+    """
+    Requeue RUNNING jobs whose lease expired, or fail them once they used
+    up EXPORT_JOB_MAX_ATTEMPTS. Returns (requeued, failed) counts.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=settings.EXPORT_JOB_LEASE_SECONDS)
+    stale = ExportJob.objects.filter(status=ExportJob.RUNNING).filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+    failed = stale.filter(attempts__gte=settings.EXPORT_JOB_MAX_ATTEMPTS).update(
+        status=ExportJob.FAILED,
+        error="The export worker stopped before finishing this job.",
+        finished_at=now,
+    )
+    requeued = stale.update(
+        status=ExportJob.QUEUED, heartbeat_at=None, rows_written=0, rows_total=None
+    )
+    return requeued, failed
+
+
+def _counting(rows, job):
+    """Pass ``rows`` through, recording progress (and the lease) as they go."""
+    written = 0
+    for row in rows:
+        yield row
+        written += 1
+        if written % PROGRESS_EVERY == 0:
+            _owned(job).update(rows_written=written, heartbeat_at=timezone.now())
+    _owned(job).update(rows_written=written, heartbeat_at=timezone.now())
+
+
+def run_export_job(job):
+    """
+    Build the file for a claimed job and mark it DONE (or FAILED). Returns
+    None when the lease was lost to another worker meanwhile.
+    """
+    try:
+        spec = APPLICATION_EXPORTS[job.export]
+        output = EXPORT_FORMATS[job.export_format]
+        params = job.params or {}
+
+        job.rows_total = spec.count(params)
+        _owned(job).update(rows_total=job.rows_total, heartbeat_at=timezone.now())
+
+        with tempfile.TemporaryFile() as tmp:
+            output.write(
+                tmp,
+                spec.keys if output.keyed else spec.headers,
+                _counting(spec.rows(params), job),
+                title=spec.title,
+            )
+            tmp.seek(0)
+            job.file.save(
+                spec.filename(params, output.extension), File(tmp), save=False
+            )
+    except Exception as e:  # noqa: BLE001
+        _owned(job).update(
+            status=ExportJob.FAILED,
+            error=f"{type(e).__name__}: {e}",
+            finished_at=timezone.now(),
+        )
+        raise
+
+    job.refresh_from_db(fields=["rows_written"])
+    job.status = ExportJob.DONE
+    job.finished_at = timezone.now()
+    job.expires_at = job.finished_at + export_job_ttl()
+    finished = _owned(job).update(
+        status=job.status,
+        file=job.file.name,
+        rows_total=job.rows_total,
+        finished_at=job.finished_at,
+        expires_at=job.expires_at,
+    )
+    if not finished:
+        job.file.delete(save=False)  # the job was taken over; keep theirs
+        return None
+    return job
+
+
+def purge_expired_jobs(now=None):
+    """Delete artifacts past their expiry; returns the number of jobs expired."""
+    now = now or timezone.now()
+    expired = 0
+    for job in ExportJob.objects.filter(status=ExportJob.DONE, expires_at__lte=now):
+        if job.file:
+            job.file.delete(save=False)
+        job.status = ExportJob.EXPIRED
+        job.save(update_fields=["status", "file"])
+        expired += 1
+    return expired
@@ -0,0 +1,192 @@
+# admissionapp/export_snapshots.py
+"""
+Precomputed export snapshots.
+
+``build_export_snapshots`` (run nightly, and every few minutes with
+``--if-changed``) writes every APPLICATION_EXPORTS spec in every
+EXPORT_FORMATS format to EXPORT_SNAPSHOT_DIR, together with a manifest
+holding the build time, the per-status application counts and the
+Application change-feed watermark at that moment. --if-changed compares
+both (snapshot_drift): counts alone miss edits that keep every bucket the
+same size, such as a new rejection reason. Changes outside the feed (a
+renamed user or course) wait for the nightly build. The export views serve these files for unfiltered requests and
+only build a live export when ``?fresh=1`` is asked for, or when the
+snapshot is older than EXPORT_SNAPSHOT_MAX_AGE_MINUTES (the builds stopped
+running). The build time goes out as Last-Modified and X-Export-Snapshot.
+
+Files are written next to their final name and swapped in with
+os.replace(), so a download never sees a half-written snapshot.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Count
+from django.http import FileResponse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from .exports import APPLICATION_EXPORTS, EXPORT_FORMATS, XLSX_CONTENT_TYPE
+from .models import Application, ChangeLogEntry
+
+
+MANIFEST_NAME = "manifest.json"
+
+CONTENT_TYPES = {
+    "xlsx": XLSX_CONTENT_TYPE,
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+}
+
+
+def snapshot_dir():
+    return settings.EXPORT_SNAPSHOT_DIR
+
+
+def snapshot_path(export, fmt):
+    return os.path.join(snapshot_dir(), f"{export}.{fmt}")
+
+
+def application_rollup():
+    """Application count per status, in one aggregate query."""
+    return dict(
+        Application.objects.order_by()
+        .values_list("application_status")
+        .annotate(n=Count("pk"))
+    )
+
+
+def rollup_drift(old, new):
+    """
+    Lower bound on the applications added, removed or moved between status
+    buckets: a status change counts once (one bucket -1, another +1).
+    """
+    diffs = [new.get(k, 0) - old.get(k, 0) for k in set(old) | set(new)]
+    return max(sum(d for d in diffs if d > 0), -sum(d for d in diffs if d < 0))
+
+
+def application_change_mark():
+    """
+    Id of the latest settled Application change-feed entry, 0 if none.
+    Entries newer than CHANGE_FEED_SETTLE_SECONDS may still be joined by
+    lower ids (see change_feed.py), so they count as changes next time.
+    """
+    settled = timezone.now() - timedelta(seconds=settings.CHANGE_FEED_SETTLE_SECONDS)
+    mark = (
+        ChangeLogEntry.objects.filter(
+            model=Application._meta.model_name, changed_at__lte=settled
+        )
+        .order_by("-id")
+        .values_list("id", flat=True)
+        .first()
+    )
+    return mark or 0
+
+
+def changes_since(mark):
+    """Number of applications with change-feed entries after ``mark``."""
+    return (
+        ChangeLogEntry.objects.filter(model=Application._meta.model_name, id__gt=mark)
+        .values("object_pk")
+        .distinct()
+        .count()
+    )
+
+
+def snapshot_drift(manifest):
+    """
+    Applications changed since ``manifest`` was built: bucket moves from
+    the rollup, or any change in the feed, whichever is more.
+    """
+    return max(
+        rollup_drift(manifest["rollup"], application_rollup()),
+        # Manifests from before change marks existed count every change.
+        changes_since(manifest.get("change_mark", 0)),
+    )
+
+
+def read_manifest():
+    try:
+        with open(os.path.join(snapshot_dir(), MANIFEST_NAME)) as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    manifest["built_at"] = datetime.fromisoformat(manifest["built_at"])
+    return manifest
+
+
+def is_expired(manifest, now=None):
+    """Whether the snapshot of ``manifest`` is too old to be served."""
+    max_age = timedelta(minutes=settings.EXPORT_SNAPSHOT_MAX_AGE_MINUTES)
+    return (now or timezone.now()) - manifest["built_at"] > max_age
+
+
+def current_manifest():
+    """read_manifest(), or None when there is none or it has expired."""
+    manifest = read_manifest()
+    if manifest is None or is_expired(manifest):
+        return None
+    return manifest
+
+
+def _write_atomic(path, write):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as fh:
+        write(fh)
+    os.replace(tmp, path)
+
+
+def build_snapshots(exports=None, formats=None):
+    """Write every export/format snapshot and the manifest; returns the manifest."""
+    os.makedirs(snapshot_dir(), exist_ok=True)
+    # Read before the data, so changes made while building count next time.
+    change_mark = application_change_mark()
+    rollup = application_rollup()
+    built_at = timezone.now()
+    rows = {}
+    for name in exports or APPLICATION_EXPORTS:
+        spec = APPLICATION_EXPORTS[name]
+        rows[name] = spec.count({})
+        for fmt in formats or EXPORT_FORMATS:
+            _write_atomic(
+                snapshot_path(name, fmt),
+                lambda fh, spec=spec, fmt=fmt: spec.write(fh, {}, fmt),
+            )
+
+    manifest = {
+        "built_at": built_at.isoformat(),
+        "rollup": rollup,
+        "change_mark": change_mark,
+        "rows": rows,
+    }
+    _write_atomic(
+        os.path.join(snapshot_dir(), MANIFEST_NAME),
+        lambda fh: fh.write(json.dumps(manifest, indent=2).encode()),
+    )
+    manifest["built_at"] = built_at
+    return manifest
+
+
+def snapshot_response(export, fmt, manifest=None):
+    """
+    FileResponse for the stored snapshot, or None when there is none or it
+    has expired. ``Last-Modified`` / ``X-Export-Snapshot`` carry the time
+    the data was read.
+    """
+    manifest = manifest or current_manifest()
+    path = snapshot_path(export, fmt)
+    if manifest is None or not os.path.exists(path):
+        return None
+
+    spec = APPLICATION_EXPORTS[export]
+    built_at = manifest["built_at"]
+    response = FileResponse(
+        open(path, "rb"),
+        as_attachment=True,
+        filename=spec.filename({}, fmt),
+        content_type=CONTENT_TYPES[fmt],
+    )
+    response["Last-Modified"] = http_date(built_at.timestamp())
+    response["X-Export-Snapshot"] = built_at.isoformat()
+    return response
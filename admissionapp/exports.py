@@ -0,0 +1,586 @@
+# admissionapp/exports.py
+"""
+Report export engine.
+
+Each export is an ExportSpec: a list of Column specs (header + the model
+lookups it needs + a formatter) and the FilterSpecs it accepts from the
+query string. The spec turns that into a single ``values_list`` query whose
+tuples are streamed with ``iterator(chunk_size=...)``, so only one chunk is
+alive at a time. Output formats (CSV, XLSX, JSONL) are pluggable writers
+registered in EXPORT_FORMATS.
+"""
+import csv
+import io
+import json
+import shutil
+import tempfile
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.apps import apps
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE  # type: ignore
+from openpyxl.utils import get_column_letter  # type: ignore
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Spreadsheets smaller than this stay in memory, bigger ones roll over to disk.
+XLSX_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+XLSX_CONTENT_TYPE = (
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+)
+XLSX_MAX_COLUMN_WIDTH = 50
+
+
+class Echo:
+    """File-like object whose write() just hands back the value (for csv.writer)."""
+
+    def write(self, value):
+        return value
+
+
+# -----------------------------
+# Row helpers
+# -----------------------------
+def iter_values(qs, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    """Project ``fields`` and stream the tuples in chunks from the database."""
+    return qs.values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def display_name(first_name, last_name, username):
+    return f"{first_name or ''} {last_name or ''}".strip() or username
+
+
+def format_datetime(value):
+    return value.strftime("%Y-%m-%d %H:%M") if value else ""
+
+
+# -----------------------------
+# CSV
+# -----------------------------
+# Cells starting like a formula are run by spreadsheet apps opening the
+# CSV (names and reasons are typed by applicants), so they get a leading
+# apostrophe and are shown as text.
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_cell(value):
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_safe(row):
+    return [_csv_cell(value) for value in row]
+
+
+def write_csv(fileobj, headers, rows, title=None):
+    stream = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        writer = csv.writer(stream)
+        writer.writerow(headers)
+        writer.writerows(csv_safe(row) for row in rows)
+    finally:
+        stream.flush()
+        stream.detach()
+
+
+def stream_csv_response(filename, headers, rows, title=None):
+    """
+    StreamingHttpResponse that writes ``headers`` immediately and then one
+    CSV line per item of the ``rows`` iterable.
+    """
+    writer = csv.writer(Echo())
+
+    def generate():
+        # UTF-8 BOM so Excel detects the encoding of Nepali names.
+        yield "\ufeff" + writer.writerow(headers)
+        for row in rows:
+            yield writer.writerow(csv_safe(row))
+
+    response = StreamingHttpResponse(generate(), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+# -----------------------------
+# JSONL
+# -----------------------------
+def _jsonl_lines(keys, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(keys, row)), ensure_ascii=False, default=str) + "\n"
+
+
+def write_jsonl(fileobj, keys, rows, title=None):
+    for line in _jsonl_lines(keys, rows):
+        fileobj.write(line.encode("utf-8"))
+
+
+def stream_jsonl_response(filename, keys, rows, title=None):
+    """One JSON object per line, keyed by the column keys, streamed as produced."""
+    response = StreamingHttpResponse(
+        _jsonl_lines(keys, rows), content_type="application/x-ndjson; charset=utf-8"
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+# -----------------------------
+# XLSX
+# -----------------------------
+# openpyxl's write-only worksheets need column widths before the first row
+# is written, so widths could not be measured while writing. This writer
+# produces the same minimal workbook (inline strings, bold centered header)
+# but spools <sheetData> to a temp file, tracks widths on the way and only
+# emits <cols> when the sheet is assembled: one pass over the rows and
+# constant memory.
+_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_XML_DECL = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+_CONTENT_TYPES = (
+    _XML_DECL
+    + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    "</Types>"
+)
+_ROOT_RELS = (
+    _XML_DECL
+    + f'<Relationships xmlns="{_PKG_REL_NS}">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    "</Relationships>"
+)
+_WORKBOOK_RELS = (
+    _XML_DECL
+    + f'<Relationships xmlns="{_PKG_REL_NS}">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    "</Relationships>"
+)
+# Style 0 = default, style 1 = bold, centered (header row).
+_STYLES = (
+    _XML_DECL
+    + f'<styleSheet xmlns="{_NS}">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1" applyAlignment="1">'
+    '<alignment horizontal="center" vertical="center"/></xf></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    "</styleSheet>"
+)
+
+
+def _workbook_xml(title):
+    title = escape(ILLEGAL_CHARACTERS_RE.sub("", title)[:31])
+    return (
+        _XML_DECL
+        + f'<workbook xmlns="{_NS}" xmlns:r="{_REL_NS}">'
+        f'<sheets><sheet name="{title}" sheetId="1" r:id="rId1"/></sheets>'
+        "</workbook>"
+    )
+
+
+def _cell_xml(ref, value, style):
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"{style}><v>{int(value)}</v></c>', len(str(value))
+    if isinstance(value, (int, float, Decimal)):
+        text = str(value)
+        return f'<c r="{ref}"{style}><v>{text}</v></c>', len(text)
+    text = ILLEGAL_CHARACTERS_RE.sub("", str(value))
+    space = ' xml:space="preserve"' if text != text.strip() else ""
+    return (
+        f'<c r="{ref}" t="inlineStr"{style}><is><t{space}>{escape(text)}</t></is></c>',
+        len(text),
+    )
+
+
+class XlsxStreamWriter:
+    """
+    Write a single-sheet workbook to ``fileobj`` row by row.
+
+        with XlsxStreamWriter(fileobj, title="Applications") as writer:
+            writer.write_header(headers)
+            for row in rows:
+                writer.write_row(row)
+
+    Leaving the block normally writes the workbook (close()); an exception
+    only discards the spooled rows.
+    """
+
+    def __init__(self, fileobj, title="Sheet1"):
+        self.fileobj = fileobj
+        self.title = title
+        self.widths = []
+        self.rows_written = 0
+        self._letters = []
+        self._sheet_data = tempfile.TemporaryFile(mode="w+b")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._sheet_data.close()
+
+    def _letter(self, idx):
+        while len(self._letters) <= idx:
+            self._letters.append(get_column_letter(len(self._letters) + 1))
+        return self._letters[idx]
+
+    def _write(self, values, style=""):
+        self.rows_written += 1
+        r = self.rows_written
+        widths = self.widths
+        cells = []
+        for idx, value in enumerate(values):
+            if idx >= len(widths):
+                widths.append(0)
+            if value is None or value == "":
+                continue
+            xml, length = _cell_xml(f"{self._letter(idx)}{r}", value, style)
+            cells.append(xml)
+            if length > widths[idx]:
+                widths[idx] = length
+        self._sheet_data.write(f'<row r="{r}">{"".join(cells)}</row>'.encode())
+
+    def write_header(self, headers):
+        self._write(headers, style=' s="1"')
+
+    def write_row(self, values):
+        self._write(values)
+
+    def close(self):
+        try:
+            self._assemble()
+        finally:
+            self._sheet_data.close()
+
+    def _assemble(self):
+        cols = "".join(
+            f'<col min="{i}" max="{i}" width="{min(w + 2, XLSX_MAX_COLUMN_WIDTH)}" customWidth="1"/>'
+            for i, w in enumerate(self.widths, start=1)
+        )
+        with zipfile.ZipFile(self.fileobj, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("[Content_Types].xml", _CONTENT_TYPES)
+            zf.writestr("_rels/.rels", _ROOT_RELS)
+            zf.writestr("xl/workbook.xml", _workbook_xml(self.title))
+            zf.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+            zf.writestr("xl/styles.xml", _STYLES)
+            with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+                sheet.write(
+                    (
+                        _XML_DECL
+                        + f'<worksheet xmlns="{_NS}">'
+                        + (f"<cols>{cols}</cols>" if cols else "")
+                        + "<sheetData>"
+                    ).encode()
+                )
+                self._sheet_data.seek(0)
+                shutil.copyfileobj(self._sheet_data, sheet, 1024 * 1024)
+                sheet.write(b"</sheetData></worksheet>")
+
+
+def write_xlsx(fileobj, headers, rows, title="Sheet1"):
+    with XlsxStreamWriter(fileobj, title=title) as writer:
+        writer.write_header(headers)
+        for row in rows:
+            writer.write_row(row)
+    return writer
+
+
+def xlsx_file_response(filename, headers, rows, title="Sheet1"):
+    """Build the workbook in a spooled temp file and stream it with FileResponse."""
+    spool = tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_MAX_SIZE)
+    try:
+        write_xlsx(spool, headers, rows, title=title)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return FileResponse(
+        spool,
+        as_attachment=True,
+        filename=filename,
+        content_type=XLSX_CONTENT_TYPE,
+    )
+
+
+# -----------------------------
+# Output formats
+# -----------------------------
+class ExportFormat:
+    """
+    An output format: ``response`` streams it to the browser, ``write``
+    writes it to an open binary file. ``keyed`` formats get the column
+    keys instead of the display headers.
+    """
+
+    def __init__(self, extension, response, write, keyed=False):
+        self.extension = extension
+        self.response = response
+        self.write = write
+        self.keyed = keyed
+
+
+EXPORT_FORMATS = {
+    "xlsx": ExportFormat("xlsx", xlsx_file_response, write_xlsx),
+    "csv": ExportFormat("csv", stream_csv_response, write_csv),
+    "jsonl": ExportFormat("jsonl", stream_jsonl_response, write_jsonl, keyed=True),
+}
+DEFAULT_EXPORT_FORMAT = "xlsx"
+
+
+# -----------------------------
+# Column and filter specs
+# -----------------------------
+class Column:
+    """
+    One output column. ``fields`` are the model lookups it reads; the
+    formatter receives their values positionally (default: the single value).
+    """
+
+    def __init__(self, key, header, fields, formatter=None):
+        self.key = key
+        self.header = header
+        self.fields = tuple(fields)
+        self.formatter = formatter
+
+
+class FilterSpec:
+    """Maps a query-string parameter onto a queryset lookup."""
+
+    def __init__(self, param, lookup, parse=None):
+        self.param = param
+        self.lookup = lookup
+        self.parse = parse
+
+    def apply(self, qs, params):
+        raw = params.get(self.param)
+        if not raw:
+            return qs
+        value = self.parse(raw) if self.parse else raw
+        if value is None:
+            return qs
+        return qs.filter(**{self.lookup: value})
+
+
+class ExportSpec:
+    """
+    Declarative export over ``model`` ("app_label.Model"): base queryset
+    filters, accepted FilterSpecs, columns and naming. ``rows(params)`` runs one projected query and yields the
+    formatted rows, numbered from 1 in the SN column.
+    """
+
+    def __init__(
+        self,
+        name,
+        title,
+        basename,
+        columns,
+        model=None,
+        base_filters=None,
+        filters=(),
+        order_by=(),
+    ):
+        self.name = name
+        self.title = title
+        self.basename = basename
+        self.columns = columns
+        self.model = model
+        self.base_filters = base_filters or {}
+        self.filters = filters
+        self.order_by = order_by
+
+        # Single projection shared by all columns; each column remembers
+        # which slice of the values tuple belongs to it.
+        fields, self._slices = [], []
+        for column in columns:
+            start = len(fields)
+            fields.extend(column.fields)
+            self._slices.append((start, len(fields), column.formatter))
+        self.fields = tuple(fields)
+
+    @property
+    def headers(self):
+        return ["SN"] + [c.header for c in self.columns]
+
+    @property
+    def keys(self):
+        return ["sn"] + [c.key for c in self.columns]
+
+    def queryset(self, params):
+        model = apps.get_model(self.model)
+        qs = model.objects.filter(**self.base_filters)
+        for spec in self.filters:
+            qs = spec.apply(qs, params)
+        return qs.order_by(*self.order_by)
+
+    def filename(self, params, extension):
+        status = params.get("status")
+        if status and "application_status" not in self.base_filters:
+            return f"applications_{status}.{extension}"
+        return f"{self.basename}.{extension}"
+
+    def format_row(self, values):
+        row = []
+        for start, end, formatter in self._slices:
+            if formatter is None:
+                row.append(values[start])
+            else:
+                row.append(formatter(*values[start:end]))
+        return row
+
+    def rows(self, params, chunk_size=EXPORT_CHUNK_SIZE):
+        values = iter_values(self.queryset(params), self.fields, chunk_size=chunk_size)
+        for idx, record in enumerate(values, start=1):
+            row = self.format_row(record)
+            row.insert(0, idx)
+            yield row
+
+    def count(self, params):
+        return self.queryset(params).count()
+
+    def response(self, params, fmt=DEFAULT_EXPORT_FORMAT):
+        output = EXPORT_FORMATS[fmt]
+        return output.response(
+            self.filename(params, output.extension),
+            self.keys if output.keyed else self.headers,
+            self.rows(params),
+            title=self.title,
+        )
+
+    def write(self, fileobj, params, fmt=DEFAULT_EXPORT_FORMAT):
+        output = EXPORT_FORMATS[fmt]
+        output.write(
+            fileobj,
+            self.keys if output.keyed else self.headers,
+            self.rows(params),
+            title=self.title,
+        )
+
+
+# -----------------------------
+# Application exports
+# -----------------------------
+def _or_blank(value):
+    return value or ""
+
+
+def _capitalized(value):
+    return value.capitalize() if value else ""
+
+
+STATUS_FILTER = FilterSpec("status", "application_status")
+DATE_FILTERS = (
+    FilterSpec("start", "submitted_at__date__gte", parse_date),
+    FilterSpec("end", "submitted_at__date__lte", parse_date),
+)
+APPLICATION_FILTERS = (STATUS_FILTER, *DATE_FILTERS)
+
+NAME_COLUMN = Column(
+    "name",
+    "Name",
+    ("user__first_name", "user__last_name", "user__username"),
+    display_name,
+)
+MOBILE_COLUMN = Column("mobile", "Mobile", ("user__mobile",), _or_blank)
+APPLICATION_NO_COLUMN = Column("application_no", "Application No.", ("application_no",))
+COURSE_COLUMN = Column("course", "Applied Course", ("course__course_name",))
+DEGREE_COLUMN = Column("degree", "Applied Degree", ("course__degree",))
+STATUS_COLUMN = Column("status", "Application Status", ("application_status",))
+
+
+def _application_export(
+    name, title, basename, extra_columns, status=None, status_column=STATUS_COLUMN
+):
+    return ExportSpec(
+        name=name,
+        title=title,
+        basename=basename,
+        model="admissionapp.Application",
+        base_filters={"application_status": status} if status else None,
+        # A fixed-status export takes no ?status= (approved?status=pending
+        # would otherwise be an empty file).
+        filters=DATE_FILTERS if status else APPLICATION_FILTERS,
+        order_by=("-submitted_at",),
+        columns=[
+            NAME_COLUMN,
+            MOBILE_COLUMN,
+            APPLICATION_NO_COLUMN,
+            COURSE_COLUMN,
+            DEGREE_COLUMN,
+            status_column,
+            *extra_columns,
+        ],
+    )
+
+
+APPLICATION_EXPORTS = {
+    "total": _application_export(
+        "total",
+        "Applications",
+        "total_applications",
+        [
+            Column("submitted_at", "Submitted Date", ("submitted_at",), format_datetime),
+            Column(
+                "decided_at",
+                "Approved/Rejected Date",
+                ("approved_rejected_date",),
+                format_datetime,
+            ),
+        ],
+        status_column=Column(
+            "status", "Application Status", ("application_status",), _capitalized
+        ),
+    ),
+    "approved": _application_export(
+        "approved",
+        "Approved Applications",
+        "approved_applications",
+        [
+            Column(
+                "approved_at", "Approved On", ("approved_rejected_date",), format_datetime
+            ),
+        ],
+        status="approved",
+    ),
+    "rejected": _application_export(
+        "rejected",
+        "Rejected Applications",
+        "rejected_applications",
+        [
+            Column(
+                "rejected_at",
+                "Rejection Date",
+                ("approved_rejected_date",),
+                format_datetime,
+            ),
+            Column("reason_to_reject", "Reason to Reject", ("reason_to_reject",), _or_blank),
+        ],
+        status="rejected",
+    ),
+    "pending": _application_export(
+        "pending",
+        "Pending Applications",
+        "pending_applications",
+        [
+            Column("submitted_at", "Submitted Date", ("submitted_at",), format_datetime),
+        ],
+        status="pending",
+    ),
+}
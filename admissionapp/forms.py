@@ -226,7 +226,65 @@ class PaymentDetailForm(forms.ModelForm):
     class Meta: 
         model = PaymentDetail 
         fields = ['amount_paid','payment_method']
-        
-    
 
-        
\ No newline at end of file
+
+# -----------------------------------
+# Settlement Statement Upload
+# ------------------------------------
+class SettlementUploadForm(forms.Form):
+    GATEWAY_CHOICES = [
+        ("esewa", "e-Sewa"),
+        ("khalti", "Khalti (amounts in paisa)"),
+    ]
+
+    gateway = forms.ChoiceField(
+        choices=GATEWAY_CHOICES,
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    statement = forms.FileField(
+        help_text="Settlement CSV exported from the gateway merchant portal",
+        widget=forms.ClearableFileInput(attrs={"class": "form-control", "accept": ".csv"}),
+    )
+
+
+class ExportJobForm(forms.Form):
+    EXPORT_CHOICES = [
+        ("total", "Total Applicants"),
+        ("approved", "Approved Applicants"),
+        ("rejected", "Rejected Applicants"),
+        ("pending", "Pending Applicants"),
+    ]
+    FORMAT_CHOICES = [("xlsx", "Excel (.xlsx)"), ("csv", "CSV"), ("jsonl", "JSON Lines")]
+
+    export = forms.ChoiceField(
+        choices=EXPORT_CHOICES,
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    export_format = forms.ChoiceField(
+        choices=FORMAT_CHOICES,
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    status = forms.ChoiceField(
+        choices=[("", "Any status")] + Application.APP_STATUS,
+        required=False,
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    start = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={"type": "date", "class": "form-control"}),
+    )
+    end = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={"type": "date", "class": "form-control"}),
+    )
+
+    def export_params(self):
+        """Query-string style params for ExportSpec (same as the GET exports)."""
+        data = self.cleaned_data
+        params = {}
+        if data.get("status"):
+            params["status"] = data["status"]
+        for key in ("start", "end"):
+            if data.get(key):
+                params[key] = data[key].isoformat()
+        return params
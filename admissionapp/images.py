@@ -0,0 +1,146 @@
+# admissionapp/images.py
+"""
+Size limits for uploaded pictures, checked before any pixel is decoded.
+
+A PNG or JPEG header states the image dimensions, and decoding allocates
+width x height x channels bytes whatever the file size. A few hundred KB
+of well-compressed PNG can therefore ask for gigabytes. image_header()
+reads only the header (PIL.Image.open is lazy).
+validate_image_dimensions (models.py) rejects anything above
+IMAGE_MAX_SIDE or IMAGE_MAX_PIXELS there, so no decoder ever sees it.
+
+Pictures that pass but are larger than any page shows (IMAGE_NORMALIZE_SIDE)
+are downscaled once, before they are stored (see connect()). The decode
+is bounded:
+
+- JPEGs are decoded straight at 1/2..1/8 scale (draft mode), so memory
+  follows the target size, not the source;
+- other formats decode at most IMAGE_MAX_PIXELS.
+
+The downscaled copy also drops EXIF metadata. Orientation is applied
+first.
+"""
+import os
+import warnings
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models.signals import pre_save
+from PIL import Image, ImageOps
+
+
+# Decoders we accept uploads for; Image.open won't try any other plugin.
+IMAGE_FORMATS = ("JPEG", "PNG", "GIF", "BMP", "WEBP")
+
+# (app label, model, field) of the pictures normalized before saving
+NORMALIZED_IMAGE_FIELDS = (
+    ("admissionapp", "CourseDetails", "bg_pic"),
+    ("admissionapp", "PersonalInfo", "profile_pic"),
+)
+
+
+class ImageRejected(ValueError):
+    """The picture is unreadable or too large to decode safely."""
+
+
+def image_header(file):
+    """
+    (format, width, height) of an image file object or path, from its
+    header only. The file position is restored.
+    """
+    position = file.tell() if hasattr(file, "tell") else None
+    try:
+        with warnings.catch_warnings():
+            # We compare against our own limits; Pillow's are far higher.
+            warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+            with Image.open(file, formats=IMAGE_FORMATS) as im:
+                return im.format, im.width, im.height
+    except Image.DecompressionBombError:
+        raise ImageRejected("Image dimensions are too large.")
+    except Exception:  # noqa: BLE001 - any parser failure means "not an image"
+        raise ImageRejected("Upload a valid image.")
+    finally:
+        if position is not None:
+            file.seek(position)
+
+
+def check_image_dimensions(width, height):
+    max_side = settings.IMAGE_MAX_SIDE
+    max_pixels = settings.IMAGE_MAX_PIXELS
+    if width > max_side or height > max_side:
+        raise ImageRejected(
+            f"Image is {width}x{height} pixels; "
+            f"the maximum is {max_side} pixels on either side."
+        )
+    if width * height > max_pixels:
+        raise ImageRejected(
+            f"Image is {width * height / 1e6:.0f} megapixels; "
+            f"the maximum is {max_pixels / 1e6:.0f}."
+        )
+
+
+def checked_image_header(file):
+    """image_header(), raising ImageRejected above the configured limits."""
+    image_format, width, height = image_header(file)
+    check_image_dimensions(width, height)
+    return image_format, width, height
+
+
+def downscale_image(file, max_side):
+    """
+    (bytes, extension) of ``file`` fitted into ``max_side`` pixels, or None
+    when it already fits. Checks the header limits before decoding.
+    """
+    image_format, width, height = checked_image_header(file)
+    if max(width, height) <= max_side:
+        return None
+
+    with Image.open(file, formats=IMAGE_FORMATS) as im:
+        im.draft("RGB", (max_side, max_side))
+        im = ImageOps.exif_transpose(im)
+        # reducing_gap: integer box-reduce first, then a small LANCZOS pass.
+        im.thumbnail((max_side, max_side), Image.LANCZOS, reducing_gap=2.0)
+        out = BytesIO()
+        if image_format == "PNG" or im.mode in ("RGBA", "LA", "P"):
+            im.save(out, "PNG", optimize=True)
+            ext = ".png"
+        else:
+            im.convert("RGB").save(out, "JPEG", quality=85, optimize=True)
+            ext = ".jpg"
+    if hasattr(file, "seek"):
+        file.seek(0)
+    return out.getvalue(), ext
+
+
+def normalize_images(sender, instance, raw=False, **kwargs):
+    """pre_save: downscale newly uploaded pictures above IMAGE_NORMALIZE_SIDE."""
+    if raw:
+        return
+    for app_label, model_name, field_name in NORMALIZED_IMAGE_FIELDS:
+        if sender._meta.label != f"{app_label}.{model_name}":
+            continue
+        image = getattr(instance, field_name)
+        if not image or image._committed:
+            continue
+        try:
+            result = downscale_image(image.file, settings.IMAGE_NORMALIZE_SIDE)
+        except ImageRejected:
+            continue  # validators report it; save() without full_clean stores as is
+        if result is not None:
+            data, ext = result
+            name = os.path.splitext(os.path.basename(image.name))[0] + ext
+            # FileField.pre_save stores this instead of the original upload.
+            image.file = ContentFile(data, name=name)
+            image.name = name
+
+
+def connect():
+    for app_label, model_name, _ in NORMALIZED_IMAGE_FIELDS:
+        model = apps.get_model(app_label, model_name)
+        pre_save.connect(
+            normalize_images,
+            sender=model,
+            dispatch_uid=f"normalize_images_{model._meta.model_name}",
+        )
@@ -17,6 +17,7 @@ from django.views.decorators.csrf import csrf_exempt
 from .models import Application, PaymentDetail 
 from django.http import JsonResponse, HttpResponseBadRequest 
 from .models import Notification 
+from .receipts import request_receipt
 
 
 #Helper Function 
@@ -224,7 +225,10 @@ def khalti_return(request):
                         pd_kwargs = {"application": app, **defaults}
                         if hasattr(PaymentDetail, "gateway_txn_id") and txn_id:
                             pd_kwargs["gateway_txn_id"] = txn_id
-                        PaymentDetail.objects.create(**pd_kwargs)
+                        pd = PaymentDetail.objects.create(**pd_kwargs)
+
+                    # Rendered by the build_payment_receipts worker once this commits
+                    request_receipt(pd.pk)
 
                     if hasattr(app, "is_paid") and not app.is_paid:
                         app.is_paid = True
@@ -0,0 +1,278 @@
+import contextlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+
+from admissionapp import callback_replay as cr
+from admissionapp.models import (
+    Application,
+    CourseDetails,
+    CustomUser,
+    PaymentDetail,
+)
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay synthesized or recorded eSewa/Khalti callbacks against a "
+        "throwaway test server with a fake gateway and report latency "
+        "percentiles, DB lock waits and error rates. The database, MEDIA_ROOT "
+        "and the callback recording are redirected to a temporary directory "
+        "that is removed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--gateway", choices=["esewa", "khalti", "mixed"], default="mixed"
+        )
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument(
+            "--gateway-latency-ms",
+            type=float,
+            default=0,
+            help="Simulated round trip of the gateway verification call.",
+        )
+        parser.add_argument(
+            "--gateway-error-rate",
+            type=float,
+            default=0.0,
+            help="Fraction of verification calls the fake gateway fails (0-1).",
+        )
+        parser.add_argument(
+            "--replay",
+            metavar="JSONL",
+            help="Replay callbacks recorded by PaymentCallbackRecorderMiddleware.",
+        )
+        parser.add_argument(
+            "--save-payloads",
+            metavar="JSONL",
+            help="Write the callbacks that were fired to this file.",
+        )
+        parser.add_argument("--json", action="store_true", help="Print the summary as JSON.")
+
+    # -----------------------------
+    # Fixtures
+    # -----------------------------
+    def _seed(self, plan):
+        """Create one user/application/session (and eSewa payment) per callback."""
+        course = CourseDetails.objects.create(
+            degree="Bachelor",
+            course_name="BENCH",
+            course_full_name="Callback Benchmark",
+            course_code="BENCH",
+            course_duration="4 Years",
+            total_seats=len(plan) + 1,
+        )
+        run = uuid.uuid4().hex[:6]
+        users = CustomUser.objects.bulk_create(
+            [
+                CustomUser(
+                    username=f"bench_{run}_{i}",
+                    email=f"bench_{run}_{i}@example.com",
+                    password="!bench",
+                )
+                for i in range(len(plan))
+            ]
+        )
+        apps = Application.objects.bulk_create(
+            [Application(user=u, course=course) for u in users]
+        )
+
+        session_store = import_module(settings.SESSION_ENGINE).SessionStore
+        backend = settings.AUTHENTICATION_BACKENDS[0]
+        amount = Decimal("50.00")
+        requests_, payments = [], []
+        for (kind, template), user, app in zip(plan, users, apps):
+            session = session_store()
+            session.update(
+                {
+                    SESSION_KEY: str(user.pk),
+                    BACKEND_SESSION_KEY: backend,
+                    HASH_SESSION_KEY: user.get_session_auth_hash(),
+                }
+            )
+            session.create()
+
+            txn_id = uuid.uuid4().hex
+            if kind == "esewa":
+                payments.append(
+                    PaymentDetail(
+                        user=user,
+                        application=app,
+                        amount_paid=amount,
+                        transaction_uuid=txn_id,
+                        product_code=settings.ESEWA_PRODUCT_CODE,
+                        status="INITIATED",
+                        payment_method="e-Sewa",
+                    )
+                )
+                path = cr.ESEWA_SUCCESS_PATH
+                query = (
+                    cr.rekey_recorded(template, txn_id, app.pk, cr.amount_str(amount))
+                    if template
+                    else cr.esewa_callback_query(txn_id, cr.amount_str(amount))
+                )
+            else:
+                self.gateway.khalti_amounts[txn_id] = int(amount * 100)
+                path = cr.KHALTI_RETURN_PATH
+                query = (
+                    cr.rekey_recorded(template, txn_id, app.pk, int(amount * 100))
+                    if template
+                    else cr.khalti_callback_query(txn_id, app.pk, int(amount * 100))
+                )
+            requests_.append(
+                {
+                    "gateway": kind,
+                    "path": path,
+                    "query": query,
+                    "session_key": session.session_key,
+                }
+            )
+        PaymentDetail.objects.bulk_create(payments)
+        return requests_, [a.pk for a in apps]
+
+    def _plan(self, options):
+        """List of (gateway, recorded entry or None), one per callback to fire."""
+        count = options["requests"]
+        if options["replay"]:
+            recorded = list(cr.read_recording(options["replay"]))
+            if not recorded:
+                raise CommandError(f"No callbacks recorded in {options['replay']}")
+            return [
+                (entry["gateway"], entry)
+                for entry in (recorded[i % len(recorded)] for i in range(count))
+            ]
+        if options["gateway"] == "mixed":
+            return [(("esewa", "khalti")[i % 2], None) for i in range(count)]
+        return [(options["gateway"], None)] * count
+
+    # -----------------------------
+    # Run
+    # -----------------------------
+    def handle(self, *args, **options):
+        self.gateway = cr.FakeGateway(
+            latency=options["gateway_latency_ms"] / 1000,
+            error_rate=options["gateway_error_rate"],
+        )
+
+        tmpdir = tempfile.mkdtemp(prefix="bench_callbacks_")
+        old_name = connection.settings_dict["NAME"]
+        if connection.vendor == "sqlite":
+            # A file database so concurrent request threads contend for the
+            # same write lock the way production workers do.
+            connection.settings_dict.setdefault("TEST", {})["NAME"] = os.path.join(
+                tmpdir, "bench.sqlite3"
+            )
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Nothing the callbacks store may land in the real media
+            # directory, and the bench must not record its own traffic.
+            with override_settings(
+                MEDIA_ROOT=os.path.join(tmpdir, "media"),
+                PAYMENT_CALLBACK_RECORD_PATH=None,
+            ):
+                summary = self._run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(summary, indent=2))
+        else:
+            self._print(summary)
+
+    def _run(self, options):
+        requests_, app_ids = self._seed(self._plan(options))
+
+        if options["save_payloads"]:
+            cr.write_recording(
+                options["save_payloads"],
+                ({k: r[k] for k in ("gateway", "path", "query")} for r in requests_),
+            )
+
+        lock_stats = cr.LockStats()
+        server = ThreadedWSGIServer(("127.0.0.1", 0), _QuietHandler, allow_reuse_address=False)
+        server.daemon_threads = True
+        server.set_app(WSGIHandler())
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        host, port = server.server_address[:2]
+
+        # Failed callbacks are counted, not logged; production runs DEBUG off.
+        request_logger = logging.getLogger("django.request")
+        log_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        connection_created.connect(lock_stats.install)
+        try:
+            with override_settings(DEBUG=False), mock.patch(
+                "requests.get", self.gateway.get
+            ), mock.patch("requests.post", self.gateway.post), open(
+                os.devnull, "w"
+            ) as devnull, contextlib.redirect_stdout(devnull):
+                results, wall_time = cr.replay(
+                    requests_, host, port, concurrency=options["concurrency"]
+                )
+        finally:
+            connection_created.disconnect(lock_stats.install)
+            request_logger.setLevel(log_level)
+            server.shutdown()
+            server.server_close()
+
+        summary = cr.summarize(results, wall_time, lock_stats)
+        summary["concurrency"] = options["concurrency"]
+        summary["payments_completed"] = PaymentDetail.objects.filter(
+            application_id__in=app_ids, status="COMPLETE"
+        ).count()
+        summary["by_gateway"] = {}
+        for kind in ("esewa", "khalti"):
+            subset = [r for r in results if r.gateway == kind]
+            if subset:
+                summary["by_gateway"][kind] = cr.summarize(subset, wall_time)
+        return summary
+
+    def _print(self, s):
+        ms = 1000
+        self.stdout.write(
+            f"{s['requests']} callbacks at concurrency {s['concurrency']} "
+            f"in {s['wall_time']:.2f}s ({s['throughput']:.1f} req/s)"
+        )
+        self.stdout.write(
+            f"  latency  p50={s['p50'] * ms:.1f}ms p90={s['p90'] * ms:.1f}ms "
+            f"p99={s['p99'] * ms:.1f}ms max={s['max'] * ms:.1f}ms"
+        )
+        self.stdout.write(
+            f"  errors   {s['error_rate'] * 100:.2f}% HTTP/transport, "
+            f"{s['payments_completed']}/{s['requests']} payments marked COMPLETE"
+        )
+        self.stdout.write(
+            f"  db locks {s['lock_statements']} locking statements, "
+            f"total={s['lock_wait_total']:.2f}s p95={s['lock_wait_p95'] * ms:.1f}ms "
+            f"max={s['lock_wait_max'] * ms:.1f}ms, {s['lock_errors']} lock errors"
+        )
+        for kind, g in s["by_gateway"].items():
+            self.stdout.write(
+                f"  {kind:<8} p50={g['p50'] * ms:.1f}ms p99={g['p99'] * ms:.1f}ms "
+                f"errors={g['error_rate'] * 100:.2f}%"
+            )
@@ -0,0 +1,136 @@
+import multiprocessing
+import resource
+import tempfile
+import time
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+
+from admissionapp.exports import write_xlsx
+
+
+HEADERS = [
+    "SN",
+    "Name",
+    "Mobile",
+    "Application No.",
+    "Applied Course",
+    "Applied Degree",
+    "Application Status",
+    "Submitted Date",
+    "Approved/Rejected Date",
+]
+
+
+def _synthetic_rows(count):
+    """Rows shaped like export_total_applications output."""
+    base = datetime(2025, 1, 1, 9, 30)
+    statuses = ("Pending", "Approved", "Rejected", "Re-submit")
+    for i in range(1, count + 1):
+        submitted = base + timedelta(minutes=i)
+        yield [
+            i,
+            f"Student Number {i}",
+            f"98{i:08d}"[:10],
+            f"APP{i:05X}"[:8],
+            "BIT",
+            "Bachelor",
+            statuses[i % 4],
+            submitted.strftime("%Y-%m-%d %H:%M"),
+            (submitted + timedelta(days=3)).strftime("%Y-%m-%d %H:%M") if i % 4 else "",
+        ]
+
+
+def _legacy_engine(rows):
+    """The pre-streaming export: full openpyxl Workbook, second pass for widths, BytesIO copy."""
+    from openpyxl import Workbook  # type: ignore
+    from openpyxl.styles import Alignment, Font  # type: ignore
+    from openpyxl.utils import get_column_letter  # type: ignore
+
+    wb = Workbook()
+    ws = wb.active
+    ws.append(HEADERS)
+    bold = Font(bold=True)
+    for col_idx in range(1, len(HEADERS) + 1):
+        cell = ws.cell(row=1, column=col_idx)
+        cell.font = bold
+        cell.alignment = Alignment(horizontal="center", vertical="center")
+    for row in rows:
+        ws.append(row)
+    for column_cells in ws.columns:
+        max_len = 0
+        col = column_cells[0].column
+        for c in column_cells:
+            val = str(c.value) if c.value is not None else ""
+            max_len = max(max_len, len(val))
+        ws.column_dimensions[get_column_letter(col)].width = min(max_len + 2, 50)
+    buffer = BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    return len(buffer.getvalue())
+
+
+def _streaming_engine(rows):
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+        write_xlsx(spool, HEADERS, rows, title="Applications")
+        return spool.tell()
+
+
+ENGINES = {"streaming": _streaming_engine, "legacy": _legacy_engine}
+
+
+def _measure(engine, count, queue):
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    size = ENGINES[engine](_synthetic_rows(count))
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux.
+    queue.put({"elapsed": elapsed, "size": size, "peak_kib": peak, "delta_kib": peak - baseline})
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the streaming XLSX export engine against the old in-memory "
+        "openpyxl export: wall time, output size and peak RSS per row count."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+        )
+        parser.add_argument(
+            "--engines", nargs="+", choices=sorted(ENGINES), default=["streaming", "legacy"]
+        )
+        parser.add_argument(
+            "--legacy-max-rows",
+            type=int,
+            default=100_000,
+            help="Skip the legacy engine above this many rows (it needs GBs of RAM).",
+        )
+
+    def handle(self, *args, **options):
+        # A fresh interpreter per measurement so peak RSS is not inherited.
+        ctx = multiprocessing.get_context("spawn")
+        self.stdout.write(
+            f"{'engine':<10} {'rows':>10} {'time (s)':>10} {'rows/s':>10} "
+            f"{'size (MB)':>10} {'peak RSS (MB)':>14} {'growth (MB)':>12}"
+        )
+        for count in options["rows"]:
+            for engine in options["engines"]:
+                if engine == "legacy" and count > options["legacy_max_rows"]:
+                    self.stdout.write(f"{engine:<10} {count:>10} {'skipped':>10}")
+                    continue
+                queue = ctx.Queue()
+                proc = ctx.Process(target=_measure, args=(engine, count, queue))
+                proc.start()
+                result = queue.get()
+                proc.join()
+                self.stdout.write(
+                    f"{engine:<10} {count:>10} {result['elapsed']:>10.2f} "
+                    f"{count / result['elapsed']:>10.0f} "
+                    f"{result['size'] / 1e6:>10.1f} "
+                    f"{result['peak_kib'] / 1024:>14.1f} "
+                    f"{result['delta_kib'] / 1024:>12.1f}"
+                )
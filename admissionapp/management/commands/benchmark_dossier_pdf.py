@@ -0,0 +1,93 @@
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from admissionapp.dossier_pdf import _label_table_style, render_dossier
+from admissionapp.dossiers import load_dossiers
+from admissionapp.models import Application, PersonalInfo
+from reportlab.lib.styles import getSampleStyleSheet
+
+
+class Command(BaseCommand):
+    help = (
+        "Render applicant dossier PDFs in-process and report render time and "
+        "output size per dossier: original pictures vs downscaled (cold and "
+        "warm rendition cache)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=50)
+        parser.add_argument(
+            "--all-applicants",
+            action="store_true",
+            help="Do not prefer applicants who uploaded a profile picture.",
+        )
+
+    def handle(self, *args, **options):
+        applications = Application.objects.order_by("pk")
+        if not options["all_applicants"]:
+            with_pic = applications.filter(
+                user_id__in=PersonalInfo.objects.exclude(profile_pic="").values(
+                    "user_id"
+                )
+            )
+            if with_pic.exists():
+                applications = with_pic
+        ids = list(applications.values_list("pk", flat=True)[: options["count"]])
+        if not ids:
+            raise CommandError("No applications to render.")
+        dossiers = load_dossiers(ids)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            modes = [
+                ("original pictures", {"downscale_pictures": False}),
+                ("downscaled, no cache", {}),
+                ("downscaled, cold cache", {"image_cache_dir": cache_dir}),
+                ("downscaled, warm cache", {"image_cache_dir": cache_dir}),
+            ]
+            results = [(label, self._run(dossiers, kwargs)) for label, kwargs in modes]
+
+        self.stdout.write(f"{len(dossiers)} dossiers")
+        self.stdout.write(
+            f"{'mode':<24} {'ms/dossier':>10} {'p95 ms':>8} {'KB/dossier':>11}"
+        )
+        for label, (times, sizes) in results:
+            p95 = sorted(times)[int(0.95 * (len(times) - 1))]
+            self.stdout.write(
+                f"{label:<24} {statistics.mean(times):>10.1f} {p95:>8.1f} "
+                f"{statistics.mean(sizes) / 1024:>11.1f}"
+            )
+
+        base_times, base_sizes = results[0][1]
+        warm_times, warm_sizes = results[-1][1]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"warm cache vs original: "
+                f"{statistics.mean(base_times) / statistics.mean(warm_times):.1f}x faster, "
+                f"{sum(base_sizes) / sum(warm_sizes):.1f}x smaller"
+            )
+        )
+        self.stdout.write(
+            f"style setup now done once per process: "
+            f"{self._style_setup_ms():.2f} ms saved per dossier"
+        )
+
+    def _run(self, dossiers, kwargs):
+        times, sizes = [], []
+        for data in dossiers:
+            started = time.perf_counter()
+            pdf = render_dossier(data, **kwargs)
+            times.append((time.perf_counter() - started) * 1000)
+            sizes.append(len(pdf))
+        return times, sizes
+
+    def _style_setup_ms(self, rounds=200):
+        """What render_dossier used to rebuild on every call."""
+        started = time.perf_counter()
+        for _ in range(rounds):
+            getSampleStyleSheet()
+            for _ in range(5):
+                _label_table_style("#f8f9fa")
+        return (time.perf_counter() - started) * 1000 / rounds
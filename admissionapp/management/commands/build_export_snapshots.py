@@ -0,0 +1,58 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from admissionapp.export_snapshots import (
+    build_snapshots,
+    is_expired,
+    read_manifest,
+    snapshot_drift,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute the total/approved/rejected/pending exports served by the "
+        "export views. Run nightly without options, and frequently with "
+        "--if-changed to rebuild once enough applications have changed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--if-changed",
+            nargs="?",
+            type=int,
+            const=-1,
+            metavar="ROWS",
+            help=(
+                "Only rebuild when more than ROWS applications changed (status "
+                "bucket or change feed) since the last build (default: "
+                "EXPORT_SNAPSHOT_CHANGE_THRESHOLD), or when the snapshot is "
+                "older than EXPORT_SNAPSHOT_MAX_AGE_MINUTES."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        threshold = options["if_changed"]
+        if threshold is not None:
+            if threshold < 0:
+                threshold = settings.EXPORT_SNAPSHOT_CHANGE_THRESHOLD
+            manifest = read_manifest()
+            if manifest is not None and not is_expired(manifest):
+                drift = snapshot_drift(manifest)
+                if drift <= threshold:
+                    self.stdout.write(
+                        f"Snapshots from {manifest['built_at']:%Y-%m-%d %H:%M} are "
+                        f"current ({drift} <= {threshold} rows changed)."
+                    )
+                    return
+
+        started = time.perf_counter()
+        manifest = build_snapshots()
+        rows = ", ".join(f"{k}={v}" for k, v in manifest["rows"].items())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Built export snapshots in {time.perf_counter() - started:.2f}s ({rows})."
+            )
+        )
@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from admissionapp.models import PaymentDetail
+from admissionapp.receipts import (
+    claim_next_receipt,
+    recover_stale_receipts,
+    request_receipt,
+    run_receipt_job,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the receipt PDFs queued by the payment callbacks, so web "
+        "workers never run ReportLab, and requeue jobs left RUNNING by a "
+        "dead worker. --enqueue-missing first queues every COMPLETE payment "
+        "that has no receipt (payments completed before receipts existed)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the receipts currently queued, then exit (for cron).",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to sleep when the queue is empty.",
+        )
+        parser.add_argument(
+            "--enqueue-missing",
+            action="store_true",
+            help="Queue a receipt for every COMPLETE payment without one.",
+        )
+
+    def handle(self, *args, **options):
+        if options["enqueue_missing"]:
+            ids = (
+                PaymentDetail.objects.filter(status="COMPLETE", receipt="")
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            )
+            queued = sum(1 for payment_id in list(ids) if request_receipt(payment_id))
+            self.stdout.write(f"Queued {queued} receipt(s).")
+
+        built = 0
+        try:
+            while True:
+                requeued, failed = recover_stale_receipts()
+                if requeued or failed:
+                    self.stdout.write(
+                        f"Recovered stale receipt jobs: {requeued} requeued, {failed} failed."
+                    )
+
+                job = claim_next_receipt()
+                if job is None:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+
+                try:
+                    if run_receipt_job(job):
+                        built += 1
+                except Exception as e:  # noqa: BLE001
+                    self.stderr.write(f"Receipt of payment {job.payment_id} failed: {e}")
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping receipt worker.")
+        self.stdout.write(self.style.SUCCESS(f"{built} receipt(s) built."))
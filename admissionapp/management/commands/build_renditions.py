@@ -0,0 +1,92 @@
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from admissionapp.renditions import (
+    FIELD_PRESETS,
+    build_renditions,
+    claim_next_rendition,
+    recover_stale_renditions,
+    run_rendition_job,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the resized renditions and placeholders of course background "
+        "and profile pictures (for pictures uploaded before they existed). "
+        "With --queued, run as the worker building the renditions queued by "
+        "uploads and page views instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Rebuild renditions that already exist.",
+        )
+        parser.add_argument(
+            "--queued",
+            action="store_true",
+            help="Build queued rendition jobs, polling for new ones.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="With --queued: process the jobs currently queued, then exit (for cron).",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to sleep when the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        if options["queued"]:
+            return self.work(options)
+
+        written = failed = 0
+        for (app_label, model_name, field_name), presets in FIELD_PRESETS.items():
+            model = apps.get_model(app_label, model_name)
+            names = (
+                model._default_manager.exclude(**{field_name: ""})
+                .exclude(**{f"{field_name}__isnull": True})
+                .values_list(field_name, flat=True)
+                .distinct()
+            )
+            for name in names.iterator(chunk_size=500):
+                try:
+                    written += build_renditions(name, presets, force=options["force"])
+                except Exception as e:  # noqa: BLE001 - report and keep going
+                    failed += 1
+                    self.stderr.write(f"{name}: {e}")
+        self.stdout.write(
+            self.style.SUCCESS(f"{written} rendition file(s) written, {failed} failed.")
+        )
+
+    def work(self, options):
+        written = 0
+        try:
+            while True:
+                requeued, failed = recover_stale_renditions()
+                if requeued or failed:
+                    self.stdout.write(
+                        f"Recovered stale rendition jobs: {requeued} requeued, {failed} failed."
+                    )
+
+                job = claim_next_rendition()
+                if job is None:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+
+                try:
+                    written += run_rendition_job(job)
+                except Exception as e:  # noqa: BLE001
+                    self.stderr.write(f"Renditions of {job.source} failed: {e}")
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping rendition worker.")
+        self.stdout.write(self.style.SUCCESS(f"{written} rendition file(s) written."))
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from admissionapp.document_archive import applications_for_archive
+from admissionapp.dossiers import (
+    DEFAULT_WORKERS,
+    DOSSIER_BATCH_SIZE,
+    iter_dossier_data,
+    iter_dossier_zip,
+    iter_rendered_dossiers,
+)
+from admissionapp.models import Application, CourseDetails
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the applicant dossier PDF of every application for a course "
+        "and/or status into one ZIP, in a process pool, and report throughput."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--course", help="Course code (e.g. BIT) or id.")
+        parser.add_argument(
+            "--status", choices=[value for value, _ in Application.APP_STATUS]
+        )
+        parser.add_argument("--output", default="dossiers.zip")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=DEFAULT_WORKERS,
+            help="Render processes; 1 renders in this process.",
+        )
+        parser.add_argument("--batch-size", type=int, default=DOSSIER_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        course = None
+        if options["course"]:
+            lookup = options["course"]
+            field = "pk" if lookup.isdigit() else "course_code"
+            course = CourseDetails.objects.filter(**{field: lookup}).first()
+            if course is None:
+                raise CommandError(f"No course {lookup!r}.")
+        if course is None and not options["status"]:
+            raise CommandError("Pass --course and/or --status.")
+
+        applications = applications_for_archive(
+            course_id=course and course.pk, status=options["status"]
+        )
+        stats = {"dossiers": 0, "pdf_bytes": 0}
+        started = time.perf_counter()
+        with open(options["output"], "wb") as out:
+            dossiers = iter_dossier_data(applications, batch_size=options["batch_size"])
+            rendered = iter_rendered_dossiers(dossiers, workers=options["workers"])
+            for chunk in iter_dossier_zip(rendered, stats=stats):
+                out.write(chunk)
+        elapsed = time.perf_counter() - started
+
+        count = stats["dossiers"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{count} dossiers -> {options['output']} in {elapsed:.2f}s "
+                f"with {options['workers']} worker(s): "
+                f"{count / elapsed if elapsed else 0:.1f} dossiers/s, "
+                f"{stats['pdf_bytes'] / 1e6:.1f} MB of PDF"
+            )
+        )
@@ -0,0 +1,59 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from admissionapp.change_feed import (
+    DEFAULT_PAGE_SIZE,
+    entry_json,
+    iter_changes,
+    page_bounds,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream ChangeLogEntry rows after a watermark as JSONL (stdout or "
+        "--output). The new watermark is printed to stderr when done."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", type=int, default=0, help="Last id already processed.")
+        parser.add_argument(
+            "--models",
+            default="",
+            help="Comma-separated: application,paymentdetail,educationalinfo (default all).",
+        )
+        parser.add_argument("--output", help="Append to this file instead of stdout.")
+        parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+        parser.add_argument(
+            "--follow",
+            action="store_true",
+            help="Keep polling for new changes until interrupted.",
+        )
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        models = [m for m in options["models"].split(",") if m]
+        watermark = options["since"]
+        out = open(options["output"], "a") if options["output"] else sys.stdout
+        written = 0
+        try:
+            while True:
+                until = page_bounds(watermark, models, options["page_size"])
+                if until != watermark:
+                    for entry in iter_changes(watermark, until, models):
+                        out.write(entry_json(entry))
+                        written += 1
+                    out.flush()
+                    watermark = until
+                    continue
+                if not options["follow"]:
+                    break
+                time.sleep(options["poll_interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if out is not sys.stdout:
+                out.close()
+            self.stderr.write(f"{written} changes, watermark={watermark}")
@@ -0,0 +1,67 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from admissionapp.columnar import (
+    COLUMNAR_DATASETS,
+    COLUMNAR_FORMATS,
+    ColumnarDataChanged,
+    pyarrow_available,
+)
+from admissionapp.exports import EXPORT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Write applications, courses, educational info and payments as "
+        "Parquet or Arrow IPC files for analysis in notebooks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "datasets",
+            nargs="*",
+            help=f"Datasets to export: {', '.join(COLUMNAR_DATASETS)} (default: all).",
+        )
+        parser.add_argument(
+            "--format", choices=sorted(COLUMNAR_FORMATS), default="parquet"
+        )
+        parser.add_argument("--output-dir", default=".")
+        parser.add_argument("--batch-size", type=int, default=EXPORT_CHUNK_SIZE)
+        parser.add_argument("--status", help="Applications only: application status.")
+        parser.add_argument("--start", help="Applications only: submitted on/after YYYY-MM-DD.")
+        parser.add_argument("--end", help="Applications only: submitted on/before YYYY-MM-DD.")
+
+    def handle(self, *args, **options):
+        if not pyarrow_available():
+            raise CommandError("pyarrow is not installed (pip install pyarrow).")
+
+        unknown = set(options["datasets"]) - set(COLUMNAR_DATASETS)
+        if unknown:
+            raise CommandError(f"Unknown dataset(s): {', '.join(sorted(unknown))}")
+
+        output = COLUMNAR_FORMATS[options["format"]]
+        out_dir = options["output_dir"]
+        os.makedirs(out_dir, exist_ok=True)
+        params = {k: options[k] for k in ("status", "start", "end") if options[k]}
+
+        for name in options["datasets"] or COLUMNAR_DATASETS:
+            dataset = COLUMNAR_DATASETS[name]
+            path = os.path.join(out_dir, dataset.filename(output.extension))
+            started = time.perf_counter()
+            try:
+                with open(path, "wb") as fh:
+                    rows = output.write(
+                        fh, dataset, params, batch_size=options["batch_size"]
+                    )
+            except ColumnarDataChanged as e:
+                os.remove(path)
+                raise CommandError(str(e))
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{name}: {rows} rows -> {path} "
+                    f"({os.path.getsize(path) / 1024:.1f} KiB in {elapsed:.2f}s)"
+                )
+            )
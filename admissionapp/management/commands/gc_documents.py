@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from admissionapp.document_storage import collect_garbage, recount_references
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete content-addressed documents that no record has referenced "
+        "for DOCUMENT_GC_GRACE_HOURS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-hours",
+            type=int,
+            default=settings.DOCUMENT_GC_GRACE_HOURS,
+            help="How long a document must have been unreferenced.",
+        )
+        parser.add_argument(
+            "--recount",
+            action="store_true",
+            help="Rebuild the reference counts from the records first.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report what would be deleted.",
+        )
+
+    def handle(self, *args, **options):
+        if options["recount"]:
+            fixed = recount_references()
+            self.stdout.write(f"{fixed} reference count(s) corrected.")
+        deleted, reclaimed = collect_garbage(
+            grace_hours=options["grace_hours"], dry_run=options["dry_run"]
+        )
+        verb = "would be deleted" if options["dry_run"] else "deleted"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{deleted} unreferenced document(s) {verb}, "
+                f"{filesizeformat(reclaimed)} reclaimed."
+            )
+        )
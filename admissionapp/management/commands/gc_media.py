@@ -0,0 +1,62 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+from django.utils import timezone
+
+from admissionapp.media_gc import collect_orphans
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete (or quarantine) uploaded files under MEDIA_ROOT that no "
+        "record references, e.g. replaced profile pictures and documents."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-hours",
+            type=int,
+            default=settings.MEDIA_GC_GRACE_HOURS,
+            help="Only files older than this are considered.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report what would be removed.",
+        )
+        parser.add_argument(
+            "--quarantine",
+            action="store_true",
+            help="Move orphans under MEDIA_QUARANTINE_DIR instead of deleting them.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        quarantine = None
+        if options["quarantine"] and not options["dry_run"]:
+            quarantine = os.path.join(
+                settings.MEDIA_QUARANTINE_DIR, timezone.now().strftime("%Y%m%d-%H%M%S")
+            )
+        files, sizes = collect_orphans(
+            grace_hours=options["grace_hours"],
+            dry_run=options["dry_run"],
+            quarantine=quarantine,
+            batch_size=options["batch_size"],
+        )
+        for top in sorted(files):
+            self.stdout.write(f"  {top + '/':<20} {files[top]:>6}  {filesizeformat(sizes[top])}")
+
+        if options["dry_run"]:
+            verb = "would be removed"
+        elif quarantine:
+            verb = f"moved to {quarantine}"
+        else:
+            verb = "deleted"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{sum(files.values())} orphaned file(s) {verb}, "
+                f"{filesizeformat(sum(sizes.values()))} reclaimed."
+            )
+        )
@@ -0,0 +1,58 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from admissionapp.dossiers import iter_dossier_zip
+from admissionapp.models import CourseDetails
+from admissionapp.offer_letters import approved_applications, iter_offer_letters
+
+
+class Command(BaseCommand):
+    help = (
+        "Write an offer letter PDF with a signed verification code for every "
+        "approved application (optionally one course) into a ZIP."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--course", help="Course code (e.g. BIT) or id.")
+        parser.add_argument(
+            "--approved-since",
+            help="Only applications approved on or after this date (YYYY-MM-DD).",
+        )
+        parser.add_argument("--output", default="offer_letters.zip")
+        parser.add_argument(
+            "--site-url",
+            default=settings.SITE_URL,
+            help="Base URL of the verification link printed on each letter.",
+        )
+
+    def handle(self, *args, **options):
+        course = None
+        if options["course"]:
+            lookup = options["course"]
+            field = "pk" if lookup.isdigit() else "course_code"
+            course = CourseDetails.objects.filter(**{field: lookup}).first()
+            if course is None:
+                raise CommandError(f"No course {lookup!r}.")
+
+        applications = approved_applications(course_id=course and course.pk)
+        if options["approved_since"]:
+            applications = applications.filter(
+                approved_rejected_date__date__gte=options["approved_since"]
+            )
+
+        stats = {"dossiers": 0, "pdf_bytes": 0}
+        started = time.perf_counter()
+        with open(options["output"], "wb") as out:
+            letters = iter_offer_letters(applications, site_url=options["site_url"])
+            for chunk in iter_dossier_zip(letters, stats=stats):
+                out.write(chunk)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{stats['dossiers']} offer letters -> {options['output']} "
+                f"in {elapsed:.2f}s"
+            )
+        )
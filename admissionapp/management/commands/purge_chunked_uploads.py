@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from admissionapp.chunked_uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete resumable uploads (and their chunks) that were abandoned or "
+        "never attached to a form, after CHUNKED_UPLOAD_TTL_HOURS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=int,
+            default=settings.CHUNKED_UPLOAD_TTL_HOURS,
+            help="Age (since the last chunk) after which an upload is stale.",
+        )
+
+    def handle(self, *args, **options):
+        purged = purge_stale_uploads(hours=options["hours"])
+        self.stdout.write(self.style.SUCCESS(f"{purged} stale upload(s) removed."))
@@ -0,0 +1,77 @@
+import os
+import time
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+
+from admissionapp.reconciliation import (
+    DEFAULT_BATCH_SIZE,
+    ReconciliationReport,
+    iter_statement_rows,
+    reconcile_statement,
+    report_csv_sink,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcile an eSewa/Khalti settlement CSV against PaymentDetail and "
+        "write matched, missing, amount-mismatch and status-mismatch reports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("statement", help="Path to the settlement CSV file")
+        parser.add_argument(
+            "--gateway",
+            choices=["esewa", "khalti"],
+            default="esewa",
+            help="Khalti statements report amounts in paisa.",
+        )
+        parser.add_argument(
+            "--output-dir",
+            default=".",
+            help="Directory for matched.csv, missing.csv, mismatched.csv and "
+            "status_mismatch.csv",
+        )
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options["statement"]
+        if not os.path.exists(path):
+            raise CommandError(f"Statement not found: {path}")
+
+        out_dir = options["output_dir"]
+        os.makedirs(out_dir, exist_ok=True)
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            # Rows go straight to their report file; none are kept in memory.
+            sinks = {
+                category: report_csv_sink(
+                    stack.enter_context(
+                        open(os.path.join(out_dir, f"{category}.csv"), "w", newline="")
+                    )
+                )
+                for category in ReconciliationReport.CATEGORIES
+            }
+            fh = stack.enter_context(open(path, newline="", encoding="utf-8-sig"))
+            try:
+                report = reconcile_statement(
+                    iter_statement_rows(fh, paisa=options["gateway"] == "khalti"),
+                    batch_size=options["batch_size"],
+                    sample_size=0,
+                    sinks=sinks,
+                )
+            except ValueError as e:
+                raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        summary = report.summary()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Read {summary['rows_read']} rows in {elapsed:.2f}s: "
+                f"{summary['matched']} matched, {summary['missing']} missing, "
+                f"{summary['mismatched']} amount mismatches, "
+                f"{summary['status_mismatch']} not COMPLETE on our side."
+            )
+        )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from admissionapp.media_layout import relocate_media
+
+
+class Command(BaseCommand):
+    help = (
+        "Move uploads stored under the old per-user/per-course directories "
+        "into the hashed fan-out layout (documents into the content-addressed "
+        "store) and update the records."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the files that would be moved.",
+        )
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        counts = relocate_media(
+            dry_run=options["dry_run"], batch_size=options["batch_size"]
+        )
+        verb = "would be relocated" if options["dry_run"] else "relocated"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{counts['relocated']} file(s) {verb}, {counts['missing']} missing, "
+                f"{counts['skipped']} skipped (not in local storage)."
+            )
+        )
@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from admissionapp.export_jobs import (
+    claim_next_job,
+    purge_expired_jobs,
+    recover_stale_jobs,
+    run_export_job,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Build queued export jobs in this process so web workers never "
+        "generate large spreadsheets, requeue jobs left RUNNING by a dead "
+        "worker, and delete expired export files."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the jobs currently queued, then exit (for cron).",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to sleep when the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                expired = purge_expired_jobs()
+                if expired:
+                    self.stdout.write(f"Expired {expired} export file(s).")
+                requeued, failed = recover_stale_jobs()
+                if requeued or failed:
+                    self.stdout.write(
+                        f"Recovered stale export jobs: {requeued} requeued, {failed} failed."
+                    )
+
+                job = claim_next_job()
+                if job is None:
+                    if options["once"]:
+                        return
+                    time.sleep(options["poll_interval"])
+                    continue
+
+                started = time.perf_counter()
+                try:
+                    finished = run_export_job(job)
+                except Exception as e:  # noqa: BLE001
+                    self.stderr.write(f"Export job {job.pk} failed: {e}")
+                    continue
+                if finished is None:
+                    self.stderr.write(f"Export job {job.pk} was taken over by another worker.")
+                    continue
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Export job {job.pk}: {job.rows_written} rows -> "
+                        f"{job.file.name} in {time.perf_counter() - started:.2f}s"
+                    )
+                )
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping export worker.")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from admissionapp.documents import resync_documents
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the Document rows from the PersonalInfo/EducationalInfo file "
+        "fields (the source of truth): add missing rows, fix stale ones, drop "
+        "rows of emptied fields and describe files never described (size, "
+        "type, SHA-256, pages). Run it once after migrating to 0018."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        counts = resync_documents(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{counts['created']} created, {counts['updated']} updated, "
+                f"{counts['deleted']} deleted, {counts['missing']} file(s) missing."
+            )
+        )
@@ -0,0 +1,183 @@
+# admissionapp/media_gc.py
+"""
+Removal of uploaded files no record points at any more.
+
+Editing a profile, an educational record or a course stores the new
+upload under a new name and leaves the old file where it was, so
+media/profile_pics/<user>/, uploads/<user>/, citizenship/ and course_bg/
+only ever grow. find_orphans() compares what is on disk with what the
+database references:
+
+- every file name referenced by a FileField of this app is loaded into
+  one set (PersonalInfo, EducationalInfo and CourseDetails are the ones
+  edits orphan; receipts and exports are counted too, so their files are
+  never touched);
+- MEDIA_ROOT is walked with os.scandir(), a directory at a time, and
+  each batch of paths is diffed against that set;
+- renditions/<name>/... is kept while <name> is referenced.
+
+documents/ is skipped: content-addressed files belong to gc_documents.
+Files younger than MEDIA_GC_GRACE_HOURS are skipped too, since an upload
+is stored before the row naming it is committed.
+
+Orphans are deleted, or moved to MEDIA_QUARANTINE_DIR (outside MEDIA_ROOT,
+so they stop being served) to be removed by hand later. Every batch is
+checked against the database once more right before it goes.
+"""
+import os
+import shutil
+import time
+from collections import Counter
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import FileField, Q
+
+from .document_storage import DOCUMENT_PREFIX
+from .renditions import RENDITION_PREFIX
+
+
+# Top-level MEDIA_ROOT directories another command is responsible for.
+SKIPPED_PREFIXES = frozenset([DOCUMENT_PREFIX])
+
+
+def file_fields():
+    """(model, [field names]) for every model of this app with file fields."""
+    for model in apps.get_app_config("admissionapp").get_models():
+        names = [
+            field.attname
+            for field in model._meta.concrete_fields
+            if isinstance(field, FileField)
+        ]
+        if names:
+            yield model, names
+
+
+def referenced_names():
+    """Set of every stored file name the database references."""
+    names = set()
+    for model, fields in file_fields():
+        for row in model._default_manager.values_list(*fields).iterator(chunk_size=2000):
+            names.update(name for name in row if name)
+    return names
+
+
+def still_referenced(names):
+    """The subset of ``names`` referenced right now."""
+    found = set()
+    names = list(names)
+    if not names:
+        return found
+    for model, fields in file_fields():
+        query = Q()
+        for field in fields:
+            query |= Q(**{f"{field}__in": names})
+        for row in model._default_manager.filter(query).values_list(*fields):
+            found.update(row)
+    return found
+
+
+def scan_media(root):
+    """
+    Yield (name, size, mtime) for every file under ``root``, name relative
+    to it with "/" separators. Hidden entries and SKIPPED_PREFIXES are
+    left out; directories are read one at a time.
+    """
+    pending = [""]
+    while pending:
+        prefix = pending.pop()
+        try:
+            entries = os.scandir(os.path.join(root, prefix))
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                name = f"{prefix}{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    if name not in SKIPPED_PREFIXES:
+                        pending.append(name + "/")
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    yield name, stat.st_size, stat.st_mtime
+
+
+def _owner(name):
+    """The referenced name that keeps ``name`` alive."""
+    if name.startswith(RENDITION_PREFIX + "/"):
+        return os.path.dirname(name[len(RENDITION_PREFIX) + 1:])
+    return name
+
+
+def find_orphans(root=None, grace_hours=None, batch_size=500):
+    """
+    Yield lists of at most ``batch_size`` (name, size) of files under
+    ``root`` (MEDIA_ROOT) that nothing references and that are older than
+    ``grace_hours``.
+    """
+    root = root or settings.MEDIA_ROOT
+    grace_hours = settings.MEDIA_GC_GRACE_HOURS if grace_hours is None else grace_hours
+    cutoff = time.time() - grace_hours * 3600
+    referenced = referenced_names()
+
+    batch = {}
+    for name, size, mtime in scan_media(root):
+        if mtime < cutoff:
+            batch[name] = size
+        if len(batch) >= batch_size:
+            yield _orphans_in(batch, referenced)
+            batch = {}
+    if batch:
+        yield _orphans_in(batch, referenced)
+
+
+def _orphans_in(batch, referenced):
+    owners = {name: _owner(name) for name in batch}
+    orphans = set(batch) - {name for name, owner in owners.items() if owner in referenced}
+    return sorted((name, batch[name]) for name in orphans)
+
+
+def prune_empty_dirs(root, name):
+    """Remove the directories of ``name`` under ``root`` that are now empty."""
+    directory = os.path.dirname(name)
+    while directory:
+        try:
+            os.rmdir(os.path.join(root, directory))
+        except OSError:  # not empty (or gone)
+            return
+        directory = os.path.dirname(directory)
+
+
+def collect_orphans(root=None, grace_hours=None, dry_run=False, quarantine=None,
+                    batch_size=500):
+    """
+    Delete (or move under ``quarantine``) orphaned media files. Returns a
+    Counter of files and one of bytes, both keyed by top-level directory.
+    """
+    root = root or settings.MEDIA_ROOT
+    files, sizes = Counter(), Counter()
+    for batch in find_orphans(root, grace_hours, batch_size):
+        if not batch:
+            continue
+        if not dry_run:
+            # Something may have started pointing at a file since the scan.
+            alive = still_referenced({_owner(name) for name, _ in batch})
+            batch = [(name, size) for name, size in batch if _owner(name) not in alive]
+        for name, size in batch:
+            if not dry_run:
+                path = os.path.join(root, name)
+                try:
+                    if quarantine:
+                        target = os.path.join(quarantine, name)
+                        os.makedirs(os.path.dirname(target), exist_ok=True)
+                        shutil.move(path, target)
+                    else:
+                        os.remove(path)
+                except FileNotFoundError:
+                    continue
+                prune_empty_dirs(root, name)
+            top = name.split("/", 1)[0] if "/" in name else "."
+            files[top] += 1
+            sizes[top] += size
+    return files, sizes
@@ -0,0 +1,195 @@
+# admissionapp/media_layout.py
+"""
+Upload names that need no exists() probing and keep directories small.
+
+Uploads used to land in one directory per user, course or kind
+(profile_pics/<username>/, uploads/<username>/<client filename>,
+course_bg/<code>/<client filename>, citizenship/). Client filenames
+collide, so Django's storage probed exists() and retried with a suffix,
+and citizenship/ grew by one entry per student. Every upload_to in
+models.py now returns
+
+    <prefix>/<aa>/<bb>/<32 hex uuid><ext>
+
+where aa/bb are the uuid's first four hex digits. That gives 65,536 leaf
+directories per prefix, filled evenly, and names that never collide in
+practice. FanoutStorage (profile and course pictures) does not probe
+these names. If the O_EXCL create in FileSystemStorage ever does find the
+name taken, get_available_name() draws a new uuid. Documents stored
+content-addressed (document_storage.py) already fan out by hash.
+
+``python manage.py relocate_media`` moves files stored under the old
+layout.
+"""
+import logging
+import os
+import re
+import shutil
+import uuid
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+from .document_storage import DOCUMENT_PREFIX, ContentAddressedStorage, is_bucket_name
+from .media_gc import prune_empty_dirs, still_referenced
+from .renditions import RENDITION_PREFIX
+
+
+logger = logging.getLogger(__name__)
+
+_FANOUT = re.compile(r"^([^/]+)/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{32}(\.\w+)?$")
+
+# (model, field, prefix) of every upload field, for relocate_media
+UPLOAD_FIELDS = (
+    ("PersonalInfo", "profile_pic", "profile_pics"),
+    ("PersonalInfo", "ctz_file", "citizenship"),
+    ("EducationalInfo", "upload_transcript1", "uploads"),
+    ("EducationalInfo", "upload_transcript2", "uploads"),
+    ("EducationalInfo", "upload_character", "uploads"),
+    ("EducationalInfo", "upload_license", "uploads"),
+    ("EducationalInfo", "upload_other", "uploads"),
+    ("EducationalInfo", "upload_other1", "uploads"),
+    ("CourseDetails", "bg_pic", "course_bg"),
+)
+
+
+def fanout_name(prefix, filename):
+    """A new ``<prefix>/<aa>/<bb>/<uuid><ext>`` name keeping ``filename``'s extension."""
+    ext = os.path.splitext(filename)[1].lower()
+    uid = uuid.uuid4().hex
+    return f"{prefix}/{uid[:2]}/{uid[2:4]}/{uid}{ext}"
+
+
+def is_fanout_name(name):
+    return bool(_FANOUT.match(name or ""))
+
+
+class FanoutStorage(FileSystemStorage):
+    """
+    FileSystemStorage that draws a new uuid for a fan-out name instead of
+    probing exists() and appending suffixes. Other names behave as usual.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        match = _FANOUT.match(name)
+        if match is None:
+            return super().get_available_name(name, max_length)
+        return fanout_name(match.group(1), name)
+
+
+# -----------------------------
+# Relocating the old layout
+# -----------------------------
+def is_relocated(storage, name):
+    if isinstance(storage, ContentAddressedStorage):
+        # Direct uploads stay where they are, in the bucket.
+        return name.startswith(DOCUMENT_PREFIX + "/") or is_bucket_name(name)
+    return is_fanout_name(name)
+
+
+def _link(storage, source, target):
+    """Make ``target`` the same file as ``source``; False when ``target`` exists."""
+    path = storage.path(target)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        os.link(storage.path(source), path)
+    except FileExistsError:
+        return False
+    except OSError:  # no hard links here (other filesystem, ...)
+        shutil.copy2(storage.path(source), path)
+    return True
+
+
+def _move_renditions(storage, old, new):
+    # Renditions are keyed by the source name; moving them saves a rebuild.
+    source = storage.path(f"{RENDITION_PREFIX}/{old}")
+    if os.path.isdir(source):
+        target = storage.path(f"{RENDITION_PREFIX}/{new}")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.rename(source, target)
+        except OSError:
+            logger.warning("Could not move renditions of %s", old, exc_info=True)
+        else:
+            prune_empty_dirs(storage.location, f"{RENDITION_PREFIX}/{old}")
+
+
+def _delete_later(storage, name):
+    def delete():
+        if still_referenced([name]):  # another record stored the same name
+            return
+        try:
+            storage.delete(name)
+        except OSError:
+            logger.warning("Could not delete relocated file %s", name, exc_info=True)
+        else:
+            prune_empty_dirs(storage.location, name)
+
+    transaction.on_commit(delete)
+
+
+def relocate_file(instance, field_name, prefix):
+    """
+    Move one stored file of ``instance`` into the current layout and save
+    the new name (signals run, so refcounts, Document rows and the change
+    feed follow). The old file is removed once the save commits, unless
+    another record still names it.
+    Returns the new name, or None when the file is missing.
+    """
+    value = getattr(instance, field_name)
+    storage, old = value.storage, value.name
+    if not storage.exists(old):
+        return None
+
+    if isinstance(storage, ContentAddressedStorage):
+        # Legacy documents join the content-addressed store (and its GC).
+        with storage.open(old) as content:
+            new = storage.save(old, File(content, name=os.path.basename(old)))
+    else:
+        new = fanout_name(prefix, old)
+        while not _link(storage, old, new):
+            new = fanout_name(prefix, old)
+        _move_renditions(storage, old, new)
+
+    with transaction.atomic():
+        setattr(instance, field_name, new)
+        instance.save(update_fields=[field_name])
+        _delete_later(storage, old)
+    return new
+
+
+def relocate_media(dry_run=False, batch_size=200):
+    """
+    Relocate every file of UPLOAD_FIELDS stored under the old layout.
+    Returns {"relocated", "missing", "skipped"} counts; files in storages
+    that are not local (a documents bucket) are skipped.
+    """
+    counts = {"relocated": 0, "missing": 0, "skipped": 0}
+    for model_name, field_name, prefix in UPLOAD_FIELDS:
+        model = apps.get_model("admissionapp", model_name)
+        storage = model._meta.get_field(field_name).storage
+        rows = (
+            model._default_manager.exclude(**{field_name: ""})
+            .exclude(**{f"{field_name}__isnull": True})
+            .values_list("pk", field_name)
+            .order_by("pk")
+        )
+        pending = [
+            pk for pk, name in rows.iterator(chunk_size=2000)
+            if not is_relocated(storage, name)
+        ]
+        if not isinstance(storage, FileSystemStorage):
+            counts["skipped"] += len(pending)
+            continue
+        if dry_run:
+            counts["relocated"] += len(pending)
+            continue
+        for start in range(0, len(pending), batch_size):
+            for instance in model._default_manager.filter(pk__in=pending[start:start + batch_size]):
+                if relocate_file(instance, field_name, prefix) is None:
+                    counts["missing"] += 1
+                else:
+                    counts["relocated"] += 1
+    return counts
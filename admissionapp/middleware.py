@@ -0,0 +1,46 @@
+# admissionapp/middleware.py
+import json
+import threading
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import reverse
+from django.utils import timezone
+
+
+class PaymentCallbackRecorderMiddleware:
+    """
+    Append every eSewa/Khalti callback query string to a JSONL file so real
+    traffic can be replayed with ``bench_payment_callbacks --replay``.
+    Disabled unless settings.PAYMENT_CALLBACK_RECORD_PATH is set.
+    """
+
+    def __init__(self, get_response):
+        self.path = getattr(settings, "PAYMENT_CALLBACK_RECORD_PATH", None)
+        if not self.path:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self._lock = threading.Lock()
+        self._gateways = None
+
+    def _callback_paths(self):
+        if self._gateways is None:
+            self._gateways = {
+                reverse("esewa_success"): "esewa",
+                reverse("khalti_return"): "khalti",
+            }
+        return self._gateways
+
+    def __call__(self, request):
+        gateway = self._callback_paths().get(request.path)
+        if gateway and request.method == "GET":
+            entry = {
+                "gateway": gateway,
+                "path": request.path,
+                "query": request.META.get("QUERY_STRING", ""),
+                "recorded_at": timezone.now().isoformat(),
+            }
+            with self._lock:
+                with open(self.path, "a") as fh:
+                    fh.write(json.dumps(entry) + "\n")
+        return self.get_response(request)
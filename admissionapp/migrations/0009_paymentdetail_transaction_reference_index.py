@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissionapp', '0008_alter_coursedetails_bg_pic_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paymentdetail',
+            name='transaction_reference',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+    ]
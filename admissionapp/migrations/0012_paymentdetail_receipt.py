@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissionapp', '0011_changelogentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentdetail',
+            name='receipt',
+            field=models.FileField(blank=True, editable=False, upload_to='receipts/%Y/%m/'),
+        ),
+    ]
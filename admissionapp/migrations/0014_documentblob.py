@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:49
+
+import admissionapp.document_storage
+import admissionapp.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissionapp', '0013_chunkedupload'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='educationalinfo',
+            name='upload_character',
+            field=models.FileField(help_text='(pdf or jpg)', storage=admissionapp.document_storage.ContentAddressedStorage(), upload_to=admissionapp.models.educational_document_path, validators=[admissionapp.models.validate_file_extensions, admissionapp.models.validate_file_size, admissionapp.models.validate_file_content]),
+        ),
+        migrations.AlterField(
+            model_name='educationalinfo',
+            name='upload_license',
+            field=models.FileField(blank=True, help_text='(pdf or jpg)', storage=admissionapp.document_storage.ContentAddressedStorage(), upload_to=admissionapp.models.educational_document_path, validators=[admissionapp.models.validate_file_extensions, admissionapp.models.validate_file_size, admissionapp.models.validate_file_content]),
+        ),
+        migrations.AlterField(
+            model_name='educationalinfo',
+            name='upload_other',
+            field=models.FileField(blank=True, help_text='(pdf or jpg)', storage=admissionapp.document_storage.ContentAddressedStorage(), upload_to=admissionapp.models.educational_document_path, validators=[admissionapp.models.validate_file_extensions, admissionapp.models.validate_file_size, admissionapp.models.validate_file_content]),
+        ),
+        migrations.AlterField(
+            model_name='educationalinfo',
+            name='upload_other1',
+            field=models.FileField(blank=True, help_text='(pdf or jpg)', storage=admissionapp.document_storage.ContentAddressedStorage(), upload_to=admissionapp.models.educational_document_path, validators=[admissionapp.models.validate_file_extensions, admissionapp.models.validate_file_size, admissionapp.models.validate_file_content]),
+        ),
+        migrations.AlterField(
+            model_name='educationalinfo',
+            name='upload_transcript1',
+            field=models.FileField(help_text='(pdf or jpg)', storage=admissionapp.document_storage.ContentAddressedStorage(), upload_to=admissionapp.models.educational_document_path, validators=[admissionapp.models.validate_file_extensions, admissionapp.models.validate_file_size, admissionapp.models.validate_file_content]),
+        ),
+        migrations.AlterField(
+            model_name='educationalinfo',
+            name='upload_transcript2',
+            field=models.FileField(blank=True, help_text='(pdf or jpg)', null=True, storage=admissionapp.document_storage.ContentAddressedStorage(), upload_to=admissionapp.models.educational_document_path, validators=[admissionapp.models.validate_file_extensions, admissionapp.models.validate_file_size, admissionapp.models.validate_file_content]),
+        ),
+        migrations.AlterField(
+            model_name='personalinfo',
+            name='ctz_file',
+            field=models.FileField(blank=True, null=True, storage=admissionapp.document_storage.ContentAddressedStorage(), upload_to='citizenship/', validators=[admissionapp.models.validate_file_extensions, admissionapp.models.validate_file_size, admissionapp.models.validate_file_content]),
+        ),
+        migrations.CreateModel(
+            name='DocumentBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveBigIntegerField()),
+                ('ref_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ref_count', 'updated_at'], name='docblob_gc_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:55
+
+import admissionapp.document_storage
+import admissionapp.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissionapp', '0015_image_dimension_validators'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='educationalinfo',
+            name='upload_character',
+            field=models.FileField(help_text='(pdf or jpg)', storage=admissionapp.document_storage.get_document_storage, upload_to=admissionapp.models.educational_document_path, validators=[admissionapp.models.validate_file_extensions, admissionapp.models.validate_file_size, admissionapp.models.validate_file_content]),
+        ),
+        migrations.AlterField(
+            model_name='educationalinfo',
+            name='upload_license',
+            field=models.FileField(blank=True, help_text='(pdf or jpg)', storage=admissionapp.document_storage.get_document_storage, upload_to=admissionapp.models.educational_document_path, validators=[admissionapp.models.validate_file_extensions, admissionapp.models.validate_file_size, admissionapp.models.validate_file_content]),
+        ),
+        migrations.AlterField(
+            model_name='educationalinfo',
+            name='upload_other',
+            field=models.FileField(blank=True, help_text='(pdf or jpg)', storage=admissionapp.document_storage.get_document_storage, upload_to=admissionapp.models.educational_document_path, validators=[admissionapp.models.validate_file_extensions, admissionapp.models.validate_file_size, admissionapp.models.validate_file_content]),
+        ),
+        migrations.AlterField(
+            model_name='educationalinfo',
+            name='upload_other1',
+            field=models.FileField(blank=True, help_text='(pdf or jpg)', storage=admissionapp.document_storage.get_document_storage, upload_to=admissionapp.models.educational_document_path, validators=[admissionapp.models.validate_file_extensions, admissionapp.models.validate_file_size, admissionapp.models.validate_file_content]),
+        ),
+        migrations.AlterField(
+            model_name='educationalinfo',
+            name='upload_transcript1',
+            field=models.FileField(help_text='(pdf or jpg)', storage=admissionapp.document_storage.get_document_storage, upload_to=admissionapp.models.educational_document_path, validators=[admissionapp.models.validate_file_extensions, admissionapp.models.validate_file_size, admissionapp.models.validate_file_content]),
+        ),
+        migrations.AlterField(
+            model_name='educationalinfo',
+            name='upload_transcript2',
+            field=models.FileField(blank=True, help_text='(pdf or jpg)', null=True, storage=admissionapp.document_storage.get_document_storage, upload_to=admissionapp.models.educational_document_path, validators=[admissionapp.models.validate_file_extensions, admissionapp.models.validate_file_size, admissionapp.models.validate_file_content]),
+        ),
+        migrations.AlterField(
+            model_name='personalinfo',
+            name='ctz_file',
+            field=models.FileField(blank=True, null=True, storage=admissionapp.document_storage.get_document_storage, upload_to='citizenship/', validators=[admissionapp.models.validate_file_extensions, admissionapp.models.validate_file_size, admissionapp.models.validate_file_content]),
+        ),
+    ]
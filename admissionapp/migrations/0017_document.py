@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissionapp', '0016_document_storage_callable'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Document',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('profile_pic', 'Profile Picture'), ('citizenship', 'Citizenship'), ('transcript1', 'Transcript 1'), ('transcript2', 'Transcript 2'), ('character', 'Character Certificate'), ('license', 'License'), ('other', 'Other Document'), ('other1', 'Other Document 1')], max_length=20)),
+                ('storage_key', models.CharField(db_index=True, max_length=255)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('mime', models.CharField(blank=True, max_length=100)),
+                ('sha256', models.CharField(blank=True, max_length=64)),
+                ('page_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('educational_info', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='documents', to='admissionapp.educationalinfo')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='documents', to=settings.AUTH_USER_MODEL)),
+                ('personal_info', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='documents', to='admissionapp.personalinfo')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('personal_info__isnull', False)), fields=('personal_info', 'kind'), name='uniq_personal_document_kind'), models.UniqueConstraint(condition=models.Q(('educational_info__isnull', False)), fields=('educational_info', 'kind'), name='uniq_educational_document_kind')],
+            },
+        ),
+    ]
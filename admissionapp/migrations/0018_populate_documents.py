@@ -0,0 +1,76 @@
+import mimetypes
+import re
+
+from django.db import migrations
+
+
+PERSONAL_KINDS = (("profile_pic", "profile_pic"), ("ctz_file", "citizenship"))
+EDUCATIONAL_KINDS = (
+    ("upload_transcript1", "transcript1"),
+    ("upload_transcript2", "transcript2"),
+    ("upload_character", "character"),
+    ("upload_license", "license"),
+    ("upload_other", "other"),
+    ("upload_other1", "other1"),
+)
+BATCH_SIZE = 500
+
+# documents/aa/bb/<sha256><ext>, as named by the content-addressed storage.
+_BLOB_DIGEST = re.compile(r"^documents/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})(\.\w+)?$")
+
+
+def _described_by_name(name):
+    """
+    What the name alone tells about a file. Nothing is opened here: size,
+    digests and page counts are filled in by ``manage.py sync_documents``.
+    """
+    match = _BLOB_DIGEST.match(name)
+    return {
+        "size": 0,
+        "mime": mimetypes.guess_type(name)[0] or "",
+        "sha256": match.group(1) if match else "",
+        "page_count": None,
+    }
+
+
+def _documents(Document, model, kinds, source_fk):
+    """Document rows describing every file already stored in ``model``."""
+    fields = [field for field, _ in kinds]
+    rows = model.objects.values_list("pk", "user_id", *fields).iterator(chunk_size=BATCH_SIZE)
+    for pk, user_id, *names in rows:
+        for (_, kind), name in zip(kinds, names):
+            if name:
+                yield Document(
+                    owner_id=user_id,
+                    kind=kind,
+                    storage_key=name,
+                    **{f"{source_fk}_id": pk},
+                    **_described_by_name(name),
+                )
+
+
+def populate_documents(apps, schema_editor):
+    Document = apps.get_model("admissionapp", "Document")
+    sources = (
+        (apps.get_model("admissionapp", "PersonalInfo"), PERSONAL_KINDS, "personal_info"),
+        (apps.get_model("admissionapp", "EducationalInfo"), EDUCATIONAL_KINDS, "educational_info"),
+    )
+    for model, kinds, source_fk in sources:
+        batch = []
+        for document in _documents(Document, model, kinds, source_fk):
+            batch.append(document)
+            if len(batch) >= BATCH_SIZE:
+                Document.objects.bulk_create(batch)
+                batch = []
+        Document.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("admissionapp", "0017_document"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_documents, migrations.RunPython.noop),
+    ]
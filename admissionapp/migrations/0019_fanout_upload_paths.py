@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:04
+
+import admissionapp.document_storage
+import admissionapp.media_layout
+import admissionapp.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissionapp', '0018_populate_documents'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='coursedetails',
+            name='bg_pic',
+            field=models.ImageField(blank=True, help_text='Upload a background image for the course', null=True, storage=admissionapp.media_layout.FanoutStorage(), upload_to=admissionapp.models.course_bg_upload_path, validators=[admissionapp.models.validate_image_dimensions], verbose_name='Background Picture'),
+        ),
+        migrations.AlterField(
+            model_name='personalinfo',
+            name='ctz_file',
+            field=models.FileField(blank=True, null=True, storage=admissionapp.document_storage.get_document_storage, upload_to=admissionapp.models.citizenship_document_path, validators=[admissionapp.models.validate_file_extensions, admissionapp.models.validate_file_size, admissionapp.models.validate_file_content]),
+        ),
+        migrations.AlterField(
+            model_name='personalinfo',
+            name='profile_pic',
+            field=models.ImageField(blank=True, null=True, storage=admissionapp.media_layout.FanoutStorage(), upload_to=admissionapp.models.user_profile_pics, validators=[admissionapp.models.validate_file_extensions, admissionapp.models.validate_file_size, admissionapp.models.validate_image_dimensions]),
+        ),
+    ]
@@ -7,13 +7,17 @@ from django.core.validators import (
     MaxValueValidator,
 )
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from decimal import Decimal  # noqa: F401
 import os
 import uuid
 import mimetypes
-import re
 from django.conf import settings
 
+from .document_storage import get_document_storage
+from .images import ImageRejected, checked_image_header
+from .media_layout import FanoutStorage, fanout_name
+
 # Try python-magic; fall back gracefully if not present or libmagic is missing
 try:
     import magic  # type: ignore
@@ -33,46 +37,85 @@ def validate_file_extensions(value):
         raise ValidationError("Only supports: jpg, jpeg, png, bmp and pdf files")
 
 
-def _safe_username(instance):
-    username = getattr(getattr(instance, "user", None), "username", "") or getattr(
-        instance, "username", "anon"
-    )
-    return re.sub(r"[^a-zA-Z0-9_.-]", "_", username)
-
-
 def user_profile_pics(instance, filename):
     """
-    Profile images -> profile_pics/<username>/<username>_<uid>.<ext>
+    Profile images -> profile_pics/<aa>/<bb>/<uuid>.<ext> (see media_layout.py)
     """
-    _, ext = os.path.splitext(filename)
-    ext = ext.lower() or ".bin"
-    uname = _safe_username(instance)
-    uid = uuid.uuid4().hex[:8]
-    return os.path.join("profile_pics", uname, f"{uname}_{uid}{ext}")
+    return fanout_name("profile_pics", filename)
+
+
+def citizenship_document_path(instance, filename):
+    """Citizenship documents -> citizenship/<aa>/<bb>/<uuid>.<ext>"""
+    return fanout_name("citizenship", filename)
+
+
+MAX_UPLOAD_SIZE = 100 * 1024 * 1024
+
+# (field name, label) of the uploaded document fields of PersonalInfo and
+# EducationalInfo; the label names the file in document archives.
+PERSONAL_FILE_FIELDS = (("profile_pic", "profile_pic"), ("ctz_file", "citizenship"))
+EDUCATIONAL_FILE_FIELDS = (
+    ("upload_transcript1", "transcript1"),
+    ("upload_transcript2", "transcript2"),
+    ("upload_character", "character"),
+    ("upload_license", "license"),
+    ("upload_other", "other"),
+    ("upload_other1", "other1"),
+)
 
 
 def validate_file_size(value):
     """Validate file size is not greater than 100 MB."""
-    max_size = 100 * 1024 * 1024
+    max_size = MAX_UPLOAD_SIZE
     if value.size > max_size:
         raise ValidationError("File size must be equal or less than 100 MB.")
 
 
+# Leading bytes of the accepted formats, used when python-magic is missing.
+_FILE_SIGNATURES = (
+    (b"%PDF-", "application/pdf"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+
+
+def sniff_mime_type(head):
+    """
+    MIME type from the first bytes of a file: python-magic if available,
+    else the signatures of the accepted formats. None when unknown.
+    """
+    if _MAGIC:
+        try:
+            return _MAGIC.from_buffer(head) or None
+        except Exception:  # noqa: BLE001
+            pass
+    for signature, mime_type in _FILE_SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    return None
+
+
+def is_accepted_mime_type(mime_type):
+    return bool(mime_type) and (
+        mime_type.startswith("image/") or mime_type == "application/pdf"
+    )
+
+
 def validate_file_content(value):
     """
-    Validate by MIME sniffing (python-magic if available),
-    else fall back to UploadedFile.content_type or mimetypes guess.
+    Validate by MIME sniffing (python-magic if available, else known file
+    signatures), else fall back to UploadedFile.content_type or mimetypes
+    guess. Uploads inspected by upload_handlers.py arrive already sniffed.
     """
-    mime_type = None
+    mime_type = getattr(value, "sniffed_content_type", None)
 
-    # Best-effort sniff with python-magic
-    if _MAGIC:
+    if not mime_type:
         head = value.read(2048)
         value.seek(0)
-        try:
-            mime_type = _MAGIC.from_buffer(head) or None
-        except Exception:  # noqa: BLE001
-            mime_type = None
+        mime_type = sniff_mime_type(head)
 
     # Fallbacks
     if not mime_type and hasattr(value, "content_type"):
@@ -80,12 +123,21 @@ def validate_file_content(value):
     if not mime_type:
         mime_type = mimetypes.guess_type(value.name)[0]
 
-    if not mime_type or not (
-        mime_type.startswith("image/") or mime_type == "application/pdf"
-    ):
+    if not is_accepted_mime_type(mime_type):
         raise ValidationError("Only images and PDFs are allowed.")
 
 
+def validate_image_dimensions(value):
+    """
+    Reject pictures whose header declares more than IMAGE_MAX_SIDE /
+    IMAGE_MAX_PIXELS, before anything decodes them (see images.py).
+    """
+    try:
+        checked_image_header(value)
+    except ImageRejected as e:
+        raise ValidationError(str(e))
+
+
 phone_regax = RegexValidator(
     regex=r"^\d{10}$",
     message="Phone Number must be 10 digits long.",
@@ -148,12 +200,18 @@ class PersonalInfo(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     profile_pic = models.ImageField(
         upload_to=user_profile_pics,
-        validators=[validate_file_extensions, validate_file_size],
+        storage=FanoutStorage(),
+        validators=[
+            validate_file_extensions,
+            validate_file_size,
+            validate_image_dimensions,
+        ],
         blank=True,
         null=True,
     )
     ctz_file = models.FileField(
-        upload_to="citizenship/",
+        upload_to=citizenship_document_path,
+        storage=get_document_storage,
         validators=[
             validate_file_extensions,
             validate_file_size,
@@ -171,8 +229,12 @@ class PersonalInfo(models.Model):
 # Educational Details
 # ------------------------------------
 def educational_document_path(instance, filename):
-    """Generate upload path for educational documents."""
-    return f"uploads/{instance.user.username}/{filename}"
+    """
+    Generate upload path for educational documents. Locally only the
+    extension is kept: get_document_storage() stores them under their
+    content hash.
+    """
+    return fanout_name("uploads", filename)
 
 
 class EducationalInfo(models.Model):
@@ -225,6 +287,7 @@ class EducationalInfo(models.Model):
     )
     upload_transcript1 = models.FileField(
         upload_to=educational_document_path,
+        storage=get_document_storage,
         validators=[
             validate_file_extensions,
             validate_file_size,
@@ -234,6 +297,7 @@ class EducationalInfo(models.Model):
     )
     upload_transcript2 = models.FileField(
         upload_to=educational_document_path,
+        storage=get_document_storage,
         validators=[
             validate_file_extensions,
             validate_file_size,
@@ -245,6 +309,7 @@ class EducationalInfo(models.Model):
     )
     upload_character = models.FileField(
         upload_to=educational_document_path,
+        storage=get_document_storage,
         validators=[
             validate_file_extensions,
             validate_file_size,
@@ -254,6 +319,7 @@ class EducationalInfo(models.Model):
     )
     upload_license = models.FileField(
         upload_to=educational_document_path,
+        storage=get_document_storage,
         validators=[
             validate_file_extensions,
             validate_file_size,
@@ -264,6 +330,7 @@ class EducationalInfo(models.Model):
     )
     upload_other = models.FileField(
         upload_to=educational_document_path,
+        storage=get_document_storage,
         validators=[
             validate_file_extensions,
             validate_file_size,
@@ -274,6 +341,7 @@ class EducationalInfo(models.Model):
     )
     upload_other1 = models.FileField(
         upload_to=educational_document_path,
+        storage=get_document_storage,
         validators=[
             validate_file_extensions,
             validate_file_size,
@@ -311,7 +379,7 @@ class Notification(models.Model):
 # ------------------------------------
 def course_bg_upload_path(instance, filename):
     """Generate upload path for course background images."""
-    return f"course_bg/{instance.course_code}/{filename}"
+    return fanout_name("course_bg", filename)
 
 
 class CourseDetails(models.Model):
@@ -350,6 +418,8 @@ class CourseDetails(models.Model):
     )
     bg_pic = models.ImageField(
         upload_to=course_bg_upload_path,
+        storage=FanoutStorage(),
+        validators=[validate_image_dimensions],
         blank=True,
         null=True,
         help_text="Upload a background image for the course",
@@ -462,7 +532,9 @@ class PaymentDetail(models.Model):
 
     # eSewa essentials
     transaction_uuid = models.CharField(max_length=64, unique=True)
-    transaction_reference = models.CharField(max_length=64, null=True, blank=True)
+    transaction_reference = models.CharField(
+        max_length=64, null=True, blank=True, db_index=True
+    )
     product_code = models.CharField(max_length=64, blank=True)  # e.g. EPAYTEST (sandbox)
     status = models.CharField(max_length=16, choices=STATUS_CHOICES, default="INITIATED")
     payment_method = models.CharField(
@@ -473,6 +545,10 @@ class PaymentDetail(models.Model):
     payment_date = models.DateTimeField(auto_now_add=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True) 
+    # Written once by receipts.build_receipt() (build_payment_receipts
+    # worker, from a ReceiptJob) after the payment completes;
+    # never regenerated, so it can be served with immutable cache headers.
+    receipt = models.FileField(upload_to="receipts/%Y/%m/", blank=True, editable=False)
     
     class Meta:
         constraints = [
@@ -483,4 +559,321 @@ class PaymentDetail(models.Model):
 
     def __str__(self):
         return f"{self.transaction_uuid} • {self.status}"    
-    
\ No newline at end of file
+    
+
+#----------------------------------------
+# Pending Payment Receipts
+#----------------------------------------
+class ReceiptJob(models.Model):
+    """
+    A receipt to render for a payment that reached COMPLETE. Queued in the
+    callback's transaction and drained by ``build_payment_receipts``; the
+    row is deleted once the receipt is stored. A RUNNING job is leased to
+    its worker through ``claimed_at`` (see receipts.py).
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (FAILED, "Failed"),
+    ]
+
+    payment = models.OneToOneField(
+        PaymentDetail, on_delete=models.CASCADE, related_name="receipt_job"
+    )
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=QUEUED, db_index=True
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"receipt of payment {self.payment_id} • {self.status}"
+
+
+class RenditionJob(models.Model):
+    """
+    Renditions to build for a stored picture (see renditions.py). Queued in
+    the transaction saving the picture, or by a template showing one whose
+    renditions are missing, and drained by ``build_renditions --queued``;
+    the row is deleted once the files are written.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (FAILED, "Failed"),
+    ]
+
+    source = models.CharField(max_length=255, unique=True)
+    presets = models.CharField(max_length=100)
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=QUEUED, db_index=True
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"renditions of {self.source} • {self.status}"
+
+
+#----------------------------------------
+# Background Export Jobs
+#----------------------------------------
+class ExportJob(models.Model):
+    """
+    An export queued by an admin and built by the ``run_export_worker``
+    management command. The finished file lives under MEDIA_ROOT/exports/
+    until ``expires_at``. A RUNNING job is leased to its worker through
+    ``heartbeat_at``; ``attempts`` counts the claims (see export_jobs.py).
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    EXPIRED = "expired"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+        (EXPIRED, "Expired"),
+    ]
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="export_jobs",
+    )
+    export = models.CharField(max_length=32)
+    export_format = models.CharField(max_length=16)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=QUEUED, db_index=True
+    )
+    rows_written = models.PositiveIntegerField(default=0)
+    rows_total = models.PositiveIntegerField(null=True, blank=True)
+    file = models.FileField(upload_to="exports/%Y/%m/", blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    @property
+    def percent(self):
+        if self.status == self.DONE:
+            return 100
+        if not self.rows_total:
+            return 0
+        return min(100, int(self.rows_written * 100 / self.rows_total))
+
+    def __str__(self):
+        return f"{self.export}.{self.export_format} • {self.status}"
+
+
+#----------------------------------------
+# Change Log (change-data-capture feed)
+#----------------------------------------
+class ChangeLogEntry(models.Model):
+    """
+    One change to a tracked model, written in the change's own transaction
+    (see signals.py). ``id`` is the feed watermark: consumers ask for
+    everything after the last id they saw (see change_feed.py for why ids
+    are only handed out once settled).
+    """
+
+    OPERATION_CHOICES = [
+        ("create", "Create"),
+        ("update", "Update"),
+        ("delete", "Delete"),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=64)
+    object_pk = models.CharField(max_length=64)
+    operation = models.CharField(max_length=8, choices=OPERATION_CHOICES)
+    payload = models.JSONField(encoder=DjangoJSONEncoder, default=dict)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["model", "id"], name="changelog_model_id_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.operation} {self.model}:{self.object_pk}"
+
+
+#----------------------------------------
+# Resumable (chunked) uploads
+#----------------------------------------
+class ChunkedUpload(models.Model):
+    """
+    A document being uploaded in pieces through the uploads/ endpoints (see
+    chunked_uploads.py). Chunks are kept under CHUNKED_UPLOAD_DIR/<id>/
+    until the upload is finalized; a form then attaches the assembled file
+    to a model field by sending the upload id instead of the bytes.
+    """
+
+    UPLOADING = "uploading"
+    ASSEMBLING = "assembling"
+    COMPLETE = "complete"
+    STATUS_CHOICES = [
+        (UPLOADING, "Uploading"),
+        (ASSEMBLING, "Assembling"),
+        (COMPLETE, "Complete"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="chunked_uploads",
+    )
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=UPLOADING)
+    content_type = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.filename} • {self.offset}/{self.size}"
+
+
+#----------------------------------------
+# Content-addressed documents
+#----------------------------------------
+class DocumentBlob(models.Model):
+    """
+    One distinct file in ContentAddressedStorage, named after its SHA-256.
+    ``ref_count`` is the number of model fields referencing it; blobs left
+    at zero are removed by ``python manage.py gc_documents``.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["ref_count", "updated_at"], name="docblob_gc_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} ref)"
+
+
+#----------------------------------------
+# Uploaded documents
+#----------------------------------------
+class Document(models.Model):
+    """
+    One file stored in a PersonalInfo or EducationalInfo file field, with
+    what pages need to show it (size, type, pages) so they never open the
+    file. Kept in step with the fields by documents.py; the fields remain
+    the source of truth.
+    """
+
+    PROFILE_PIC = "profile_pic"
+    CITIZENSHIP = "citizenship"
+    KIND_CHOICES = [
+        (PROFILE_PIC, "Profile Picture"),
+        (CITIZENSHIP, "Citizenship"),
+        ("transcript1", "Transcript 1"),
+        ("transcript2", "Transcript 2"),
+        ("character", "Character Certificate"),
+        ("license", "License"),
+        ("other", "Other Document"),
+        ("other1", "Other Document 1"),
+    ]
+    # kind -> model field holding the file
+    FIELD_NAMES = {
+        PROFILE_PIC: "profile_pic",
+        CITIZENSHIP: "ctz_file",
+        "transcript1": "upload_transcript1",
+        "transcript2": "upload_transcript2",
+        "character": "upload_character",
+        "license": "upload_license",
+        "other": "upload_other",
+        "other1": "upload_other1",
+    }
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="documents",
+    )
+    personal_info = models.ForeignKey(
+        PersonalInfo,
+        on_delete=models.CASCADE,
+        related_name="documents",
+        null=True,
+        blank=True,
+    )
+    educational_info = models.ForeignKey(
+        EducationalInfo,
+        on_delete=models.CASCADE,
+        related_name="documents",
+        null=True,
+        blank=True,
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    storage_key = models.CharField(max_length=255, db_index=True)
+    size = models.PositiveBigIntegerField(default=0)
+    mime = models.CharField(max_length=100, blank=True)
+    sha256 = models.CharField(max_length=64, blank=True)
+    page_count = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=["personal_info", "kind"],
+                condition=models.Q(personal_info__isnull=False),
+                name="uniq_personal_document_kind",
+            ),
+            UniqueConstraint(
+                fields=["educational_info", "kind"],
+                condition=models.Q(educational_info__isnull=False),
+                name="uniq_educational_document_kind",
+            ),
+        ]
+
+    @property
+    def field(self):
+        model = PersonalInfo if self.personal_info_id else EducationalInfo
+        return model._meta.get_field(self.FIELD_NAMES[self.kind])
+
+    @property
+    def url(self):
+        return self.field.storage.url(self.storage_key)
+
+    @property
+    def is_pdf(self):
+        return self.mime == "application/pdf"
+
+    def __str__(self):
+        return f"{self.owner_id} {self.kind}: {self.storage_key}"
@@ -0,0 +1,190 @@
+# admissionapp/offer_letters.py
+"""
+Offer letters for approved applications.
+
+Every letter carries a verification code
+
+    <application_no>.<approved on, YYYYMMDD>.<HMAC>
+
+where the HMAC is the same HMAC-SHA256 + base64 construction as the eSewa
+signature (payments/esewa.py), over a "key=value" CSV payload, truncated
+to OFFER_CODE_MAC_LENGTH URL-safe characters. verify_offer_code() checks
+the code from the string alone, so a forged or mistyped code is rejected
+without touching the database; only a correctly signed code is looked up,
+to confirm the application is still approved on that date (a letter stops
+verifying if the application is later rejected or re-approved).
+
+Codes are deterministic, so regenerating a batch reissues identical codes.
+"""
+import hmac
+import re
+from datetime import datetime
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table
+
+from .dossier_pdf import INFO_TABLE_STYLE, SECTION_STYLE, STYLES, TITLE_STYLE
+from .models import Application
+from .payments.esewa import hmac_sha256_b64
+
+
+OFFER_CODE_MAC_LENGTH = 20  # 120 bits
+OFFER_LETTER_BATCH_SIZE = 500
+
+_OFFER_CODE_RE = re.compile(
+    r"^(?P<application_no>[A-Za-z0-9-]{1,15})\.(?P<approved_on>\d{8})\."
+    r"(?P<mac>[A-Za-z0-9_-]{%d})$" % OFFER_CODE_MAC_LENGTH
+)
+
+LETTER_FIELDS = (
+    "application_no",
+    "user__first_name",
+    "user__last_name",
+    "user__username",
+    "course__degree",
+    "course__course_name",
+    "approved_rejected_date",
+)
+
+BODY_STYLE = ParagraphStyle(
+    'OfferBody',
+    parent=STYLES['Normal'],
+    fontSize=11,
+    leading=16,
+    spaceAfter=10,
+)
+
+
+def _signing_key():
+    return settings.OFFER_LETTER_SIGNING_KEY or settings.SECRET_KEY
+
+
+def _offer_mac(application_no, approved_on):
+    # Exactly this order & CSV of "key=value", like the eSewa signature
+    payload = (
+        f"purpose=offer_letter,application_no={application_no},"
+        f"approved_on={approved_on:%Y-%m-%d}"
+    )
+    return hmac_sha256_b64(_signing_key(), payload, urlsafe=True)[:OFFER_CODE_MAC_LENGTH]
+
+
+def approved_on(approved_rejected_date):
+    """Local calendar date of an approval timestamp."""
+    return timezone.localdate(approved_rejected_date)
+
+
+def offer_code(application_no, approved_rejected_date):
+    on = approved_on(approved_rejected_date)
+    return f"{application_no}.{on:%Y%m%d}.{_offer_mac(application_no, on)}"
+
+
+def verify_offer_code(code):
+    """
+    (application_no, approved_on date) if ``code`` carries a valid
+    signature, else None. Pure computation, no database access.
+    """
+    match = _OFFER_CODE_RE.match((code or "").strip())
+    if not match:
+        return None
+    try:
+        on = datetime.strptime(match["approved_on"], "%Y%m%d").date()
+    except ValueError:
+        return None
+    expected = _offer_mac(match["application_no"], on)
+    if not hmac.compare_digest(expected, match["mac"]):
+        return None
+    return match["application_no"], on
+
+
+def offer_verify_path(code):
+    return reverse("verify_offer_letter", args=[code])
+
+
+def approved_applications(course_id=None):
+    qs = Application.objects.filter(
+        application_status="approved", approved_rejected_date__isnull=False
+    )
+    if course_id:
+        qs = qs.filter(course_id=course_id)
+    return qs
+
+
+def render_offer_letter(letter, code, verify_url):
+    """Offer letter PDF bytes for one row of LETTER_FIELDS (as a dict)."""
+    name = (
+        f"{letter['user__first_name'] or ''} {letter['user__last_name'] or ''}".strip()
+        or letter["user__username"]
+    )
+    on = approved_on(letter["approved_rejected_date"])
+
+    buffer = BytesIO()
+    pdf = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=56,
+        leftMargin=56,
+        topMargin=56,
+        bottomMargin=56,
+        title=f"Offer of Admission {letter['application_no']}",
+    )
+
+    elements = [
+        Paragraph("Online Admission System", TITLE_STYLE),
+        Paragraph("Offer of Admission", SECTION_STYLE),
+        Spacer(1, 10),
+        Paragraph(f"Date: {on:%d %B %Y}", BODY_STYLE),
+        Paragraph(f"Application No.: {escape(letter['application_no'])}", BODY_STYLE),
+        Spacer(1, 10),
+        Paragraph(f"Dear {escape(name)},", BODY_STYLE),
+        Paragraph(
+            "We are pleased to inform you that your application has been approved "
+            "and to offer you admission to "
+            f"<b>{escape(letter['course__degree'] or '')} - "
+            f"{escape(letter['course__course_name'] or '')}</b>.",
+            BODY_STYLE,
+        ),
+        Paragraph(
+            "Please keep this letter for enrolment. Anyone can confirm that it is "
+            "genuine with the verification code below.",
+            BODY_STYLE,
+        ),
+        Spacer(1, 10),
+        Paragraph("Admissions Team", BODY_STYLE),
+        Spacer(1, 30),
+    ]
+
+    verification = Table(
+        [['Verification code:', code], ['Verify at:', verify_url]],
+        colWidths=[1.6*inch, 4.9*inch],
+    )
+    verification.setStyle(INFO_TABLE_STYLE)
+    elements.append(verification)
+
+    pdf.build(elements)
+    return buffer.getvalue()
+
+
+def iter_offer_letters(applications, site_url, batch_size=OFFER_LETTER_BATCH_SIZE):
+    """
+    Yield (application_no, pdf bytes) for ``applications`` (see
+    approved_applications()). ``site_url`` prefixes the verification link.
+    """
+    rows = applications.order_by("application_no").values_list(*LETTER_FIELDS)
+    site_url = site_url.rstrip("/")
+    for row in rows.iterator(chunk_size=batch_size):
+        letter = dict(zip(LETTER_FIELDS, row))
+        code = offer_code(letter["application_no"], letter["approved_rejected_date"])
+        yield letter["application_no"], render_offer_letter(
+            letter, code, site_url + offer_verify_path(code)
+        )
+
+
+def offer_letters_archive_name(course=None):
+    return f"{course.course_code if course else 'all'}_offer_letters.zip"
@@ -1,8 +1,14 @@
 # admissionapp/payments/esewa.py
 import hmac, hashlib, base64
 
+def hmac_sha256_b64(secret_key: str, payload: str, *, urlsafe: bool = False) -> str:
+    # HMAC-SHA256 of the payload, base64 encoded (URL-safe without padding on request)
+    digest = hmac.new(secret_key.encode(), payload.encode(), hashlib.sha256).digest()
+    if urlsafe:
+        return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+    return base64.b64encode(digest).decode()
+
 def esewa_signature(secret_key: str, *, total_amount: str, transaction_uuid: str, product_code: str) -> str:
     # Exactly this order & CSV of "key=value"
     payload = f"total_amount={total_amount},transaction_uuid={transaction_uuid},product_code={product_code}"
-    digest = hmac.new(secret_key.encode(), payload.encode(), hashlib.sha256).digest()
-    return base64.b64encode(digest).decode()
+    return hmac_sha256_b64(secret_key, payload)
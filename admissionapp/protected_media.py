@@ -0,0 +1,237 @@
+# admissionapp/protected_media.py
+"""
+Uploaded files under MEDIA_URL, for their owner or an admin only.
+
+MEDIA_URL used to be served by django.views.static in DEBUG only, with
+no access check, and by nothing in production. Every /media/<name>
+request now goes through views.protected_media:
+
+- course backgrounds (and their renditions) are public;
+- documents and profile pictures go to their owner, found with one
+  indexed query on Document.storage_key. Renditions are checked against
+  their source picture;
+- anything else (receipts, exports, orphans) goes to admins only.
+
+Unauthorized requests get a 404, so nothing tells whether a name exists.
+Names with ".." segments, backslashes or a leading "/" are refused
+outright (clean_media_name); every check and the storage lookup use the
+normalized name, so "course_bg/../citizenship/x" can never pass as a
+course background.
+
+The transfer itself is handed to the web server when MEDIA_ACCEL says
+how:
+
+    nginx     X-Accel-Redirect: MEDIA_ACCEL_PREFIX<name>, an ``internal``
+              location aliased to MEDIA_ROOT
+    sendfile  X-Sendfile: <absolute path> (Apache mod_xsendfile, lighttpd)
+
+The server then handles sendfile(), Range and resumption itself. Without
+it, media_response() answers If-None-Match (304) and single byte ranges
+(206, with If-Range) itself. Full responses are FileResponses the WSGI
+server can send with sendfile().
+
+Direct uploads (direct/..., kept in the documents bucket) have no local
+file: their owner is redirected to a presigned GET that expires after
+DIRECT_DOWNLOAD_EXPIRES, and the bucket serves ranges itself.
+"""
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect
+from django.utils.http import http_date, parse_etags
+
+from .direct_uploads import DirectUploadError, direct_uploads_enabled, download_url
+from .document_storage import is_bucket_name
+from .models import Document, EducationalInfo, PersonalInfo
+from .renditions import RENDITION_PREFIX
+
+
+# Pictures shown to everyone (course cards on public pages).
+PUBLIC_PREFIXES = ("course_bg/",)
+PRIVATE_CACHE_CONTROL = "private, max-age=3600"
+PUBLIC_CACHE_CONTROL = "public, max-age=86400"
+STREAM_BLOCK_SIZE = 256 * 1024
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def clean_media_name(name):
+    """
+    ``name`` normalized, or None when it is absolute, has backslashes or
+    has ".." segments.
+    """
+    if not name or "\\" in name:
+        return None
+    if ".." in name.split("/"):
+        return None
+    name = posixpath.normpath(name)
+    if name == "." or posixpath.isabs(name) or ".." in name.split("/"):
+        return None
+    return name
+
+
+def source_name(name):
+    """The upload ``name`` belongs to: itself, or a rendition's source."""
+    if name.startswith(RENDITION_PREFIX + "/"):
+        return os.path.dirname(name[len(RENDITION_PREFIX) + 1:])
+    return name
+
+
+def is_public(name):
+    return source_name(name).startswith(PUBLIC_PREFIXES)
+
+
+def owns_media(user, name):
+    """
+    Whether ``user`` uploaded ``name``: one query on Document.storage_key,
+    then, for files stored without a Document row (queryset.update(), ...),
+    the user's own PersonalInfo/EducationalInfo file fields.
+    """
+    if not user.is_authenticated:
+        return False
+    name = source_name(name)
+    if Document.objects.filter(storage_key=name, owner_id=user.pk).exists():
+        return True
+    for model in (PersonalInfo, EducationalInfo):
+        query = Q()
+        for field in Document.FIELD_NAMES.values():
+            if any(f.name == field for f in model._meta.concrete_fields):
+                query |= Q(**{field: name})
+        if model.objects.filter(query, user_id=user.pk).exists():
+            return True
+    return False
+
+
+def media_etag(name, stat):
+    # Stored names are never rewritten in place; size + mtime cover the rest.
+    key = f"{name}:{stat.st_size}:{stat.st_mtime_ns}"
+    return '"%s"' % hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def _byte_range(header, size):
+    """(first, last) of a single satisfiable ``bytes=`` range, None to send
+    everything, False when unsatisfiable."""
+    match = _RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None  # multiple or malformed ranges: ignore, send it all
+    first, last = match.groups()
+    if first == "":
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first >= size or first > last:
+        return False
+    return first, last
+
+
+class _RangeReader:
+    """Reads ``length`` bytes of ``file`` from where it stands, then EOF."""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _accel_response(name, path):
+    response = HttpResponse()
+    if settings.MEDIA_ACCEL == "nginx":
+        response["X-Accel-Redirect"] = quote(settings.MEDIA_ACCEL_PREFIX + name)
+    else:
+        response["X-Sendfile"] = path
+    # The web server fills in the body, its length and ranges.
+    return response
+
+
+def media_response(request, name):
+    """
+    Response sending the stored file ``name``, a clean_media_name() result
+    (see the module docstring).
+    """
+    if is_bucket_name(name):
+        return _bucket_response(name)
+    try:
+        path = default_storage.path(name)
+        stat = os.stat(path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404("File not found")
+    if not os.path.isfile(path):
+        raise Http404("File not found")
+
+    etag = media_etag(name, stat)
+    cache_control = PUBLIC_CACHE_CONTROL if is_public(name) else PRIVATE_CACHE_CONTROL
+    if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+    if etag in if_none_match or "*" in if_none_match:
+        response = HttpResponse(status=304)
+    elif settings.MEDIA_ACCEL:
+        response = _accel_response(name, path)
+    else:
+        response = _file_response(request, path, stat.st_size, etag)
+    if response.status_code in (200, 206):
+        response["Content-Type"] = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    response["Cache-Control"] = cache_control
+    return response
+
+
+def _bucket_response(name):
+    if not direct_uploads_enabled():
+        raise Http404("File not found")
+    try:
+        response = HttpResponseRedirect(download_url(name))
+    except DirectUploadError:  # boto3 missing
+        raise Http404("File not found")
+    # The URL expires; nothing may keep the redirect.
+    response["Cache-Control"] = "private, no-store"
+    return response
+
+
+def _file_response(request, path, size, etag):
+    byte_range = None
+    range_header = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    # If-Range with anything but the current ETag means: send it all.
+    if range_header and (not if_range or if_range.strip() == etag):
+        byte_range = _byte_range(range_header, size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+    elif byte_range is None:
+        # The open file goes to wsgi.file_wrapper, i.e. sendfile() when the
+        # server has it.
+        response = FileResponse(open(path, "rb"))
+    else:
+        first, last = byte_range
+        file = open(path, "rb")
+        file.seek(first)
+        length = last - first + 1
+        response = FileResponse(_RangeReader(file, length), status=206)
+        response["Content-Length"] = str(length)
+        response["Content-Range"] = f"bytes {first}-{last}/{size}"
+    response.block_size = STREAM_BLOCK_SIZE
+    response["Accept-Ranges"] = "bytes"
+    return response
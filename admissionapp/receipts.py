@@ -0,0 +1,207 @@
+# admissionapp/receipts.py
+"""
+Payment receipt PDFs.
+
+When esewa_success / khalti_return mark a PaymentDetail COMPLETE they call
+request_receipt() inside their transaction, which queues a ReceiptJob: the
+job exists exactly when the payment does. ``python manage.py
+build_payment_receipts`` runs as a worker next to run_export_worker,
+claims queued jobs with a conditional UPDATE and renders them, so neither
+the gateway redirect nor a download ever waits for ReportLab and nothing
+is lost when a web worker restarts. A claim is a lease: jobs whose
+``claimed_at`` is older than RECEIPT_JOB_LEASE_SECONDS are queued again,
+or failed after RECEIPT_JOB_MAX_ATTEMPTS claims.
+
+build_receipt() stores the PDF under a content-hashed name and claims
+PaymentDetail.receipt with a conditional UPDATE: the first receipt written
+wins and is never replaced, which is what lets payment_receipt serve it
+with immutable cache headers. Until then payment_receipt answers 202.
+"""
+import hashlib
+from datetime import timedelta
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from reportlab.lib.pagesizes import A5
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table
+
+from .dossier_pdf import PAYMENT_TABLE_STYLE, SECTION_STYLE, STYLES, TITLE_STYLE
+from .models import PaymentDetail, ReceiptJob
+from .signals import log_changes
+
+
+RECEIPT_FIELDS = (
+    "pk",
+    "transaction_uuid",
+    "transaction_reference",
+    "payment_method",
+    "amount_paid",
+    "payment_date",
+    "receipt",
+    "application__application_no",
+    "application__course__degree",
+    "application__course__course_name",
+    "application__user__first_name",
+    "application__user__last_name",
+    "application__user__username",
+    "application__user__email",
+)
+
+def receipt_data(payment_id):
+    """RECEIPT_FIELDS of a COMPLETE payment as a dict, or None."""
+    return (
+        PaymentDetail.objects.filter(pk=payment_id, status="COMPLETE")
+        .values(*RECEIPT_FIELDS)
+        .first()
+    )
+
+
+def render_receipt(data):
+    """Receipt PDF bytes for one receipt_data() dict."""
+    name = (
+        f"{data['application__user__first_name'] or ''} "
+        f"{data['application__user__last_name'] or ''}"
+    ).strip() or data["application__user__username"]
+
+    buffer = BytesIO()
+    pdf = SimpleDocTemplate(
+        buffer,
+        pagesize=A5,
+        rightMargin=30,
+        leftMargin=30,
+        topMargin=30,
+        bottomMargin=30,
+        title=f"Payment receipt {data['transaction_uuid']}",
+    )
+    rows = [
+        ['Receipt No.:', data["transaction_uuid"]],
+        ['Reference:', data["transaction_reference"] or '—'],
+        ['Paid by:', name],
+        ['Email:', data["application__user__email"] or '—'],
+        ['Application No.:', data["application__application_no"]],
+        ['Course:', f"{data['application__course__degree']} - "
+                    f"{data['application__course__course_name']}"],
+        ['Payment Method:', data["payment_method"]],
+        ['Amount:', f"Rs. {data['amount_paid']}"],
+        ['Payment Date:', timezone.localtime(data["payment_date"]).strftime('%Y-%m-%d %H:%M')],
+        ['Status:', 'COMPLETE'],
+    ]
+    table = Table(rows, colWidths=[1.5*inch, 3.5*inch])
+    table.setStyle(PAYMENT_TABLE_STYLE)
+
+    pdf.build([
+        Paragraph("Online Admission System", TITLE_STYLE),
+        Paragraph("Payment Receipt", SECTION_STYLE),
+        Spacer(1, 8),
+        table,
+        Spacer(1, 12),
+        Paragraph("This receipt was generated automatically when the payment "
+                  "was confirmed by the payment gateway.", STYLES['Normal']),
+    ])
+    return buffer.getvalue()
+
+
+def build_receipt(payment_id):
+    """
+    Storage name of the payment's receipt, rendering and storing it first if
+    there is none yet. None if the payment is not COMPLETE.
+    """
+    data = receipt_data(payment_id)
+    if data is None:
+        return None
+    if data["receipt"]:
+        return data["receipt"]
+
+    pdf = render_receipt(data)
+    digest = hashlib.sha256(pdf).hexdigest()[:12]
+    field = PaymentDetail._meta.get_field("receipt")
+    name = default_storage.save(
+        field.generate_filename(None, f"{data['transaction_uuid']}-{digest}.pdf"),
+        ContentFile(pdf),
+    )
+    with transaction.atomic():
+        claimed = PaymentDetail.objects.filter(pk=payment_id, receipt="").update(
+            receipt=name
+        )
+        if claimed:
+            log_changes(PaymentDetail, [payment_id])
+    if claimed:
+        return name
+    # Someone else stored a receipt first; theirs is the immutable one.
+    default_storage.delete(name)
+    return PaymentDetail.objects.values_list("receipt", flat=True).get(pk=payment_id)
+
+
+# -----------------------------
+# Receipt jobs
+# -----------------------------
+def request_receipt(payment_id):
+    """
+    Queue the receipt of a COMPLETE payment that has none yet. Call it in
+    the transaction that completes the payment; returns the job, or None
+    when the receipt is already stored.
+    """
+    if PaymentDetail.objects.filter(pk=payment_id).exclude(receipt="").exists():
+        return None
+    job, _ = ReceiptJob.objects.get_or_create(payment_id=payment_id)
+    return job
+
+
+def recover_stale_receipts(now=None):
+    """
+    Requeue RUNNING receipt jobs whose lease expired, or fail them once they
+    used up RECEIPT_JOB_MAX_ATTEMPTS. Returns (requeued, failed) counts.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=settings.RECEIPT_JOB_LEASE_SECONDS)
+    stale = ReceiptJob.objects.filter(status=ReceiptJob.RUNNING).filter(
+        Q(claimed_at__lt=cutoff) | Q(claimed_at__isnull=True)
+    )
+    failed = stale.filter(attempts__gte=settings.RECEIPT_JOB_MAX_ATTEMPTS).update(
+        status=ReceiptJob.FAILED, error="The receipt worker stopped before finishing."
+    )
+    requeued = stale.update(status=ReceiptJob.QUEUED, claimed_at=None)
+    return requeued, failed
+
+
+def claim_next_receipt():
+    """Atomically move the oldest queued job to RUNNING and return it, or None."""
+    candidates = ReceiptJob.objects.filter(status=ReceiptJob.QUEUED).order_by("created_at")
+    for pk in candidates.values_list("pk", flat=True)[:10]:
+        claimed = ReceiptJob.objects.filter(pk=pk, status=ReceiptJob.QUEUED).update(
+            status=ReceiptJob.RUNNING, claimed_at=timezone.now(), attempts=F("attempts") + 1
+        )
+        if claimed:
+            return ReceiptJob.objects.get(pk=pk)
+    return None
+
+
+def run_receipt_job(job):
+    """Build the receipt of a claimed job and drop the job; returns the name."""
+    owned = ReceiptJob.objects.filter(
+        pk=job.pk, status=ReceiptJob.RUNNING, attempts=job.attempts
+    )
+    try:
+        name = build_receipt(job.payment_id)
+    except Exception as e:  # noqa: BLE001
+        failed = job.attempts >= settings.RECEIPT_JOB_MAX_ATTEMPTS
+        owned.update(
+            status=ReceiptJob.FAILED if failed else ReceiptJob.QUEUED,
+            claimed_at=None,
+            error=f"{type(e).__name__}: {e}",
+        )
+        raise
+    # A payment that is not COMPLETE (any more) has nothing to render.
+    owned.delete()
+    return name
+
+
+def receipt_etag(name):
+    # A stored receipt is never rewritten, so its name identifies its bytes.
+    return '"%s"' % hashlib.sha256(name.encode()).hexdigest()[:32]
@@ -0,0 +1,262 @@
+# admissionapp/reconciliation.py
+"""
+Settlement statement reconciliation.
+
+eSewa and Khalti send settlement CSVs that list every transaction they
+paid out. These helpers stream a statement row by row and join it against
+PaymentDetail in batches of indexed ``IN`` lookups (transaction_uuid is
+unique, so each batch is a single index probe per key), never one query
+per row. Only the current batch is kept in memory: the report counts
+every category but keeps just the first ``sample_size`` entries of each,
+and callers that need every row (the reconcile_settlement command) pass
+sinks that receive them as they are classified.
+"""
+import csv
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from django.db.models import Q
+
+from .models import PaymentDetail
+
+
+# SQLite's historical limit is 999 bound parameters per query and each
+# batch binds two IN lists, so keep a batch comfortably below half of it.
+DEFAULT_BATCH_SIZE = 450
+
+# Header aliases used by the gateways' settlement exports.
+UUID_COLUMNS = ("transaction_uuid", "transaction_id_merchant", "pidx", "product_id")
+REFERENCE_COLUMNS = (
+    "transaction_reference",
+    "transaction_code",
+    "reference_code",
+    "ref_id",
+    "refid",
+    "transaction_id",
+    "tidx",
+)
+AMOUNT_COLUMNS = ("amount", "total_amount", "settled_amount", "txn_amount")
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+def _normalize_header(name):
+    return (name or "").strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def _pick_column(fieldnames, aliases):
+    for alias in aliases:
+        if alias in fieldnames:
+            return alias
+    return None
+
+
+def _parse_amount(raw, paisa=False):
+    try:
+        amount = Decimal(str(raw).replace(",", "").strip())
+    except (InvalidOperation, AttributeError):
+        return None
+    if paisa:
+        amount = amount / Decimal("100")
+    return amount.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+class StatementRow:
+    __slots__ = ("line_no", "transaction_uuid", "transaction_reference", "amount")
+
+    def __init__(self, line_no, transaction_uuid, transaction_reference, amount):
+        self.line_no = line_no
+        self.transaction_uuid = transaction_uuid
+        self.transaction_reference = transaction_reference
+        self.amount = amount
+
+
+def iter_statement_rows(text_stream, paisa=False):
+    """
+    Yield StatementRow objects from a settlement CSV, one line at a time.
+    Column names are matched case-insensitively against the known aliases.
+    """
+    reader = csv.reader(text_stream)
+    try:
+        header = next(reader)
+    except StopIteration:
+        return
+
+    fieldnames = [_normalize_header(h) for h in header]
+    uuid_col = _pick_column(fieldnames, UUID_COLUMNS)
+    ref_col = _pick_column(fieldnames, REFERENCE_COLUMNS)
+    amount_col = _pick_column(fieldnames, AMOUNT_COLUMNS)
+    if not (uuid_col or ref_col):
+        raise ValueError(
+            "Statement has no transaction id column "
+            f"(expected one of: {', '.join(UUID_COLUMNS + REFERENCE_COLUMNS)})."
+        )
+    if not amount_col:
+        raise ValueError(
+            f"Statement has no amount column (expected one of: {', '.join(AMOUNT_COLUMNS)})."
+        )
+
+    uuid_idx = fieldnames.index(uuid_col) if uuid_col else None
+    ref_idx = fieldnames.index(ref_col) if ref_col else None
+    amount_idx = fieldnames.index(amount_col)
+
+    for line_no, record in enumerate(reader, start=2):
+        if not record:
+            continue
+        uuid_val = record[uuid_idx].strip() if uuid_idx is not None and uuid_idx < len(record) else ""
+        ref_val = record[ref_idx].strip() if ref_idx is not None and ref_idx < len(record) else ""
+        raw_amount = record[amount_idx] if amount_idx < len(record) else ""
+        yield StatementRow(
+            line_no,
+            uuid_val or None,
+            ref_val or None,
+            _parse_amount(raw_amount, paisa=paisa),
+        )
+
+
+# -----------------------------
+# Reconciliation
+# -----------------------------
+# Status the payment callbacks give a payment the gateway confirmed.
+SETTLED_STATUS = "COMPLETE"
+DEFAULT_SAMPLE_SIZE = 200
+
+
+class ReconciliationReport:
+    """
+    Result of a reconciliation run.
+
+    matched:         (row, payment) pairs of a COMPLETE payment whose
+                     amounts agree
+    missing:         statement rows with no PaymentDetail
+    mismatched:      (row, payment) pairs of a COMPLETE payment whose
+                     amounts differ
+    status_mismatch: (row, payment) pairs the gateway settled but we hold
+                     as INITIATED, FAILED, ...
+
+    ``counts`` has the size of every category, ``samples`` its first
+    ``sample_size`` entries. ``sinks`` maps a category to a callable
+    given each of its entries.
+    """
+
+    CATEGORIES = ("matched", "missing", "mismatched", "status_mismatch")
+
+    def __init__(self, sample_size=DEFAULT_SAMPLE_SIZE, sinks=None):
+        self.sample_size = sample_size
+        self.sinks = sinks or {}
+        self.counts = dict.fromkeys(self.CATEGORIES, 0)
+        self.samples = {category: [] for category in self.CATEGORIES}
+        self.rows_read = 0
+
+    def add(self, category, entry):
+        self.counts[category] += 1
+        sample = self.samples[category]
+        if len(sample) < self.sample_size:
+            sample.append(entry)
+        sink = self.sinks.get(category)
+        if sink is not None:
+            sink(entry)
+
+    def summary(self):
+        return {"rows_read": self.rows_read, **self.counts}
+
+
+PAYMENT_FIELDS = (
+    "pk",
+    "transaction_uuid",
+    "transaction_reference",
+    "amount_paid",
+    "status",
+    "payment_method",
+    "application__application_no",
+)
+
+
+def _match_batch(batch, report):
+    uuids = {r.transaction_uuid for r in batch if r.transaction_uuid}
+    refs = {r.transaction_reference for r in batch if r.transaction_reference}
+
+    query = Q()
+    if uuids:
+        query |= Q(transaction_uuid__in=uuids)
+    if refs:
+        query |= Q(transaction_reference__in=refs)
+
+    by_uuid, by_ref = {}, {}
+    if query:
+        for values in PaymentDetail.objects.filter(query).values_list(*PAYMENT_FIELDS):
+            payment = dict(zip(PAYMENT_FIELDS, values))
+            by_uuid[payment["transaction_uuid"]] = payment
+            if payment["transaction_reference"]:
+                by_ref[payment["transaction_reference"]] = payment
+
+    for row in batch:
+        payment = by_uuid.get(row.transaction_uuid) or by_ref.get(
+            row.transaction_reference
+        )
+        if payment is None:
+            report.add("missing", row)
+        elif payment["status"] != SETTLED_STATUS:
+            report.add("status_mismatch", (row, payment))
+        elif row.amount is None or row.amount != payment["amount_paid"]:
+            report.add("mismatched", (row, payment))
+        else:
+            report.add("matched", (row, payment))
+
+
+def reconcile_statement(rows, batch_size=DEFAULT_BATCH_SIZE,
+                        sample_size=DEFAULT_SAMPLE_SIZE, sinks=None):
+    """Join statement rows against PaymentDetail, one query per batch."""
+    report = ReconciliationReport(sample_size, sinks)
+    batch = []
+    for row in rows:
+        report.rows_read += 1
+        if not (row.transaction_uuid or row.transaction_reference):
+            report.add("missing", row)
+            continue
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _match_batch(batch, report)
+            batch = []
+    if batch:
+        _match_batch(batch, report)
+    return report
+
+
+# -----------------------------
+# CSV output
+# -----------------------------
+REPORT_HEADERS = [
+    "Line",
+    "Statement Transaction UUID",
+    "Statement Reference",
+    "Statement Amount",
+    "Application No.",
+    "Payment Method",
+    "Payment Status",
+    "Recorded Amount",
+]
+
+
+def report_rows(entries):
+    """Flatten report entries (rows or (row, payment) pairs) into CSV rows."""
+    for entry in entries:
+        row, payment = entry if isinstance(entry, tuple) else (entry, None)
+        payment = payment or {}
+        yield [
+            row.line_no,
+            row.transaction_uuid or "",
+            row.transaction_reference or "",
+            row.amount if row.amount is not None else "",
+            payment.get("application__application_no", ""),
+            payment.get("payment_method", ""),
+            payment.get("status", ""),
+            payment.get("amount_paid", ""),
+        ]
+
+
+def report_csv_sink(stream):
+    """Sink for ReconciliationReport writing each entry as a CSV row."""
+    writer = csv.writer(stream)
+    writer.writerow(REPORT_HEADERS)
+    return lambda entry: writer.writerows(report_rows([entry]))
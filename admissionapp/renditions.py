@@ -0,0 +1,237 @@
+# admissionapp/renditions.py
+"""
+Resized renditions of course background and profile pictures.
+
+Pages used to load the original upload (often several MB) for a 160px
+course card or a 32px navbar avatar. For every picture we now keep, next
+to the original in MEDIA_ROOT,
+
+    renditions/<source name>/<preset>-<width>.webp   (and .jpg)
+    renditions/<source name>/placeholder.jpg         (tiny, blurred)
+
+Stored uploads are never overwritten (a new upload gets a new name), so a
+rendition path stays valid as long as its source does. Including the
+width in the name means changing a preset produces new files instead of
+serving stale ones.
+
+Web workers never decode pictures. Saving a CourseDetails or
+PersonalInfo queues a RenditionJob in the same transaction (see
+connect()), and the template tags in templatetags/renditions.py fall back
+to the original while a rendition is missing, queueing it too.
+``python manage.py build_renditions --queued`` runs as a worker next to
+build_payment_receipts, claims jobs with a conditional UPDATE and builds
+them; claims older than RENDITION_JOB_LEASE_SECONDS are queued again, or
+failed after RENDITION_JOB_MAX_ATTEMPTS. Without --queued the command
+builds the renditions of every stored picture.
+"""
+import base64
+import os
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import F, Q
+from django.db.models.signals import post_save
+from django.utils import timezone
+from PIL import Image, ImageFilter, ImageOps
+
+from .images import IMAGE_FORMATS, checked_image_header
+
+
+RENDITION_PREFIX = "renditions"
+
+# preset -> width in pixels (2x the CSS size it is shown at)
+RENDITION_PRESETS = {
+    "avatar": 96,    # navbar, 32px
+    "profile": 320,  # profile pages
+    "card": 960,     # course cards on the student dashboard
+}
+RENDITION_FORMATS = {
+    "webp": ("WEBP", {"quality": 75, "method": 4}),
+    "jpg": ("JPEG", {"quality": 80, "optimize": True, "progressive": True}),
+}
+PLACEHOLDER_WIDTH = 24
+PLACEHOLDER_NAME = "placeholder.jpg"
+
+# (app label, model, field) -> presets built for that image field
+FIELD_PRESETS = {
+    ("admissionapp", "CourseDetails", "bg_pic"): ("card",),
+    ("admissionapp", "PersonalInfo", "profile_pic"): ("avatar", "profile"),
+}
+
+def rendition_name(source, preset, fmt="jpg"):
+    return f"{RENDITION_PREFIX}/{source}/{preset}-{RENDITION_PRESETS[preset]}.{fmt}"
+
+
+def placeholder_name(source):
+    return f"{RENDITION_PREFIX}/{source}/{PLACEHOLDER_NAME}"
+
+
+def flatten_to_rgb(im):
+    """``im`` as RGB, transparent areas composited onto white."""
+    if im.mode in ("RGBA", "LA", "P"):
+        im = im.convert("RGBA")
+        flat = Image.new("RGB", im.size, "white")
+        flat.paste(im, mask=im.getchannel("A"))
+        return flat
+    if im.mode != "RGB":
+        return im.convert("RGB")
+    return im
+
+
+def _encode(im, fmt):
+    pil_format, options = RENDITION_FORMATS[fmt]
+    out = BytesIO()
+    im.save(out, pil_format, **options)
+    return out.getvalue()
+
+
+def _write(storage, name, data):
+    # Atomic, so a page never links to a half-written rendition.
+    path = storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(data)
+    if storage.file_permissions_mode is not None:
+        os.chmod(tmp, storage.file_permissions_mode)
+    os.replace(tmp, path)
+
+
+def build_renditions(source, presets, storage=default_storage, force=False):
+    """
+    Write the ``presets`` renditions and the placeholder of the stored image
+    ``source``. Existing files are kept unless ``force``. Returns the number
+    of files written.
+    """
+    wanted = [
+        (rendition_name(source, preset, fmt), RENDITION_PRESETS[preset], fmt)
+        for preset in presets
+        for fmt in RENDITION_FORMATS
+    ]
+    wanted.append((placeholder_name(source), PLACEHOLDER_WIDTH, None))
+    if not force:
+        wanted = [w for w in wanted if not storage.exists(w[0])]
+    if not wanted:
+        return 0
+
+    largest = max(width for _, width, _ in wanted)
+    # Pictures stored before the upload limits existed are checked here.
+    checked_image_header(storage.path(source))
+    with Image.open(storage.path(source), formats=IMAGE_FORMATS) as im:
+        # JPEGs decode straight at 1/2..1/8 scale when that is enough.
+        im.draft("RGB", (largest, largest))
+        im = flatten_to_rgb(ImageOps.exif_transpose(im))
+        # Biggest first, each resized from the previous one: cheaper, and
+        # the quality loss is invisible at these ratios.
+        for name, width, fmt in sorted(wanted, key=lambda w: -w[1]):
+            if im.width > width:
+                im = im.resize((width, max(1, round(im.height * width / im.width))),
+                               Image.LANCZOS)
+            if fmt is None:
+                blurred = im.filter(ImageFilter.GaussianBlur(1))
+                data = _encode(blurred, "jpg")
+            else:
+                data = _encode(im, fmt)
+            _write(storage, name, data)
+    return len(wanted)
+
+
+def _jobs():
+    return apps.get_model("admissionapp", "RenditionJob").objects
+
+
+def queue_renditions(source, presets):
+    """Queue a job building the ``presets`` renditions of ``source`` (once)."""
+    if not source:
+        return None
+    job, _ = _jobs().get_or_create(source=source, defaults={"presets": ",".join(presets)})
+    return job
+
+
+def recover_stale_renditions(now=None):
+    """
+    Requeue RUNNING rendition jobs whose lease expired, or fail them once
+    they used up RENDITION_JOB_MAX_ATTEMPTS. Returns (requeued, failed).
+    """
+    RenditionJob = apps.get_model("admissionapp", "RenditionJob")
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=settings.RENDITION_JOB_LEASE_SECONDS)
+    stale = _jobs().filter(status=RenditionJob.RUNNING).filter(
+        Q(claimed_at__lt=cutoff) | Q(claimed_at__isnull=True)
+    )
+    failed = stale.filter(attempts__gte=settings.RENDITION_JOB_MAX_ATTEMPTS).update(
+        status=RenditionJob.FAILED, error="The rendition worker stopped before finishing."
+    )
+    requeued = stale.update(status=RenditionJob.QUEUED, claimed_at=None)
+    return requeued, failed
+
+
+def claim_next_rendition():
+    """Atomically move the oldest queued job to RUNNING and return it, or None."""
+    RenditionJob = apps.get_model("admissionapp", "RenditionJob")
+    candidates = _jobs().filter(status=RenditionJob.QUEUED).order_by("created_at")
+    for pk in candidates.values_list("pk", flat=True)[:10]:
+        claimed = _jobs().filter(pk=pk, status=RenditionJob.QUEUED).update(
+            status=RenditionJob.RUNNING, claimed_at=timezone.now(), attempts=F("attempts") + 1
+        )
+        if claimed:
+            return _jobs().get(pk=pk)
+    return None
+
+
+def run_rendition_job(job):
+    """Build the renditions of a claimed job and drop the job; returns the file count."""
+    RenditionJob = apps.get_model("admissionapp", "RenditionJob")
+    owned = _jobs().filter(pk=job.pk, status=RenditionJob.RUNNING, attempts=job.attempts)
+    try:
+        written = build_renditions(job.source, job.presets.split(","))
+    except Exception as e:  # noqa: BLE001
+        failed = job.attempts >= settings.RENDITION_JOB_MAX_ATTEMPTS
+        owned.update(
+            status=RenditionJob.FAILED if failed else RenditionJob.QUEUED,
+            claimed_at=None,
+            error=f"{type(e).__name__}: {e}",
+        )
+        raise
+    owned.delete()
+    return written
+
+
+def presets_for(field):
+    """Presets built for a model ImageField (FieldFile.field), or ()."""
+    model = field.model._meta
+    return FIELD_PRESETS.get((model.app_label, model.object_name, field.name), ())
+
+
+def placeholder_data_uri(source):
+    """The blurred placeholder inlined as a data: URI, or None if not built."""
+    try:
+        with default_storage.open(placeholder_name(source)) as fh:
+            return "data:image/jpeg;base64," + base64.b64encode(fh.read()).decode()
+    except OSError:
+        return None
+
+
+def _queue_after_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    for (app_label, model_name, field_name), presets in FIELD_PRESETS.items():
+        if sender._meta.label == f"{app_label}.{model_name}":
+            source = getattr(instance, field_name).name
+            # Same transaction as the save: the job exists iff the picture does.
+            if source and not default_storage.exists(placeholder_name(source)):
+                queue_renditions(source, presets)
+
+
+def connect():
+    for app_label, model_name, _ in FIELD_PRESETS:
+        model = apps.get_model(app_label, model_name)
+        post_save.connect(
+            _queue_after_save,
+            sender=model,
+            dispatch_uid=f"renditions_{model._meta.model_name}",
+        )
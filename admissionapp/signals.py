@@ -0,0 +1,66 @@
+# admissionapp/signals.py
+"""
+Change-data-capture: every save/delete of a tracked model inserts a
+ChangeLogEntry in the same transaction (an outbox), so the entry commits
+or rolls back with the change itself. Writes that bypass save(), such as
+queryset.update(), must call log_changes() inside their transaction.
+Connected in AdmissionappConfig.ready().
+
+Ids are taken at insert time, not at commit, so a slow transaction can
+commit an entry below ids that are already visible. change_feed.py only
+hands out entries older than CHANGE_FEED_SETTLE_SECONDS for that reason.
+"""
+from django.db.models.signals import post_delete, post_save
+
+from .models import Application, ChangeLogEntry, EducationalInfo, PaymentDetail
+
+
+TRACKED_MODELS = (Application, PaymentDetail, EducationalInfo)
+
+
+def _payload(instance):
+    """Column values of ``instance``; file fields as their storage name."""
+    data = {}
+    for field in instance._meta.concrete_fields:
+        value = field.value_from_object(instance)
+        if hasattr(value, "name") and hasattr(value, "storage"):
+            value = value.name or ""
+        data[field.attname] = value
+    return data
+
+
+def _log_change(instance, operation):
+    ChangeLogEntry.objects.create(
+        model=instance._meta.model_name,
+        object_pk=str(instance.pk),
+        operation=operation,
+        payload=_payload(instance),
+    )
+
+
+def log_changes(model, pks):
+    """
+    Log an "update" of the ``model`` rows ``pks`` as they are now. Call it
+    in the transaction of a queryset.update() on a TRACKED_MODELS model.
+    """
+    for instance in model._default_manager.filter(pk__in=pks).order_by("pk"):
+        _log_change(instance, "update")
+
+
+def log_save(sender, instance, created, raw=False, **kwargs):
+    if raw:  # loaddata
+        return
+    _log_change(instance, "create" if created else "update")
+
+
+def log_delete(sender, instance, **kwargs):
+    _log_change(instance, "delete")
+
+
+def connect():
+    for model in TRACKED_MODELS:
+        name = model._meta.model_name
+        post_save.connect(log_save, sender=model, dispatch_uid=f"changelog_save_{name}")
+        post_delete.connect(
+            log_delete, sender=model, dispatch_uid=f"changelog_delete_{name}"
+        )
@@ -0,0 +1,58 @@
+# admissionapp/submissions.py
+"""
+Saving a record together with its uploaded files.
+
+save_with_files() validates the record once before anything is written:
+the file fields run their validators (extension, size, content sniffing),
+the other fields go through full_clean() as usual, and every error is
+reported together. The row is then inserted with a single save() inside
+a transaction. If that save fails, files it already stored are removed
+again, so a failed submission leaves nothing behind in storage.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .document_storage import discard_stored_file
+
+
+def clean_files(instance, field_names):
+    """{field name: [messages]} from validating ``instance``'s file fields."""
+    errors = {}
+    for name in field_names:
+        try:
+            instance._meta.get_field(name).clean(getattr(instance, name), instance)
+        except ValidationError as e:
+            errors[name] = e.messages
+    return errors
+
+
+def save_with_files(instance, file_fields):
+    """
+    Validate ``instance`` and insert or update it with one save(). Raises
+    ValidationError with every field's errors. Files stored by a save that
+    fails are deleted again.
+    """
+    errors = clean_files(instance, file_fields)
+    try:
+        instance.full_clean(exclude=file_fields)
+    except ValidationError as e:
+        for field, messages in e.message_dict.items():
+            errors.setdefault(field, []).extend(messages)
+    if errors:
+        raise ValidationError(errors)
+
+    pending = [
+        name
+        for name in file_fields
+        if getattr(instance, name) and not getattr(instance, name)._committed
+    ]
+    try:
+        with transaction.atomic():
+            instance.save()
+    except Exception:
+        for name in pending:
+            stored = getattr(instance, name)
+            if stored._committed:
+                discard_stored_file(stored.storage, stored.name)
+        raise
+    return instance
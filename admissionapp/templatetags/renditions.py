@@ -0,0 +1,105 @@
+# admissionapp/templatetags/renditions.py
+"""
+Resized pictures in templates (see admissionapp/renditions.py):
+
+    {% load renditions %}
+    <div style="{% rendition_background course.bg_pic 'card' %}"></div>
+    {% rendition_picture personalinfo.profile_pic 'profile' alt='Profile Picture' %}
+    <img src="{% rendition_url personalinfo.profile_pic 'avatar' %}">
+
+While a rendition is missing these use the original upload and queue a
+RenditionJob, so a page view after the worker built it gets the small
+file. Nothing is cached across requests: renditions and placeholders can
+be deleted (gc_media, relocate_media) or rebuilt with --force, and a stat
+per picture is cheap.
+"""
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from ..renditions import (
+    placeholder_data_uri,
+    presets_for,
+    queue_renditions,
+    rendition_name,
+)
+
+
+register = template.Library()
+
+
+def _renditions(image, preset):
+    """(webp url, jpg url, placeholder data URI) of ``image``, or None."""
+    if not image:
+        return None
+    webp, jpg = (rendition_name(image.name, preset, fmt) for fmt in ("webp", "jpg"))
+    if not (default_storage.exists(jpg) and default_storage.exists(webp)):
+        queue_renditions(image.name, presets_for(image.field))
+        return None
+    return (
+        default_storage.url(webp),
+        default_storage.url(jpg),
+        placeholder_data_uri(image.name) or "",
+    )
+
+
+@register.simple_tag
+def rendition_url(image, preset, fmt="jpg"):
+    """URL of the ``preset`` rendition of ``image`` (the original until built)."""
+    if not image:
+        return ""
+    renditions = _renditions(image, preset)
+    if renditions is None:
+        return image.url
+    return renditions[0] if fmt == "webp" else renditions[1]
+
+
+@register.simple_tag
+def rendition_background(image, preset):
+    """
+    ``style`` declarations showing ``image`` as a WebP/JPEG background, over
+    its blurred placeholder while loading.
+    """
+    if not image:
+        return ""
+    renditions = _renditions(image, preset)
+    if renditions is None:
+        return format_html("background-image: url('{}');", image.url)
+    webp, jpg, placeholder = renditions
+    under = format_html(", url('{}')", placeholder) if placeholder else ""
+    # The second declaration wins in browsers that understand image-set().
+    return format_html(
+        "background-image: url('{jpg}'){under}; "
+        "background-image: image-set(url('{webp}') type('image/webp'), "
+        "url('{jpg}') type('image/jpeg')){under};",
+        jpg=jpg,
+        webp=webp,
+        under=under,
+    )
+
+
+@register.simple_tag
+def rendition_picture(image, preset, alt="", css_class=""):
+    """<picture> with WebP and JPEG sources for the ``preset`` rendition."""
+    if not image:
+        return ""
+    renditions = _renditions(image, preset)
+    if renditions is None:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="lazy">', image.url, alt, css_class
+        )
+    webp, jpg, placeholder = renditions
+    style = (
+        format_html(' style="background: url(\'{}\') center / cover"', placeholder)
+        if placeholder
+        else ""
+    )
+    return format_html(
+        '<picture><source srcset="{}" type="image/webp">'
+        '<img src="{}" alt="{}" class="{}" loading="lazy"{}></picture>',
+        webp,
+        jpg,
+        alt,
+        css_class,
+        style,
+    )
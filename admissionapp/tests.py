@@ -1,3 +1,947 @@
-from django.test import TestCase
+import base64
+import contextlib
+import csv
+import hashlib
+import hmac
+import importlib.util
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+from PIL import Image
+
+from . import callback_replay, direct_uploads
+from .change_feed import page_bounds
+from .chunked_uploads import (
+    ChunkedUploadError,
+    OffsetMismatch,
+    append_chunk,
+    create_upload,
+    finalize_upload,
+    upload_dir,
+)
+from .direct_uploads import DirectUploadError
+from .document_storage import get_document_storage
+from .documents import resync_documents
+from .dossiers import load_dossiers
+from .export_jobs import claim_next_job, recover_stale_jobs, run_export_job
+from .export_snapshots import build_snapshots, snapshot_drift
+from .exports import APPLICATION_EXPORTS, XlsxStreamWriter, _workbook_xml
+from .models import (
+    Application,
+    ChangeLogEntry,
+    ChunkedUpload,
+    CourseDetails,
+    CustomUser,
+    Document,
+    EducationalInfo,
+    ExportJob,
+    PaymentDetail,
+    PersonalInfo,
+    ReceiptJob,
+    RenditionJob,
+)
+from .offer_letters import offer_code, verify_offer_code
+from .payments.esewa import esewa_signature
+from .receipts import build_receipt
+from .reconciliation import iter_statement_rows, reconcile_statement
+from .renditions import rendition_name
+from .submissions import save_with_files
+from .templatetags.renditions import rendition_url
+from .upload_handlers import rejected_uploads
+
+try:
+    from moto import mock_aws  # type: ignore
+except ImportError:  # optional: only needed with DIRECT_UPLOADS
+    mock_aws = None
+
+
+class ProtectedMediaTests(TestCase):
+    """/media/<name> goes through views.protected_media (protected_media.py)."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_ACCEL="")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        for name in ("citizenship/citizen.jpg", "course_bg/bg.jpg"):
+            path = os.path.join(self.media_root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as fh:
+                fh.write(b"\xff\xd8\xff\xe0 not really a jpeg")
+
+        self.owner = CustomUser.objects.create_user("owner", "owner@example.com", "pw")
+        self.other = CustomUser.objects.create_user("other", "other@example.com", "pw")
+        PersonalInfo.objects.create(user=self.owner)
+        # Written without save(): no Document row describes the file.
+        PersonalInfo.objects.filter(user=self.owner).update(ctz_file="citizenship/citizen.jpg")
+
+    def test_traversal_out_of_public_prefix_is_refused(self):
+        for url in (
+            "/media/course_bg/../citizenship/citizen.jpg",
+            "/media/course_bg/%2e%2e/citizenship/citizen.jpg",
+            "/media/course_bg/..%2fcitizenship/citizen.jpg",
+            "/media/course_bg/..%5ccitizenship/citizen.jpg",
+            "/media/%2fetc/passwd",
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_private_upload_needs_its_owner(self):
+        url = "/media/citizenship/citizen.jpg"
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_owner_without_document_row(self):
+        self.assertFalse(Document.objects.filter(owner=self.owner).exists())
+        self.client.force_login(self.owner)
+        response = self.client.get("/media/citizenship/citizen.jpg")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+
+    def test_course_background_is_public(self):
+        self.assertEqual(self.client.get("/media/course_bg/bg.jpg").status_code, 200)
+
+    def test_resync_documents_follows_the_fields(self):
+        counts = resync_documents()
+        self.assertEqual(counts["created"], 1)
+        document = Document.objects.get(owner=self.owner)
+        self.assertEqual(document.storage_key, "citizenship/citizen.jpg")
+        self.assertEqual(document.size, 22)
+        self.assertEqual(len(document.sha256), 64)
+
+        PersonalInfo.objects.filter(user=self.owner).update(ctz_file="")
+        self.assertEqual(resync_documents()["deleted"], 1)
+        self.assertFalse(Document.objects.filter(owner=self.owner).exists())
+
+
+@override_settings(CHANGE_FEED_SETTLE_SECONDS=0)
+class ChangeFeedTests(TestCase):
+    """ChangeLogEntry rows are written with the change (signals.py)."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        user = CustomUser.objects.create_user("student", "student@example.com", "pw")
+        course = CourseDetails.objects.create(
+            degree="Bachelor", course_name="BIT", course_full_name="Information Technology",
+            course_code="BIT", course_duration="4 Years",
+        )
+        self.application = Application.objects.create(user=user, course=course)
+
+    def test_rolled_back_change_is_not_logged(self):
+        before = ChangeLogEntry.objects.count()
+
+        class Abort(Exception):
+            pass
+
+        with self.assertRaises(Abort), transaction.atomic():
+            self.application.save()
+            raise Abort
+        self.assertEqual(ChangeLogEntry.objects.count(), before)
+
+    def test_receipt_claim_is_logged(self):
+        payment = PaymentDetail.objects.create(
+            user=self.application.user, application=self.application,
+            amount_paid="50.00", transaction_uuid="txn-1", status="COMPLETE",
+        )
+        watermark = page_bounds()
+        with override_settings(MEDIA_ROOT=self.media_root):
+            name = build_receipt(payment.pk)
+        entry = ChangeLogEntry.objects.filter(id__gt=watermark).get()
+        self.assertEqual((entry.model, entry.object_pk), ("paymentdetail", str(payment.pk)))
+        self.assertEqual(entry.payload["receipt"], name)
+
+    def test_unsettled_entries_wait(self):
+        watermark = page_bounds()
+        self.application.save()
+        self.assertGreater(page_bounds(watermark), watermark)
+        with override_settings(CHANGE_FEED_SETTLE_SECONDS=60):
+            self.assertEqual(page_bounds(watermark), watermark)
+
+
+class ReconciliationTests(TestCase):
+    """Settlement statements against PaymentDetail (reconciliation.py)."""
+
+    def setUp(self):
+        course = CourseDetails.objects.create(
+            degree="Bachelor", course_name="BIT", course_full_name="Information Technology",
+            course_code="BIT", course_duration="4 Years",
+        )
+        for i, status in enumerate(("COMPLETE", "INITIATED", "FAILED")):
+            user = CustomUser.objects.create_user(f"s{i}", f"s{i}@example.com", "pw")
+            application = Application.objects.create(user=user, course=course)
+            PaymentDetail.objects.create(
+                user=user, application=application, amount_paid="50.00",
+                transaction_uuid=f"txn-{i}", status=status,
+            )
+
+    def reconcile(self, statement, **kwargs):
+        return reconcile_statement(iter_statement_rows(io.StringIO(statement)), **kwargs)
+
+    def test_only_complete_payments_match(self):
+        report = self.reconcile(
+            "transaction_uuid,amount\ntxn-0,50\ntxn-1,50\ntxn-2,50\ntxn-9,50\n"
+        )
+        self.assertEqual(
+            report.summary(),
+            {"rows_read": 4, "matched": 1, "missing": 1, "mismatched": 0, "status_mismatch": 2},
+        )
+        self.assertEqual(
+            [payment["status"] for _, payment in report.samples["status_mismatch"]],
+            ["INITIATED", "FAILED"],
+        )
+
+    def test_samples_are_bounded_and_sinks_see_every_row(self):
+        seen = []
+        report = self.reconcile(
+            "transaction_uuid,amount\n" + "".join(f"nope-{i},1\n" for i in range(10)),
+            sample_size=3,
+            sinks={"missing": seen.append},
+        )
+        self.assertEqual(report.counts["missing"], 10)
+        self.assertEqual(len(report.samples["missing"]), 3)
+        self.assertEqual(len(seen), 10)
+
+
+@override_settings(EXPORT_JOB_LEASE_SECONDS=60, EXPORT_JOB_MAX_ATTEMPTS=2)
+class ExportJobLeaseTests(TestCase):
+    """RUNNING export jobs of a dead worker are taken back (export_jobs.py)."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        admin = CustomUser.objects.create_user("admin", "admin@example.com", "pw", is_staff=True)
+        self.job = ExportJob.objects.create(created_by=admin, export="total", export_format="csv")
+
+    def expire_lease(self):
+        ExportJob.objects.filter(pk=self.job.pk).update(
+            heartbeat_at=timezone.now() - timedelta(minutes=5)
+        )
+
+    def test_live_lease_is_kept(self):
+        claim_next_job()
+        self.assertEqual(recover_stale_jobs(), (0, 0))
+
+    def test_expired_lease_is_requeued_then_failed(self):
+        claim_next_job()
+        self.expire_lease()
+        self.assertEqual(recover_stale_jobs(), (1, 0))
+        self.assertEqual(claim_next_job().attempts, 2)
+        self.expire_lease()
+        self.assertEqual(recover_stale_jobs(), (0, 1))
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, ExportJob.FAILED)
+
+    def test_worker_that_lost_its_lease_does_not_finish(self):
+        stale = claim_next_job()
+        self.expire_lease()
+        recover_stale_jobs()
+        current = claim_next_job()
+        self.assertIsNone(run_export_job(stale))
+        self.assertEqual(run_export_job(current).status, ExportJob.DONE)
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.attempts), (ExportJob.DONE, 2))
+
+
+class ExportSnapshotTests(TestCase):
+    """Unfiltered exports come from a current snapshot (export_snapshots.py)."""
+
+    def setUp(self):
+        snapshot_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, snapshot_dir)
+        settings_override = override_settings(
+            EXPORT_SNAPSHOT_DIR=snapshot_dir, EXPORT_SNAPSHOT_MAX_AGE_MINUTES=60
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.manifest = build_snapshots(exports=["total"], formats=["csv"])
+        admin = CustomUser.objects.create_user("admin", "admin@example.com", "pw", is_staff=True)
+        self.client.force_login(admin)
+
+    def test_current_snapshot_is_served(self):
+        response = self.client.get(reverse("export_total_applications"), {"format": "csv"})
+        self.assertEqual(response["X-Export-Snapshot"], self.manifest["built_at"].isoformat())
+        self.assertIn("Last-Modified", response)
+        self.assertNotIn("Age", response)
+
+    @override_settings(CHANGE_FEED_SETTLE_SECONDS=0)
+    def test_edit_keeping_the_counts_is_drift(self):
+        course = CourseDetails.objects.create(
+            degree="Bachelor", course_name="BIT", course_full_name="Information Technology",
+            course_code="BIT", course_duration="4 Years",
+        )
+        user = CustomUser.objects.create_user("applicant", "applicant@example.com", "pw")
+        application = Application.objects.create(
+            user=user, course=course, application_status="rejected", reason_to_reject="Late"
+        )
+        manifest = build_snapshots(exports=["total"], formats=["csv"])
+        self.assertEqual(snapshot_drift(manifest), 0)
+
+        application.reason_to_reject = "Documents missing"
+        application.save()
+        self.assertEqual(snapshot_drift(manifest), 1)
+        output = io.StringIO()
+        call_command("build_export_snapshots", "--if-changed", "0", stdout=output)
+        self.assertIn("Built export snapshots", output.getvalue())
+
+    def test_expired_snapshot_falls_back_to_live_export(self):
+        later = timezone.now() + timedelta(minutes=61)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            response = self.client.get(reverse("export_total_applications"), {"format": "csv"})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Export-Snapshot", response)
+
+
+class WorkbookXmlTests(TestCase):
+    def test_sheet_name_is_cut_before_escaping(self):
+        xml = _workbook_xml("x" * 30 + "&y")
+        self.assertIn('name="%s&amp;"' % ("x" * 30), xml)
+
+    def test_spooled_rows_are_closed_when_a_row_fails(self):
+        with self.assertRaises(ZeroDivisionError):
+            with XlsxStreamWriter(io.BytesIO()) as writer:
+                writer.write_header(["a"])
+                writer.write_row([1 / 0])
+        self.assertTrue(writer._sheet_data.closed)
+
+    def test_spooled_rows_are_closed_when_assembling_fails(self):
+        class Full(io.BytesIO):
+            def write(self, data):
+                raise OSError("disk full")
+
+        writer = XlsxStreamWriter(Full())
+        writer.write_header(["a"])
+        with self.assertRaises(OSError):
+            writer.close()
+        self.assertTrue(writer._sheet_data.closed)
+
+
+class PaymentReceiptTests(TestCase):
+    """Receipts are queued by the callback and rendered by the worker (receipts.py)."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = CustomUser.objects.create_user("payer", "payer@example.com", "pw")
+        course = CourseDetails.objects.create(
+            degree="Bachelor", course_name="BIT", course_full_name="Information Technology",
+            course_code="BIT", course_duration="4 Years",
+        )
+        application = Application.objects.create(user=self.user, course=course)
+        self.payment = PaymentDetail.objects.create(
+            user=self.user, application=application, amount_paid="50.00",
+            transaction_uuid="txn-receipt", product_code=settings.ESEWA_PRODUCT_CODE,
+            status="INITIATED", payment_method="e-Sewa",
+        )
+        self.client.force_login(self.user)
+        self.receipt_url = reverse("payment_receipt", args=[self.payment.pk])
+
+    def complete_with_esewa(self):
+        query = callback_replay.esewa_callback_query("txn-receipt", "50")
+        gateway = callback_replay.FakeGateway()
+        with mock.patch("requests.get", gateway.get), contextlib.redirect_stdout(io.StringIO()):
+            self.client.get(f"{callback_replay.ESEWA_SUCCESS_PATH}?{query}")
+
+    def test_completed_callback_leads_to_a_stored_receipt(self):
+        self.complete_with_esewa()
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, "COMPLETE")
+        self.assertFalse(self.payment.receipt)
+        self.assertTrue(ReceiptJob.objects.filter(payment=self.payment).exists())
+
+        response = self.client.get(self.receipt_url)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response["Retry-After"], "5")
+
+        call_command("build_payment_receipts", "--once", stdout=io.StringIO())
+        self.payment.refresh_from_db()
+        self.assertTrue(self.payment.receipt.name.startswith("receipts/"))
+        self.assertFalse(ReceiptJob.objects.exists())
+
+        response = self.client.get(self.receipt_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content)[:5], b"%PDF-")
+
+    def test_incomplete_payment_has_no_receipt(self):
+        self.assertEqual(self.client.get(self.receipt_url).status_code, 404)
+        self.assertFalse(ReceiptJob.objects.exists())
+
+
+def _storages(documents):
+    return {
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+        "documents": documents,
+    }
+
+
+class DocumentStorageTests(TestCase):
+    """Only direct uploads resolve in storages["documents"] (document_storage.py)."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.bucket_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.addCleanup(shutil.rmtree, self.bucket_root)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            DIRECT_UPLOADS=True,
+            # A local directory stands in for the bucket.
+            STORAGES=_storages({
+                "BACKEND": "django.core.files.storage.FileSystemStorage",
+                "OPTIONS": {"location": self.bucket_root},
+            }),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        for root, name in (
+            (self.media_root, "citizenship/old.jpg"),
+            (self.bucket_root, "direct/1/new.pdf"),
+        ):
+            path = os.path.join(root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as fh:
+                fh.write(name.encode())
+        self.owner = CustomUser.objects.create_user("owner", "owner@example.com", "pw")
+        PersonalInfo.objects.create(user=self.owner)
+
+    def test_existing_documents_stay_local(self):
+        storage = get_document_storage()
+        self.assertTrue(storage.exists("citizenship/old.jpg"))
+        with storage.open("citizenship/old.jpg") as fh:
+            self.assertEqual(fh.read(), b"citizenship/old.jpg")
+        self.assertFalse(storage.exists("direct/1/old.jpg"))
+
+    def test_direct_uploads_resolve_in_the_bucket(self):
+        storage = get_document_storage()
+        with storage.open("direct/1/new.pdf") as fh:
+            self.assertEqual(fh.read(), b"direct/1/new.pdf")
+        with self.assertRaises(NotImplementedError):
+            storage.path("direct/1/new.pdf")
+
+    def test_owner_is_redirected_to_a_presigned_get(self):
+        PersonalInfo.objects.filter(user=self.owner).update(ctz_file="direct/1/new.pdf")
+        self.client.force_login(self.owner)
+        signed = "https://bucket.example.com/direct/1/new.pdf?X-Amz-Signature=x"
+        with mock.patch("admissionapp.protected_media.download_url", return_value=signed) as url:
+            response = self.client.get("/media/direct/1/new.pdf")
+        url.assert_called_once_with("direct/1/new.pdf")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Location"], signed)
+        self.assertEqual(response["Cache-Control"], "private, no-store")
+
+
+@unittest.skipUnless(
+    mock_aws and direct_uploads.boto3 and importlib.util.find_spec("storages"),
+    "direct uploads need boto3, django-storages and moto",
+)
+class DirectUploadTests(TestCase):
+    """presign -> (browser upload) -> complete -> attach, against moto (direct_uploads.py)."""
+
+    def setUp(self):
+        aws = mock_aws()
+        aws.start()
+        self.addCleanup(aws.stop)
+        settings_override = override_settings(
+            DIRECT_UPLOADS=True,
+            STORAGES=_storages({
+                "BACKEND": "storages.backends.s3.S3Storage",
+                "OPTIONS": {
+                    "bucket_name": "documents",
+                    "region_name": "us-east-1",
+                    "access_key": "testing",
+                    "secret_key": "testing",
+                },
+            }),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        client_override = mock.patch.object(direct_uploads, "_client", None)
+        client_override.start()
+        self.addCleanup(client_override.stop)
+        self.s3 = direct_uploads._s3()
+        self.s3.create_bucket(Bucket="documents")
+        self.user = CustomUser.objects.create_user("student", "student@example.com", "pw")
+
+    def upload(self, body, filename="marksheet.pdf"):
+        """Presign, then put the object where the browser would have posted it."""
+        post = direct_uploads.presign_upload(
+            self.user, "ctz_file", filename, len(body), "application/pdf"
+        )
+        self.s3.put_object(
+            Bucket="documents", Key=post["fields"]["key"], Body=body,
+            ContentType="application/pdf",
+        )
+        return post
+
+    def test_presign_binds_key_and_size(self):
+        post = direct_uploads.presign_upload(self.user, "ctz_file", "id.pdf", 1234)
+        self.assertTrue(post["fields"]["key"].startswith(f"incoming/{self.user.pk}/"))
+        self.assertTrue(post["fields"]["key"].endswith(".pdf"))
+        with self.assertRaises(DirectUploadError) as caught:
+            direct_uploads.presign_upload(self.user, "ctz_file", "id.exe", 1234)
+        self.assertEqual(caught.exception.status, 415)
+
+    def test_valid_upload_is_attached_in_the_bucket(self):
+        post = self.upload(b"%PDF-1.4\n" + b"x" * 5000)
+        completed = direct_uploads.complete_upload(self.user, post["token"])
+        self.assertEqual(completed["size"], 5009)
+
+        request = RequestFactory().post("/", {"ctz_file_direct": completed["token"]})
+        request.user = self.user
+        files = direct_uploads.attach_direct_uploads(request, PersonalInfo, request.FILES.copy())
+        stored = files["ctz_file"]
+        self.assertTrue(stored.name.startswith(f"direct/{self.user.pk}/"))
+        self.assertEqual(stored.sniffed_content_type, "application/pdf")
+
+        info = PersonalInfo.objects.create(user=self.user, ctz_file=stored)
+        info.refresh_from_db()
+        self.assertEqual(info.ctz_file.size, 5009)
+        with info.ctz_file.open("rb") as fh:
+            self.assertEqual(fh.read(5), b"%PDF-")
+
+    def test_invalid_upload_is_rejected_and_deleted(self):
+        post = self.upload(b"MZ\x90\x00 not a pdf")
+        with self.assertRaises(DirectUploadError) as caught:
+            direct_uploads.complete_upload(self.user, post["token"])
+        self.assertEqual(caught.exception.status, 415)
+        listed = self.s3.list_objects_v2(Bucket="documents")
+        self.assertEqual(listed.get("KeyCount"), 0)
+
+    def test_pending_token_cannot_be_attached(self):
+        post = self.upload(b"%PDF-1.4\n")
+        request = RequestFactory().post("/", {"ctz_file_direct": post["token"]})
+        request.user = self.user
+        with self.assertRaises(DirectUploadError):
+            direct_uploads.attach_direct_uploads(request, PersonalInfo, request.FILES.copy())
+
+
+class RenditionJobTests(TestCase):
+    """Renditions are queued with the picture and built by the worker (renditions.py)."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        picture = io.BytesIO()
+        Image.new("RGB", (1200, 600), "navy").save(picture, "JPEG")
+        self.course = CourseDetails.objects.create(
+            degree="Bachelor", course_name="BIT", course_full_name="Information Technology",
+            course_code="BIT", course_duration="4 Years",
+            bg_pic=SimpleUploadedFile("bg.jpg", picture.getvalue(), "image/jpeg"),
+        )
+
+    def test_save_queues_and_the_worker_builds(self):
+        source = self.course.bg_pic.name
+        self.assertTrue(RenditionJob.objects.filter(source=source).exists())
+        # Nothing is built in the request: the tag falls back to the original.
+        self.assertEqual(rendition_url(self.course.bg_pic, "card"), self.course.bg_pic.url)
+
+        call_command("build_renditions", "--queued", "--once", stdout=io.StringIO())
+        self.assertFalse(RenditionJob.objects.exists())
+        self.assertTrue(rendition_url(self.course.bg_pic, "card").endswith(
+            rendition_name(source, "card")
+        ))
+
+    def test_deleted_rendition_is_noticed_and_queued_again(self):
+        call_command("build_renditions", "--queued", "--once", stdout=io.StringIO())
+        rendition_url(self.course.bg_pic, "card")
+        os.remove(os.path.join(self.media_root, rendition_name(self.course.bg_pic.name, "card")))
+
+        self.assertEqual(rendition_url(self.course.bg_pic, "card"), self.course.bg_pic.url)
+        self.assertTrue(RenditionJob.objects.filter(source=self.course.bg_pic.name).exists())
+
+
+class ChunkedUploadTests(TestCase):
+    """Resumable uploads count only complete chunks (chunked_uploads.py)."""
+
+    BODY = b"%PDF-1.4\n" + b"0123456789" * 10
+
+    def setUp(self):
+        self.upload_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.upload_root)
+        settings_override = override_settings(CHUNKED_UPLOAD_DIR=self.upload_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = CustomUser.objects.create_user("student", "student@example.com", "pw")
+        self.upload = create_upload(self.user, "marksheet.pdf", len(self.BODY))
+
+    def send(self, offset, data, length=None):
+        return append_chunk(self.upload, offset, io.BytesIO(data), length or len(data))
+
+    def test_offset_mismatch_reports_the_server_offset(self):
+        self.send(0, self.BODY[:50])
+        with self.assertRaises(OffsetMismatch) as caught:
+            self.send(0, self.BODY[:50])  # a retry of a chunk that was accepted
+        self.assertEqual(caught.exception.status, 409)
+        self.assertEqual(caught.exception.offset, 50)
+
+    def test_resume_after_a_partial_chunk(self):
+        self.send(0, self.BODY[:50])
+        with self.assertRaises(ChunkedUploadError):
+            # The connection dropped 20 bytes into a 60-byte chunk.
+            self.send(50, self.BODY[50:70], length=60)
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.offset, 50)
+
+        self.send(50, self.BODY[50:])
+        finalize_upload(self.upload)
+        self.assertEqual(self.upload.status, ChunkedUpload.COMPLETE)
+        with open(os.path.join(upload_dir(self.upload), "assembled"), "rb") as fh:
+            self.assertEqual(fh.read(), self.BODY)
+        self.assertEqual(
+            [name for name in os.listdir(upload_dir(self.upload)) if name != "assembled"], []
+        )
+
+    def test_finalize_with_a_size_mismatch_discards_the_upload(self):
+        self.send(0, self.BODY)
+        part = [n for n in os.listdir(upload_dir(self.upload)) if n.endswith(".part")][0]
+        with open(os.path.join(upload_dir(self.upload), part), "ab") as fh:
+            fh.write(b"extra")
+        with self.assertRaises(ChunkedUploadError) as caught:
+            finalize_upload(self.upload)
+        self.assertEqual(caught.exception.status, 409)
+        self.assertFalse(ChunkedUpload.objects.filter(pk=self.upload.pk).exists())
+        self.assertFalse(os.path.exists(upload_dir(self.upload)))
+
+    def test_finalize_is_claimed_once(self):
+        self.send(0, self.BODY)
+        ChunkedUpload.objects.filter(pk=self.upload.pk).update(status=ChunkedUpload.ASSEMBLING)
+        with self.assertRaises(ChunkedUploadError) as caught:
+            finalize_upload(self.upload)
+        self.assertEqual(caught.exception.status, 409)
+        self.assertFalse(os.path.exists(os.path.join(upload_dir(self.upload), "assembled")))
+
+
+class OfferCodeTests(TestCase):
+    """Offer letter codes verify offline; only signed ones reach the database."""
+
+    def setUp(self):
+        user = CustomUser.objects.create_user("admitted", "admitted@example.com", "pw")
+        course = CourseDetails.objects.create(
+            degree="Bachelor", course_name="BIT", course_full_name="Information Technology",
+            course_code="BIT", course_duration="4 Years",
+        )
+        self.application = Application.objects.create(
+            user=user, course=course, application_status="approved",
+            approved_rejected_date=timezone.now() - timedelta(days=3),
+        )
+        self.code = offer_code(
+            self.application.application_no, self.application.approved_rejected_date
+        )
+
+    def verify_url(self, code):
+        return reverse("verify_offer_letter", args=[code])
+
+    def test_valid_code_round_trips(self):
+        with self.assertNumQueries(0):
+            verified = verify_offer_code(self.code)
+        self.assertEqual(
+            verified,
+            (
+                self.application.application_no,
+                timezone.localdate(self.application.approved_rejected_date),
+            ),
+        )
+        response = self.client.get(self.verify_url(self.code))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["valid"])
+
+    def test_tampered_codes_are_rejected_without_queries(self):
+        application_no, on, mac = self.code.split(".")
+        flipped = ("A" if mac[0] != "A" else "B") + mac[1:]
+        other_day = (timezone.localdate(self.application.approved_rejected_date)
+                     - timedelta(days=1)).strftime("%Y%m%d")
+        for code in (
+            f"{application_no}.{on}.{flipped}",
+            f"{application_no}.{other_day}.{mac}",
+            f"{application_no[:-1]}X.{on}.{mac}",
+        ):
+            with self.subTest(code=code):
+                with self.assertNumQueries(0):
+                    self.assertIsNone(verify_offer_code(code))
+                self.assertEqual(self.client.get(self.verify_url(code)).status_code, 404)
+
+    def test_rejected_or_reapproved_application_is_withdrawn(self):
+        Application.objects.filter(pk=self.application.pk).update(application_status="rejected")
+        self.assertEqual(self.client.get(self.verify_url(self.code)).status_code, 410)
+
+        Application.objects.filter(pk=self.application.pk).update(
+            application_status="approved", approved_rejected_date=timezone.now()
+        )
+        self.assertEqual(self.client.get(self.verify_url(self.code)).status_code, 410)
+
+    def test_esewa_signature_is_unchanged(self):
+        key = "8gBm/:&EnhH.1/q"
+        payload = "total_amount=100,transaction_uuid=11-201-13,product_code=EPAYTEST"
+        # The construction esewa_signature used before hmac_sha256_b64 existed.
+        expected = base64.b64encode(
+            hmac.new(key.encode(), payload.encode(), hashlib.sha256).digest()
+        ).decode()
+        signature = esewa_signature(
+            key, total_amount="100", transaction_uuid="11-201-13", product_code="EPAYTEST"
+        )
+        self.assertEqual(signature, expected)
+        self.assertEqual(signature, "5DZywcrTKD0gia/rsSMcrRHmJl+4Tbol6S+lWgdJ94E=")
+
+
+class DossierTests(TestCase):
+    """Dossiers load in four queries per batch and render serially in the view."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            DOSSIER_IMAGE_CACHE_DIR=os.path.join(self.media_root, "cache"),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        course = CourseDetails.objects.create(
+            degree="Bachelor", course_name="BIT", course_full_name="Information Technology",
+            course_code="BIT", course_duration="4 Years",
+        )
+        self.applications = []
+        for n in range(3):
+            user = CustomUser.objects.create_user(f"applicant{n}", f"a{n}@example.com", "pw")
+            PersonalInfo.objects.create(user=user)
+            for level in ("SEE", "+2"):
+                EducationalInfo.objects.create(
+                    user=user, level=level, course_name="Science", college_name="College",
+                    passed_year=2020, grade_percent=80,
+                )
+            application = Application.objects.create(user=user, course=course)
+            PaymentDetail.objects.create(
+                user=user, application=application, amount_paid="50.00",
+                transaction_uuid=f"txn-dossier-{n}", status="COMPLETE", payment_method="e-Sewa",
+            )
+            self.applications.append(application)
+
+    def test_load_dossiers_runs_four_queries(self):
+        ids = [a.pk for a in reversed(self.applications)]
+        with self.assertNumQueries(4):
+            dossiers = load_dossiers(ids)
+        self.assertEqual(
+            [d["application"]["application_no"] for d in dossiers],
+            [a.application_no for a in reversed(self.applications)],
+        )
+        self.assertTrue(all(len(d["educational"]) == 2 and d["payment"] for d in dossiers))
+
+    def test_admin_zip_renders_without_a_process_pool(self):
+        admin = CustomUser.objects.create_user("staff", "staff@example.com", "pw", is_staff=True)
+        self.client.force_login(admin)
+        with mock.patch(
+            "admissionapp.dossiers.ProcessPoolExecutor", side_effect=AssertionError
+        ):
+            response = self.client.get(reverse("applicant_dossiers_zip"), {"status": "pending"})
+            body = b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        names = zipfile.ZipFile(io.BytesIO(body)).namelist()
+        self.assertEqual(sorted(names), sorted(f"{a.application_no}.pdf" for a in self.applications))
+
+
+class SaveWithFilesTests(TestCase):
+    """A failed submission leaves no files behind (submissions.py)."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = CustomUser.objects.create_user("student", "student@example.com", "pw")
+
+    def record(self, **files):
+        return EducationalInfo(
+            user=self.user, course_name="Science", college_name="College",
+            passed_year=2020, grade_percent=80, **files,
+        )
+
+    def stored_files(self):
+        return [
+            os.path.join(root, name)
+            for root, _, names in os.walk(self.media_root)
+            for name in names
+        ]
+
+    def test_invalid_field_stores_nothing(self):
+        info = self.record(
+            upload_transcript1=SimpleUploadedFile("t.pdf", b"%PDF-1.4\n", "application/pdf"),
+            upload_character=SimpleUploadedFile("c.exe", b"MZ not a pdf", "application/octet-stream"),
+        )
+        with self.assertRaises(ValidationError) as caught:
+            save_with_files(info, ["upload_transcript1", "upload_character"])
+        self.assertEqual(list(caught.exception.message_dict), ["upload_character"])
+        self.assertEqual(self.stored_files(), [])
+
+    def test_validation_failure_during_save_removes_stored_files(self):
+        def reject(sender, instance, **kwargs):
+            raise ValidationError("Rejected after the files were stored.")
+
+        post_save.connect(reject, sender=EducationalInfo, dispatch_uid="test_reject")
+        self.addCleanup(post_save.disconnect, sender=EducationalInfo, dispatch_uid="test_reject")
+        info = self.record(
+            upload_transcript1=SimpleUploadedFile("t.pdf", b"%PDF-1.4 one", "application/pdf"),
+            upload_character=SimpleUploadedFile("c.pdf", b"%PDF-1.4 two", "application/pdf"),
+        )
+        with self.assertRaises(ValidationError):
+            save_with_files(info, ["upload_transcript1", "upload_character"])
+        self.assertTrue(info.upload_transcript1._committed)  # it was stored...
+        self.assertEqual(self.stored_files(), [])  # ...and removed again
+        self.assertFalse(EducationalInfo.objects.exists())
+
+
+class ApplicationExportTests(TestCase):
+    """ExportSpec downloads of applications (exports.py)."""
+
+    def setUp(self):
+        admin = CustomUser.objects.create_user("staff", "staff@example.com", "pw", is_staff=True)
+        self.client.force_login(admin)
+        course = CourseDetails.objects.create(
+            degree="Bachelor", course_name="BIT", course_full_name="Information Technology",
+            course_code="BIT", course_duration="4 Years",
+        )
+        self.applications = {}
+        for status, first_name in (
+            ("pending", '=HYPERLINK("http://evil.example","x")'),
+            ("approved", "Sita"),
+        ):
+            user = CustomUser.objects.create_user(
+                f"{status}-user", f"{status}@example.com", "pw",
+                first_name=first_name, last_name="Sharma",
+            )
+            self.applications[status] = Application.objects.create(
+                user=user, course=course, application_status=status
+            )
+
+    def csv_rows(self, response):
+        self.assertTrue(response.streaming)
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        return chunks, list(csv.reader(io.StringIO("".join(chunks).lstrip("\ufeff"))))
+
+    def test_csv_streams_header_first_and_neutralizes_formulas(self):
+        response = self.client.get(
+            reverse("export_total_applications"), {"format": "csv", "fresh": "1"}
+        )
+        self.assertEqual(response.status_code, 200)
+        chunks, rows = self.csv_rows(response)
+        self.assertEqual(
+            chunks[0],
+            "\ufeffSN,Name,Mobile,Application No.,Applied Course,Applied Degree,"
+            "Application Status,Submitted Date,Approved/Rejected Date\r\n",
+        )
+        by_number = {row[3]: row for row in rows[1:]}
+        pending = by_number[self.applications["pending"].application_no]
+        self.assertEqual(pending[1], '\'=HYPERLINK("http://evil.example","x") Sharma')
+        self.assertEqual(pending[4:7], ["BIT", "Bachelor", "Pending"])
+        self.assertEqual(by_number[self.applications["approved"].application_no][1], "Sita Sharma")
+
+    def test_fixed_status_export_ignores_a_status_param(self):
+        response = self.client.get(
+            reverse("export_approved_applications"),
+            {"format": "csv", "status": "pending", "fresh": "1"},
+        )
+        _, rows = self.csv_rows(response)
+        self.assertEqual(
+            [row[3] for row in rows[1:]], [self.applications["approved"].application_no]
+        )
+
+    def test_rows_come_from_one_query(self):
+        with self.assertNumQueries(1):
+            rows = list(APPLICATION_EXPORTS["total"].rows({}))
+        self.assertEqual([row[0] for row in rows], [1, 2])
+
+    def test_every_format_writes_the_same_rows(self):
+        spec = APPLICATION_EXPORTS["approved"]
+        number = self.applications["approved"].application_no
+        outputs = {}
+        for fmt in ("csv", "xlsx", "jsonl"):
+            outputs[fmt] = io.BytesIO()
+            spec.write(outputs[fmt], {}, fmt)
+            outputs[fmt].seek(0)
+
+        rows = list(csv.reader(io.StringIO(outputs["csv"].read().decode("utf-8-sig"))))
+        self.assertEqual(rows[0], spec.headers)
+        self.assertEqual(rows[1][:4], ["1", "Sita Sharma", "", number])
+
+        sheet = load_workbook(outputs["xlsx"], read_only=True).active
+        cells = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(list(cells[0]), spec.headers)
+        self.assertEqual(list(cells[1][:4]), [1, "Sita Sharma", None, number])
+
+        lines = outputs["jsonl"].read().decode().splitlines()
+        record = json.loads(lines[0])
+        self.assertEqual(list(record), spec.keys)
+        self.assertEqual(
+            (record["sn"], record["name"], record["application_no"], record["status"]),
+            (1, "Sita Sharma", number, "approved"),
+        )
+
+
+class UploadHandlerTests(TestCase):
+    """Document uploads are inspected while they stream in (upload_handlers.py)."""
+
+    def parse(self, **files):
+        request = RequestFactory().post("/", {"note": "kept", **files})
+        return request, request.FILES
+
+    def test_oversize_upload_stops_without_resetting_the_connection(self):
+        with mock.patch("admissionapp.upload_handlers.MAX_UPLOAD_SIZE", 1000):
+            request, files = self.parse(
+                ctz_file=SimpleUploadedFile("id.pdf", b"%PDF-1.4\n" + b"x" * 5000),
+            )
+        self.assertNotIn("ctz_file", files)
+        self.assertEqual(
+            rejected_uploads(request), {"ctz_file": "File size must be equal or less than 100 MB."}
+        )
+        self.assertEqual(request.POST["note"], "kept")  # fields before it survive
+
+    def test_mime_type_is_sniffed_from_the_first_chunk(self):
+        request, files = self.parse(
+            ctz_file=SimpleUploadedFile("id.pdf", b"%PDF-1.4\n", "text/plain"),
+            upload_transcript1=SimpleUploadedFile("t.pdf", b"just text", "text/plain"),
+        )
+        self.assertEqual(files["ctz_file"].sniffed_content_type, "application/pdf")
+        self.assertNotIn("upload_transcript1", files)
+        self.assertEqual(
+            rejected_uploads(request), {"upload_transcript1": "Only images and PDFs are allowed."}
+        )
+
+    def test_sha256_is_computed_in_memory_and_on_disk(self):
+        body = b"%PDF-1.4\n" + os.urandom(4096)
+        for max_memory in (1024 * 1024, 1024):  # memory handler, then temp-file handler
+            with self.subTest(max_memory=max_memory), override_settings(
+                FILE_UPLOAD_MAX_MEMORY_SIZE=max_memory
+            ):
+                _, files = self.parse(ctz_file=SimpleUploadedFile("id.pdf", body))
+                self.assertEqual(files["ctz_file"].sha256, hashlib.sha256(body).hexdigest())
+                self.assertEqual(
+                    hasattr(files["ctz_file"], "temporary_file_path"), max_memory == 1024
+                )
@@ -0,0 +1,113 @@
+# admissionapp/upload_handlers.py
+"""
+Upload handlers that inspect document uploads while they stream in.
+
+Drop-in replacements for Django's MemoryFileUploadHandler and
+TemporaryFileUploadHandler (see FILE_UPLOAD_HANDLERS). For the document
+fields (profile picture, citizenship, educational uploads) the handler
+that stores the file also:
+
+- sniffs the MIME type from the first chunk and skips the file at once if
+  it is not an image or PDF, so the rest of it never touches the disk;
+- counts bytes and stops the upload as soon as a file passes
+  MAX_UPLOAD_SIZE: the rest of the request is discarded instead of being
+  spooled to a temp file, and the form answers with the error;
+- feeds every chunk to SHA-256.
+
+Accepted files arrive with ``sniffed_content_type`` and ``sha256`` set
+(validate_file_content uses the former instead of re-reading the file).
+Rejected ones are missing from request.FILES, and the reason is in
+rejected_uploads(request), keyed by field name.
+"""
+import hashlib
+import mimetypes
+
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler,
+    SkipFile,
+    StopUpload,
+    TemporaryFileUploadHandler,
+)
+
+from .models import (
+    EDUCATIONAL_FILE_FIELDS,
+    MAX_UPLOAD_SIZE,
+    PERSONAL_FILE_FIELDS,
+    is_accepted_mime_type,
+    sniff_mime_type,
+)
+
+
+DOCUMENT_UPLOAD_FIELDS = frozenset(
+    field for field, _ in PERSONAL_FILE_FIELDS + EDUCATIONAL_FILE_FIELDS
+)
+SNIFF_BYTES = 2048
+
+
+def rejected_uploads(request):
+    """{field name: message} for files the upload handlers refused."""
+    return getattr(request, "upload_errors", {})
+
+
+class DocumentInspectionMixin:
+    def __init__(self, request=None):
+        super().__init__(request)
+        if request is not None and not hasattr(request, "upload_errors"):
+            request.upload_errors = {}
+
+    def new_file(self, field_name, file_name, content_type, *args, **kwargs):
+        self.inspecting = field_name in DOCUMENT_UPLOAD_FIELDS
+        self.received = 0
+        self.digest = hashlib.sha256()
+        self.sniffed_content_type = None
+        # Last: the memory handler raises StopFutureHandlers from here.
+        super().new_file(field_name, file_name, content_type, *args, **kwargs)
+
+    def stores_data(self):
+        return True
+
+    def _reject(self, message):
+        if self.request is not None:
+            self.request.upload_errors[self.field_name] = message
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.inspecting and self.stores_data():
+            if start == 0:
+                self.sniffed_content_type = sniff_mime_type(raw_data[:SNIFF_BYTES])
+                declared = (
+                    self.sniffed_content_type
+                    or self.content_type
+                    or mimetypes.guess_type(self.file_name)[0]
+                )
+                if not is_accepted_mime_type(declared):
+                    self._reject("Only images and PDFs are allowed.")
+                    raise SkipFile()
+            self.received += len(raw_data)
+            if self.received > MAX_UPLOAD_SIZE:
+                self._reject("File size must be equal or less than 100 MB.")
+                # Store nothing more. The rest of the body is read and
+                # dropped, so the form can still answer with the error
+                # instead of the connection being reset under the browser.
+                raise StopUpload(connection_reset=False)
+            self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None and self.inspecting:
+            file.sha256 = self.digest.hexdigest()
+            file.sniffed_content_type = self.sniffed_content_type
+        return file
+
+
+class InspectingMemoryFileUploadHandler(DocumentInspectionMixin, MemoryFileUploadHandler):
+    def stores_data(self):
+        # When not activated the chunks pass through to the temp-file handler,
+        # which does the inspection; don't hash them twice.
+        return self.activated
+
+
+class InspectingTemporaryFileUploadHandler(
+    DocumentInspectionMixin, TemporaryFileUploadHandler
+):
+    pass
@@ -60,6 +60,27 @@ urlpatterns = [
         views.course_applicant_detail,
         name="course_applicant_detail",
     ),
+    path(
+        "course-application-list/documents.zip",
+        views.applicant_documents_zip,
+        name="applicant_documents_zip",
+    ),
+    path(
+        "course-application-list/dossiers.zip",
+        views.applicant_dossiers_zip,
+        name="applicant_dossiers_zip",
+    ),
+    path(
+        "course-application-list/offer-letters.zip",
+        views.offer_letters_zip,
+        name="offer_letters_zip",
+    ),
+    path("offer-letters/verify/", views.verify_offer_letter, name="verify_offer_letter_query"),
+    path(
+        "offer-letters/verify/<str:code>/",
+        views.verify_offer_letter,
+        name="verify_offer_letter",
+    ),
     path(
         "approval-rejection/<int:pk>/",
         views.approval_rejection,
@@ -84,25 +105,51 @@ urlpatterns = [
     path("total-rejected/", views.total_rejected_report, name="total_rejected"),
     path(
         "reports/export-total-application/",
-        views.export_total_applications,
+        views.export_applications,
+        {"export": "total"},
         name="export_total_applications",
     ),
     path(
         "export-approved-application/",
-        views.export_approved_applications,
+        views.export_applications,
+        {"export": "approved"},
         name="export_approved_applications",
     ),
     path(
         "export-rejected-application/",
-        views.export_rejected_applications,
+        views.export_applications,
+        {"export": "rejected"},
         name="export_rejected_applications",
     ),
     
     path(
         "export-pending-application/",
-        views.export_pending_applications,
+        views.export_applications,
+        {"export": "pending"},
         name="export_pending_applications",
     ),
+    path(
+        "reports/export-columnar/<str:dataset>/",
+        views.export_columnar,
+        name="export_columnar",
+    ),
+    path("reports/export-jobs/", views.export_jobs, name="export_jobs"),
+    path(
+        "reports/export-jobs/<int:pk>/status/",
+        views.export_job_status,
+        name="export_job_status",
+    ),
+    path(
+        "reports/export-jobs/<int:pk>/download/",
+        views.export_job_download,
+        name="export_job_download",
+    ),
+    path("api/changes/", views.change_feed, name="change_feed"),
+    path(
+        "reports/reconcile-settlement/",
+        views.reconcile_settlement,
+        name="reconcile_settlement",
+    ),
     
     path('contact/', views.contact, name='contact'),
      
@@ -148,5 +195,19 @@ urlpatterns = [
         name="password_reset_complete",
     ),
     path('applicant/<int:applicant_id>/download-pdf/', views.download_applicant_pdf, name='download_applicant_pdf'),
+    path("payments/<int:pk>/receipt.pdf", views.payment_receipt, name="payment_receipt"),
+    path("uploads/", views.chunked_upload_create, name="chunked_upload_create"),
+    path("uploads/<uuid:upload_id>/", views.chunked_upload, name="chunked_upload"),
+    path(
+        "uploads/<uuid:upload_id>/finalize/",
+        views.chunked_upload_finalize,
+        name="chunked_upload_finalize",
+    ),
+    path("direct-uploads/", views.direct_upload_create, name="direct_upload_create"),
+    path(
+        "direct-uploads/complete/",
+        views.direct_upload_complete,
+        name="direct_upload_complete",
+    ),
     
 ]
@@ -1,8 +1,10 @@
+import hmac
+import os
 from math import ceil
 import uuid, json, base64, requests
 import requests  # type: ignore
 from django.shortcuts import redirect, resolve_url
-from io import BytesIO 
+from io import BytesIO, TextIOWrapper
 from decimal import Decimal 
 from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
@@ -15,6 +17,7 @@ from django.contrib.auth.decorators import (
 )
 from django.contrib.auth.forms import AuthenticationForm
 from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
 from django.core.mail import EmailMessage, EmailMultiAlternatives
 from django.db import transaction
 from django.db.models import Q, Case, When, IntegerField, Count
@@ -22,6 +25,10 @@ from django.http import (
     HttpResponse,
     JsonResponse,
     HttpResponseBadRequest,
+    HttpResponseForbidden,
+    Http404,
+    StreamingHttpResponse,
+    FileResponse,
 )
 
 from django.shortcuts import render, redirect, get_object_or_404
@@ -32,13 +39,16 @@ from django.utils.dateparse import parse_date
 from django.utils.encoding import force_bytes, force_str
 from django.utils.html import strip_tags
 from django.utils.http import (
+    parse_etags,
     urlsafe_base64_encode,
     urlsafe_base64_decode
 )
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import (
+    require_GET,
     require_http_methods,
-    require_POST
+    require_POST,
+    require_safe,
 )
 from django.views.generic import (
     CreateView,
@@ -48,10 +58,6 @@ from django.views.generic import (
     DeleteView,
 )
 
-from openpyxl import Workbook  # type: ignore
-from openpyxl.styles import Font, Alignment  # type: ignore
-from openpyxl.utils import get_column_letter  # type: ignore
-
 from .forms import (
     UserRegisterForm,
     CourseDetailsForm,
@@ -60,6 +66,8 @@ from .forms import (
     RejectReasonForm,
     UserContactForm,
     PaymentDetailForm,
+    SettlementUploadForm,
+    ExportJobForm,
 )
 from .models import (
     CourseDetails,
@@ -68,6 +76,69 @@ from .models import (
     Application,
     PaymentDetail,
     Notification,
+    ExportJob,
+    ReceiptJob,
+    ChunkedUpload,
+    Document,
+    EDUCATIONAL_FILE_FIELDS,
+)
+
+from .columnar import (
+    COLUMNAR_DATASETS,
+    COLUMNAR_FORMATS,
+    ColumnarDataChanged,
+    columnar_file_response,
+    pyarrow_available,
+)
+from .change_feed import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, change_feed_response
+from .chunked_uploads import (
+    ChunkedUploadError,
+    OffsetMismatch,
+    append_chunk,
+    attach_uploads,
+    create_upload,
+    discard_upload,
+    finalize_upload,
+    release_uploads,
+)
+from .direct_uploads import (
+    DirectUploadError,
+    attach_direct_uploads,
+    complete_upload,
+    direct_uploads_enabled,
+    presign_upload,
+)
+from .document_archive import (
+    applicant_documents,
+    applications_for_archive,
+    documents_archive_name,
+    iter_zip,
+)
+from .dossier_pdf import render_dossier
+from .dossiers import (
+    dossier_archive_name,
+    iter_dossier_data,
+    iter_dossier_zip,
+    iter_rendered_dossiers,
+    load_dossiers,
+)
+from .export_snapshots import current_manifest, snapshot_response
+from .offer_letters import (
+    approved_applications,
+    approved_on,
+    iter_offer_letters,
+    offer_letters_archive_name,
+    verify_offer_code,
+)
+from .protected_media import clean_media_name, is_public, media_response, owns_media
+from .receipts import receipt_etag, request_receipt
+from .submissions import save_with_files
+from .reconciliation import iter_statement_rows, reconcile_statement
+from .upload_handlers import rejected_uploads
+from .exports import (
+    APPLICATION_EXPORTS,
+    DEFAULT_EXPORT_FORMAT,
+    EXPORT_FORMATS,
 )
 
 #impors for custom passwordchange 
@@ -444,6 +515,15 @@ class CourseDetailView(DetailView):
 # -----------------------------
 # Personal Info (Create)
 # -----------------------------
+def _form_with_upload_errors(request, form):
+    """form.is_valid(), also failing on files the upload handlers rejected."""
+    valid = form.is_valid()
+    for field, message in rejected_uploads(request).items():
+        form.add_error(field if field in form.fields else None, message)
+        valid = False
+    return valid
+
+
 @login_required
 def PersonalInfo_view(request):
     # Check if the user already has a personal info record
@@ -457,11 +537,19 @@ def PersonalInfo_view(request):
 
     # If no record, let the form create a new record
     if request.method == "POST":
-        form = PersonalInfoForm(request.POST, request.FILES)
-        if form.is_valid():
+        try:
+            files = attach_uploads(request, ["ctz_file"])
+            if direct_uploads_enabled():
+                files = attach_direct_uploads(request, PersonalInfo, files)
+        except ChunkedUploadError as e:
+            messages.error(request, str(e))
+            files = request.FILES
+        form = PersonalInfoForm(request.POST, files)
+        if _form_with_upload_errors(request, form):
             personalinfo = form.save(commit=False)
             personalinfo.user = request.user
             personalinfo.save()
+            release_uploads(files)
             
             # Create notification
             create_notification(
@@ -479,13 +567,16 @@ def PersonalInfo_view(request):
     return render(
         request,
         "student/personal_info.html",
-        {"form": form}
+        {"form": form, "direct_uploads": direct_uploads_enabled()}
     )
 
 
 # -----------------------------
 # Educational Info (Create)
 # -----------------------------
+EDUCATIONAL_UPLOAD_FIELDS = [field for field, _ in EDUCATIONAL_FILE_FIELDS]
+
+
 @login_required
 def EducationalInfo_view(request):
     educationinfo = EducationalInfo.objects.filter(
@@ -503,8 +594,18 @@ def EducationalInfo_view(request):
         # (kept as in original comment)
 
     if request.method == "POST":
+        files = None
         try:
-            edu = EducationalInfo.objects.create(
+            # Large documents may arrive as finished chunked uploads
+            files = attach_uploads(request, EDUCATIONAL_UPLOAD_FIELDS)
+            if direct_uploads_enabled():
+                files = attach_direct_uploads(request, EducationalInfo, files)
+            rejected = rejected_uploads(request)
+            if rejected:
+                raise ValidationError(
+                    {field: [message] for field, message in rejected.items()}
+                )
+            edu = EducationalInfo(
                 user=request.user,
                 level=request.POST.get("level", "SEE"),
                 faculty=request.POST.get("faculty", "Commerce"),
@@ -516,25 +617,17 @@ def EducationalInfo_view(request):
                 college_name=request.POST.get("college_name"),
                 passed_year=request.POST.get("passed_year"),
                 grade_percent=request.POST.get("grade_percent"),
-                upload_transcript1=request.FILES.get(
-                    "upload_transcript1"
-                ),
-                upload_transcript2=request.FILES.get(
-                    "upload_transcript2"
-                ),
-                upload_character=request.FILES.get(
-                    "upload_character"
-                ),
-                upload_license=request.FILES.get("upload_license"),
-                upload_other=request.FILES.get("upload_other"),
-                upload_other1=request.FILES.get("upload_other1"),
-                created_at=timezone.now(),
-                updated_at=timezone.now(),
+                upload_transcript1=files.get("upload_transcript1"),
+                upload_transcript2=files.get("upload_transcript2"),
+                upload_character=files.get("upload_character"),
+                upload_license=files.get("upload_license"),
+                upload_other=files.get("upload_other"),
+                upload_other1=files.get("upload_other1"),
             )
 
-            # Run full model validation (validators for year, % etc.)
-            edu.full_clean()
-            edu.save() 
+            # Validate everything, then insert once; see submissions.py.
+            save_with_files(edu, EDUCATIONAL_UPLOAD_FIELDS)
+            release_uploads(files)
             
             # Create notification
             create_notification(
@@ -549,6 +642,8 @@ def EducationalInfo_view(request):
             )
             return redirect("education_list")
 
+        except ChunkedUploadError as e:
+            messages.error(request, str(e))
         except ValidationError as e:
             for field, errors in e.message_dict.items():
                 for error in errors:
@@ -556,7 +651,137 @@ def EducationalInfo_view(request):
         except Exception as e:
             messages.error(request, f"An error occurred: {e}")
 
-    return render(request, "student/educational_info.html")
+    return render(
+        request,
+        "student/educational_info.html",
+        {"direct_uploads": direct_uploads_enabled()},
+    )
+
+
+# -----------------------------
+# Resumable uploads (see chunked_uploads.py)
+# -----------------------------
+def _chunked_upload_json(upload, status=200):
+    response = JsonResponse(
+        {
+            "id": str(upload.pk),
+            "filename": upload.filename,
+            "size": upload.size,
+            "offset": upload.offset,
+            "status": upload.status,
+        },
+        status=status,
+    )
+    response["Upload-Offset"] = str(upload.offset)
+    response["Upload-Length"] = str(upload.size)
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+def _chunked_upload_error(error):
+    response = JsonResponse({"error": str(error)}, status=error.status)
+    if isinstance(error, OffsetMismatch):
+        response["Upload-Offset"] = str(error.offset)
+    return response
+
+
+@require_POST
+@login_required
+def chunked_upload_create(request):
+    """Start an upload: ``filename`` and ``Upload-Length`` (or ``size``)."""
+    try:
+        size = int(request.headers.get("Upload-Length") or request.POST.get("size"))
+    except (TypeError, ValueError):
+        size = None
+    try:
+        upload = create_upload(
+            request.user,
+            request.POST.get("filename"),
+            size,
+            request.POST.get("content_type", ""),
+        )
+    except ChunkedUploadError as e:
+        return _chunked_upload_error(e)
+    response = _chunked_upload_json(upload, status=201)
+    response["Location"] = reverse("chunked_upload", args=[upload.pk])
+    return response
+
+
+@require_http_methods(["GET", "HEAD", "PATCH", "DELETE"])
+@login_required
+def chunked_upload(request, upload_id):
+    """
+    GET/HEAD: where to resume (Upload-Offset). PATCH: append the request
+    body at Upload-Offset. DELETE: abandon the upload.
+    """
+    upload = get_object_or_404(ChunkedUpload, pk=upload_id, user=request.user)
+    if request.method == "DELETE":
+        discard_upload(upload)
+        return HttpResponse(status=204)
+    if request.method == "PATCH":
+        try:
+            offset = int(request.headers.get("Upload-Offset", ""))
+            length = int(request.META.get("CONTENT_LENGTH") or "")
+        except ValueError:
+            return _chunked_upload_error(
+                ChunkedUploadError("Upload-Offset and Content-Length are required.")
+            )
+        try:
+            append_chunk(upload, offset, request, length)
+        except ChunkedUploadError as e:
+            return _chunked_upload_error(e)
+    return _chunked_upload_json(upload)
+
+
+@require_POST
+@login_required
+def chunked_upload_finalize(request, upload_id):
+    """Assemble a fully received upload so a form can attach it by id."""
+    upload = get_object_or_404(ChunkedUpload, pk=upload_id, user=request.user)
+    try:
+        finalize_upload(upload)
+    except ChunkedUploadError as e:
+        return _chunked_upload_error(e)
+    return _chunked_upload_json(upload)
+
+
+# -----------------------------
+# Direct-to-bucket uploads (see direct_uploads.py)
+# -----------------------------
+@require_POST
+@login_required
+def direct_upload_create(request):
+    """Presigned POST for one document: ``field``, ``filename``, ``size``."""
+    if not direct_uploads_enabled():
+        raise Http404("Direct uploads are not enabled.")
+    try:
+        size = int(request.POST.get("size"))
+    except (TypeError, ValueError):
+        size = None
+    try:
+        upload = presign_upload(
+            request.user,
+            request.POST.get("field"),
+            request.POST.get("filename"),
+            size,
+            request.POST.get("content_type", ""),
+        )
+    except DirectUploadError as e:
+        return _chunked_upload_error(e)
+    return JsonResponse(upload, status=201)
+
+
+@require_POST
+@login_required
+def direct_upload_complete(request):
+    """Validate an object the browser uploaded; returns the form token."""
+    if not direct_uploads_enabled():
+        raise Http404("Direct uploads are not enabled.")
+    try:
+        result = complete_upload(request.user, request.POST.get("token"))
+    except DirectUploadError as e:
+        return _chunked_upload_error(e)
+    return JsonResponse(result)
 
 
 #-----------------------------
@@ -653,17 +878,15 @@ def education_list_view(request):
         user=request.user,
         application_status="approved"
     ).exists()
-    educationinfo = EducationalInfo.objects.filter(
-        user=request.user
-    ).first()
-
-    if not educationinfo:
+    if not EducationalInfo.objects.filter(user=request.user).exists():
         return redirect("educational_info")
 
+    # The list shows grades only; the document columns stay unloaded.
     base_qs = (
         EducationalInfo.objects
         .filter(user=request.user)
         .select_related("user")
+        .defer(*EDUCATIONAL_UPLOAD_FIELDS)
         .order_by("passed_year")
     )
     education_count = base_qs.count()
@@ -694,13 +917,21 @@ def edit_personal_info(request, pk):
     )
 
     if request.method == "POST":
+        try:
+            files = attach_uploads(request, ["ctz_file"])
+            if direct_uploads_enabled():
+                files = attach_direct_uploads(request, PersonalInfo, files)
+        except ChunkedUploadError as e:
+            messages.error(request, str(e))
+            files = request.FILES
         form = PersonalInfoForm(
             request.POST,
-            request.FILES,
+            files,
             instance=student
         )
-        if form.is_valid():
+        if _form_with_upload_errors(request, form):
             form.save()
+            release_uploads(files)
             
             # Create notification
             create_notification(
@@ -714,7 +945,7 @@ def edit_personal_info(request, pk):
     return render(
         request,
         "student/edit_personalinfo.html",
-        {"form": form}
+        {"form": form, "direct_uploads": direct_uploads_enabled()}
     )
 
 
@@ -724,13 +955,21 @@ def edit_personal_info(request, pk):
 def edit_educational_info(request, pk):
     edu_info = get_object_or_404(EducationalInfo, pk=pk)
     if request.method == "POST":
+        try:
+            files = attach_uploads(request, EDUCATIONAL_UPLOAD_FIELDS)
+            if direct_uploads_enabled():
+                files = attach_direct_uploads(request, EducationalInfo, files)
+        except ChunkedUploadError as e:
+            messages.error(request, str(e))
+            files = request.FILES
         form = EducationalInfoForm(
             request.POST,
-            request.FILES,
+            files,
             instance=edu_info
         )
-        if form.is_valid():
+        if _form_with_upload_errors(request, form):
             form.save()
+            release_uploads(files)
             
             # Create notification
             create_notification(
@@ -744,7 +983,7 @@ def edit_educational_info(request, pk):
     return render(
         request,
         "student/edit_educationalinfo.html",
-        {"form": form}
+        {"form": form, "direct_uploads": direct_uploads_enabled()}
     )
 
 
@@ -770,6 +1009,8 @@ def course_application_list(request):
         "edu_info": edu_info,
         "applicants": applicants,
         'payment_info':payment_info,
+        "courses": CourseDetails.objects.only("pk", "course_name"),
+        "status_choices": Application.APP_STATUS,
     }
     return render(
         request,
@@ -791,27 +1032,23 @@ def course_applicant_detail(request, pk):
         user=applicant.user
     ).first()
     
+    # File columns are deferred: the Document rows describe the files.
     edu_info = EducationalInfo.objects.filter(
         user=applicant.user
-    ) 
-    
+    ).defer(*EDUCATIONAL_UPLOAD_FIELDS)
+
+    kind_order = {kind: i for i, (kind, _) in enumerate(Document.KIND_CHOICES)}
+    documents_by_edu = {}
+    for doc in Document.objects.filter(
+        owner=applicant.user, educational_info__isnull=False
+    ):
+        documents_by_edu.setdefault(doc.educational_info_id, []).append(doc)
+
     document_list = []
-    if edu_info:
-        for edu in edu_info: 
-            docs = [
-                ("Transcript 1", edu.upload_transcript1),
-                ("Transcript 2", edu.upload_transcript2),
-                ("Character Certificate", edu.upload_character),
-                ("License", edu.upload_license),
-                ("Other Document", edu.upload_other),
-                ("Other Document 1", edu.upload_other1),
-            ]
-            document_list.append(
-                {
-                    "edu":edu,
-                    "documents": [doc for doc in docs if doc[1]] 
-                }
-            )
+    for edu in edu_info:
+        docs = sorted(documents_by_edu.get(edu.pk, ()), key=lambda d: kind_order[d.kind])
+        if docs:
+            document_list.append({"edu": edu, "documents": docs})
     
     payment_info = PaymentDetail.objects.filter(application=applicant).select_related('application__course').order_by('-payment_date').first()
 
@@ -829,6 +1066,163 @@ def course_applicant_detail(request, pk):
     )
 
 
+# --------------------------------------------
+# Applicant Documents / Dossiers ZIP: Admin Functions
+# ---------------------------------------------
+def _applicant_archive_filter(request):
+    """
+    (course, status, error response) from the ``course`` / ``status`` GET
+    params shared by the bulk ZIP downloads; at least one is required.
+    """
+    course_id = request.GET.get("course")
+    status = request.GET.get("status")
+    if not (course_id or status):
+        return None, None, HttpResponseBadRequest(
+            "Choose a course or an application status."
+        )
+    if course_id and not course_id.isdigit():
+        return None, None, HttpResponseBadRequest("Unknown course.")
+    if status and status not in dict(Application.APP_STATUS):
+        return None, None, HttpResponseBadRequest("Unknown application status.")
+    course = get_object_or_404(CourseDetails, pk=course_id) if course_id else None
+    return course, status, None
+
+
+@require_GET
+@login_required
+@user_passes_test(_is_admin)
+def applicant_documents_zip(request):
+    """
+    Stream a ZIP of every uploaded document (profile picture, citizenship,
+    educational uploads) of the applicants matching ``course`` and/or
+    ``status``, one folder per application number. See document_archive.py.
+    """
+    course, status, error = _applicant_archive_filter(request)
+    if error:
+        return error
+
+    documents = applicant_documents(
+        applications_for_archive(course_id=course and course.pk, status=status)
+    )
+    response = StreamingHttpResponse(iter_zip(documents), content_type="application/zip")
+    response["Content-Disposition"] = (
+        f'attachment; filename="{documents_archive_name(course, status)}"'
+    )
+    return response
+
+
+@require_GET
+@login_required
+@user_passes_test(_is_admin)
+def applicant_dossiers_zip(request):
+    """
+    Stream a ZIP with the dossier PDF (as download_applicant_pdf) of every
+    applicant matching ``course`` and/or ``status``. PDFs are rendered one
+    by one in this worker, so a disconnect just stops the generator;
+    ``manage.py bulk_dossiers`` renders large batches in a process pool.
+    """
+    course, status, error = _applicant_archive_filter(request)
+    if error:
+        return error
+
+    dossiers = iter_dossier_data(
+        applications_for_archive(course_id=course and course.pk, status=status)
+    )
+    response = StreamingHttpResponse(
+        iter_dossier_zip(iter_rendered_dossiers(dossiers, workers=1)),
+        content_type="application/zip",
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{dossier_archive_name(course, status)}"'
+    )
+    return response
+
+
+@require_GET
+@login_required
+@user_passes_test(_is_admin)
+def offer_letters_zip(request):
+    """
+    Stream a ZIP with an offer letter PDF for every approved application,
+    optionally of one ``course``. Each letter carries a signed verification
+    code; see offer_letters.py.
+    """
+    course_id = request.GET.get("course")
+    status = request.GET.get("status")
+    if status and status != "approved":
+        return HttpResponseBadRequest(
+            "Offer letters are only issued for approved applications."
+        )
+    if course_id and not course_id.isdigit():
+        return HttpResponseBadRequest("Unknown course.")
+    course = get_object_or_404(CourseDetails, pk=course_id) if course_id else None
+
+    letters = iter_offer_letters(
+        approved_applications(course_id=course and course.pk),
+        site_url=request.build_absolute_uri("/"),
+    )
+    response = StreamingHttpResponse(iter_dossier_zip(letters), content_type="application/zip")
+    response["Content-Disposition"] = (
+        f'attachment; filename="{offer_letters_archive_name(course)}"'
+    )
+    return response
+
+
+@require_GET
+def verify_offer_letter(request, code=None):
+    """
+    Public check of an offer letter verification code (path or ``?code=``).
+    A code whose signature does not match is answered from the code alone,
+    without a database query; a correctly signed one is confirmed against
+    the application's current status with one indexed lookup.
+    """
+    code = code or request.GET.get("code", "")
+    verified = verify_offer_code(code)
+    if verified is None:
+        response = JsonResponse({"valid": False, "reason": "invalid code"}, status=404)
+        # A forged code never becomes valid while the signing key is unchanged.
+        response["Cache-Control"] = "public, max-age=86400"
+        return response
+
+    application_no, on = verified
+    application = (
+        Application.objects.filter(application_no=application_no)
+        .values(
+            "application_status",
+            "approved_rejected_date",
+            "user__first_name",
+            "user__last_name",
+            "user__username",
+            "course__degree",
+            "course__course_name",
+        )
+        .first()
+    )
+    if (
+        application is None
+        or application["application_status"] != "approved"
+        or application["approved_rejected_date"] is None
+        or approved_on(application["approved_rejected_date"]) != on
+    ):
+        response = JsonResponse({"valid": False, "reason": "withdrawn"}, status=410)
+    else:
+        name = (
+            f"{application['user__first_name'] or ''} "
+            f"{application['user__last_name'] or ''}"
+        ).strip()
+        response = JsonResponse({
+            "valid": True,
+            "application_no": application_no,
+            "applicant": name or application["user__username"],
+            "degree": application["course__degree"],
+            "course": application["course__course_name"],
+            "approved_on": on.isoformat(),
+        })
+    # Short, so a withdrawn offer stops verifying soon after.
+    response["Cache-Control"] = "public, max-age=300"
+    return response
+
+
 # -----------------------------
 # Select Course by Student
 # -----------------------------
@@ -1194,7 +1588,14 @@ def re_submit_application(request, pk):
 @login_required
 @user_passes_test(_is_admin)
 def reports(request):
-    return render(request, "admin/reports.html")
+    return render(
+        request,
+        "admin/reports.html",
+        {
+            "columnar_datasets": list(COLUMNAR_DATASETS),
+            "snapshot": current_manifest(),
+        },
+    )
 
 
 @login_required
@@ -1244,377 +1645,219 @@ def total_rejected_report(request):
 
 
 # -----------------------------
-# Export: Total Applications (Excel)
+# Export: Applications (Excel / CSV / JSONL)
 # -----------------------------
 @login_required
 @user_passes_test(_is_admin)
-def export_total_applications(request):
+def export_applications(request, export):
     """
-    Export applications to an Excel file.
+    Export applications using the ExportSpec registered as ``export`` in
+    exports.APPLICATION_EXPORTS (total, approved, rejected, pending).
     Optional GET params:
-      - status=pending|approved|rejected|re-submit
+      - format=xlsx|csv|jsonl (default xlsx)
+      - status=pending|approved|rejected|re-submit (total only; the other
+        exports have a fixed status)
       - start=YYYY-MM-DD (filter by submitted_at >= start)
       - end=YYYY-MM-DD   (filter by submitted_at <= end, inclusive)
+      - fresh=1 (build live instead of serving the precomputed snapshot)
+    Unfiltered requests are served from the latest snapshot when there is
+    a current one (see export_snapshots.py); its build time is in the
+    Last-Modified and X-Export-Snapshot headers.
     """
-    qs = Application.objects.select_related(
-        "user",
-        "course"
-    ).order_by("-submitted_at")
-
-    status = request.GET.get("status")
-    if status:
-        qs = qs.filter(application_status=status)
-
-    start_str = request.GET.get("start")
-    end_str = request.GET.get("end")
-    if start_str:
-        start = parse_date(start_str)
-        if start:
-            qs = qs.filter(submitted_at__date__gte=start)
-    if end_str:
-        end = parse_date(end_str)
-        if end:
-            qs = qs.filter(submitted_at__date__lte=end)
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Applications"
-
-    headers = [
-        "SN",
-        "Name",
-        "Mobile",
-        "Application No.",
-        "Applied Course",
-        "Applied Degree",
-        "Application Status",
-        "Submitted Date",
-        "Approved/Rejected Date",
-    ]
-    ws.append(headers)
-
-    bold = Font(bold=True)
-    for col_idx in range(1, len(headers) + 1):
-        cell = ws.cell(row=1, column=col_idx)
-        cell.font = bold
-        cell.alignment = Alignment(
-            horizontal="center",
-            vertical="center"
+    spec = APPLICATION_EXPORTS[export]
+    fmt = request.GET.get("format") or DEFAULT_EXPORT_FORMAT
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest(
+            f"Unknown export format. Use one of: {', '.join(EXPORT_FORMATS)}"
         )
+    filtered = any(request.GET.get(f.param) for f in spec.filters)
+    if not filtered and not request.GET.get("fresh"):
+        response = snapshot_response(export, fmt)
+        if response is not None:
+            return response
+    return spec.response(request.GET, fmt)
 
-    for idx, app in enumerate(qs, start=1):
-        full_name = (
-            getattr(app.user, "full_name", "").strip() or
-            app.user.get_username()
-        )
-        submitted_str = app.submitted_at.strftime(
-            "%Y-%m-%d %H:%M"
-        )
-        approved_rejected_date_str = (
-            app.approved_rejected_date.strftime("%Y-%m-%d %H:%M")
-        )
-        ws.append(
-            [
-                idx,
-                full_name,
-                app.user.mobile or "",
-                app.application_no,
-                app.course.course_name,
-                app.course.degree,
-                app.application_status.capitalize(),
-                submitted_str,
-                approved_rejected_date_str,
-            ]
-        )
 
-    for column_cells in ws.columns:
-        max_len = 0
-        col = column_cells[0].column
-        for c in column_cells:
-            val = str(c.value) if c.value is not None else ""
-            max_len = max(max_len, len(val))
-        ws.column_dimensions[get_column_letter(col)].width = min(
-            max_len + 2,
-            50
+@login_required
+@user_passes_test(_is_admin)
+def export_columnar(request, dataset):
+    """
+    Parquet / Arrow IPC download of one dataset in columnar.COLUMNAR_DATASETS
+    (applications, courses, educational_info, payments) for analysts.
+    Optional GET params: format=parquet|arrow (default parquet); the
+    applications dataset also accepts status, start and end.
+    """
+    if dataset not in COLUMNAR_DATASETS:
+        raise Http404("Unknown dataset")
+    fmt = request.GET.get("format") or "parquet"
+    if fmt not in COLUMNAR_FORMATS:
+        return HttpResponseBadRequest(
+            f"Unknown export format. Use one of: {', '.join(COLUMNAR_FORMATS)}"
         )
-
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-
-    filename = "total_applications.xlsx"
-    if status:
-        filename = f"applications_{status}.xlsx"
-
-    content_type = (
-        "application/vnd.openxmlformats-officedocument."
-        "spreadsheetml.sheet"
-    )
-    resp = HttpResponse(buffer.getvalue(), content_type=content_type)
-    resp["Content-Disposition"] = (
-        f'attachment; filename="{filename}"'
-    )
-    return resp
+    if not pyarrow_available():
+        messages.error(request, "Parquet/Arrow exports need pyarrow installed on the server.")
+        return redirect("reports")
+    try:
+        return columnar_file_response(COLUMNAR_DATASETS[dataset], fmt, request.GET)
+    except ColumnarDataChanged as e:
+        messages.error(request, f"Export interrupted: {e}")
+        return redirect("reports")
 
 
 # -----------------------------
-# Export: Approved Applications (Excel)
+# Background Export Jobs (Admin)
 # -----------------------------
-@login_required
-@user_passes_test(_is_admin)
-def export_approved_applications(request):
-    """Export only approved applications into an Excel file."""
-    qs = (
-        Application.objects
-        .select_related("user", "course")
-        .filter(application_status="approved")
-        .order_by("-submitted_at")
-    )
+def _export_job_json(job):
+    data = {
+        "id": job.pk,
+        "status": job.status,
+        "rows_written": job.rows_written,
+        "rows_total": job.rows_total,
+        "percent": job.percent,
+        "error": job.error,
+        "download_url": None,
+        "expires_at": job.expires_at.isoformat() if job.expires_at else None,
+    }
+    if job.status == ExportJob.DONE and job.file:
+        data["download_url"] = reverse("export_job_download", args=[job.pk])
+    return data
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Approved Applications"
-
-    headers = [
-        "SN",
-        "Name",
-        "Mobile",
-        "Application No.",
-        "Applied Course",
-        "Applied Degree",
-        "Application Status",
-        "Approved On",
-    ]
-    ws.append(headers)
-
-    bold = Font(bold=True)
-    for col_idx in range(1, len(headers) + 1):
-        cell = ws.cell(row=1, column=col_idx)
-        cell.font = bold
-        cell.alignment = Alignment(
-            horizontal="center",
-            vertical="center"
-        )
 
-    for idx, app in enumerate(qs, start=1):
-        full_name = (
-            getattr(app.user, "full_name", "").strip() or
-            app.user.get_username()
-        )
-        approved_str = (
-            app.approved_rejected_date.strftime("%Y-%m-%d %H:%M")
-            if app.approved_rejected_date
-            else ""
-        )
-        ws.append(
-            [
-                idx,
-                full_name,
-                app.user.mobile or "",
-                app.application_no,
-                app.course.course_name,
-                app.course.degree,
-                app.application_status,
-                approved_str,
-            ]
-        )
+@require_http_methods(["GET", "POST"])
+@login_required
+@user_passes_test(_is_admin)
+def export_jobs(request):
+    """
+    Queue an export for the background worker (run_export_worker) and list
+    recent jobs with live progress.
+    """
+    if request.method == "POST":
+        form = ExportJobForm(request.POST)
+        if form.is_valid():
+            ExportJob.objects.create(
+                created_by=request.user,
+                export=form.cleaned_data["export"],
+                export_format=form.cleaned_data["export_format"],
+                params=form.export_params(),
+            )
+            messages.success(
+                request, "Export queued. The download link appears here when it is ready."
+            )
+            return redirect("export_jobs")
+    else:
+        form = ExportJobForm()
 
-    for column_cells in ws.columns:
-        max_len = 0
-        col = column_cells[0].column
-        for c in column_cells:
-            val = str(c.value) if c.value else ""
-            max_len = max(max_len, len(val))
-        ws.column_dimensions[get_column_letter(col)].width = min(
-            max_len + 2,
-            50
-        )
+    jobs = ExportJob.objects.select_related("created_by")[:25]
+    return render(request, "admin/export_jobs.html", {"form": form, "jobs": jobs})
 
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
 
-    content_type = (
-        "application/vnd.openxmlformats-officedocument."
-        "spreadsheetml.sheet"
-    )
-    resp = HttpResponse(buffer.getvalue(), content_type=content_type)
-    resp["Content-Disposition"] = (
-        'attachment; filename="approved_applications.xlsx"'
-    )
-    return resp
+@require_GET
+@login_required
+@user_passes_test(_is_admin)
+def export_job_status(request, pk):
+    """Polling endpoint: progress of one export job as JSON."""
+    job = get_object_or_404(ExportJob, pk=pk)
+    return JsonResponse(_export_job_json(job))
 
 
-# -----------------------------
-# Export: Rejected Applications (Excel)
-# -----------------------------
+@require_GET
 @login_required
 @user_passes_test(_is_admin)
-def export_rejected_applications(request):
-    """Export only rejected applications into an Excel file."""
-    qs = (
-        Application.objects
-        .select_related("user", "course")
-        .filter(application_status="rejected")
-        .order_by("-submitted_at")
+def export_job_download(request, pk):
+    job = get_object_or_404(ExportJob, pk=pk, status=ExportJob.DONE)
+    if not job.file or (job.expires_at and job.expires_at <= timezone.now()):
+        raise Http404("This export has expired.")
+    return FileResponse(
+        job.file.open("rb"),
+        as_attachment=True,
+        filename=os.path.basename(job.file.name),
     )
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Rejected Applications"
-
-    headers = [
-        "SN",
-        "Name",
-        "Mobile",
-        "Application No.",
-        "Applied Course",
-        "Applied Degree",
-        "Application Status",
-        "Rejection Date",
-        "Reason to Reject",
-    ]
-    ws.append(headers)
-
-    bold = Font(bold=True)
-    for col_idx in range(1, len(headers) + 1):
-        cell = ws.cell(row=1, column=col_idx)
-        cell.font = bold
-        cell.alignment = Alignment(
-            horizontal="center",
-            vertical="center"
-        )
 
-    for idx, app in enumerate(qs, start=1):
-        full_name = (
-            getattr(app.user, "full_name", "").strip() or
-            app.user.get_username()
-        )
-        rejected_str = (
-            app.approved_rejected_date.strftime("%Y-%m-%d %H:%M")
-            if app.approved_rejected_date
-            else ""
-        )
-        ws.append(
-            [
-                idx,
-                full_name,
-                app.user.mobile or "",
-                app.application_no,
-                app.course.course_name,
-                app.course.degree,
-                app.application_status,
-                rejected_str,
-                app.reason_to_reject or "",
-            ]
-        )
+# -----------------------------
+# Change Feed (accounts office / SIS sync)
+# -----------------------------
+def _change_feed_authorized(request):
+    """Admin session, or ``Authorization: Bearer <CHANGE_FEED_TOKEN>``."""
+    token = settings.CHANGE_FEED_TOKEN
+    auth = request.headers.get("Authorization", "")
+    if token and auth.startswith("Bearer "):
+        return hmac.compare_digest(auth[len("Bearer "):], token)
+    return request.user.is_authenticated and _is_admin(request.user)
 
-    for column_cells in ws.columns:
-        max_len = 0
-        col = column_cells[0].column
-        for c in column_cells:
-            val = str(c.value) if c.value else ""
-            max_len = max(max_len, len(val))
-        ws.column_dimensions[get_column_letter(col)].width = min(
-            max_len + 2,
-            50
-        )
 
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
+@require_GET
+def change_feed(request):
+    """
+    JSONL change feed of applications, payments and educational info.
+    GET params:
+      - since=<id>  last entry id already processed (default 0)
+      - models=application,paymentdetail,educationalinfo (default all)
+      - limit=<n>   page size (default 10000)
+    The next ``since`` is returned in the X-Next-Watermark header.
+    """
+    if not _change_feed_authorized(request):
+        return HttpResponseForbidden("Not allowed")
+    try:
+        since = int(request.GET.get("since") or 0)
+        limit = int(request.GET.get("limit") or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        return HttpResponseBadRequest("since and limit must be integers")
+    if since < 0:
+        return HttpResponseBadRequest("since must not be negative")
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        return HttpResponseBadRequest(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    models = [m for m in request.GET.get("models", "").split(",") if m]
+    return change_feed_response(since, models, limit)
 
-    content_type = (
-        "application/vnd.openxmlformats-officedocument."
-        "spreadsheetml.sheet"
-    )
-    resp = HttpResponse(buffer.getvalue(), content_type=content_type)
-    resp["Content-Disposition"] = (
-        'attachment; filename="rejected_applications.xlsx"'
-    )
-    return resp
 
+# -----------------------------
+# Settlement Reconciliation (Admin)
+# -----------------------------
+RECONCILE_PREVIEW_ROWS = 200
 
-#-----------------------------
-#Export Pending Applications 
-#-----------------------------
 
+@require_http_methods(["GET", "POST"])
 @login_required
 @user_passes_test(_is_admin)
-def export_pending_applications(request):
-    """Export only pending applications into an Excel file."""
-    qs = (
-        Application.objects
-        .select_related("user", "course")
-        .filter(application_status="pending")
-        .order_by("-submitted_at")
-    )
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Pending Applications"
-
-    headers = [
-        "SN",
-        "Name",
-        "Mobile",
-        "Application No.",
-        "Applied Course",
-        "Applied Degree",
-        "Application Status",
-        "Submitted Date",
-    ]
-    ws.append(headers)
-
-    bold = Font(bold=True)
-    for col_idx in range(1, len(headers) + 1):
-        cell = ws.cell(row=1, column=col_idx)
-        cell.font = bold
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-
-    for idx, app in enumerate(qs, start=1):
-        full_name = (
-            getattr(app.user, "full_name", "").strip() or
-            app.user.get_username()
-        )
-        submitted_str = (
-            app.submitted_at.strftime("%Y-%m-%d %H:%M")
-            if app.submitted_at
-            else ""
-        )
-        ws.append(
-            [
-                idx,
-                full_name,
-                app.user.mobile or "",
-                app.application_no,
-                app.course.course_name,
-                app.course.degree,
-                app.application_status,
-                submitted_str,
-            ]
+def reconcile_settlement(request):
+    """
+    Upload an eSewa/Khalti settlement CSV and match it against payments.
+    The file is parsed as a stream; see reconciliation.py.
+    """
+    report = None
+    if request.method == "POST":
+        form = SettlementUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data["statement"]
+            stream = TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+            try:
+                report = reconcile_statement(
+                    iter_statement_rows(
+                        stream,
+                        paisa=form.cleaned_data["gateway"] == "khalti",
+                    ),
+                    sample_size=RECONCILE_PREVIEW_ROWS,
+                )
+            except (ValueError, UnicodeDecodeError) as e:
+                messages.error(request, f"Could not read statement: {e}")
+            finally:
+                stream.detach()
+    else:
+        form = SettlementUploadForm()
+
+    context = {"form": form, "report": report}
+    if report is not None:
+        context.update(
+            {
+                "summary": report.summary(),
+                "missing_rows": report.samples["missing"],
+                "mismatched_rows": report.samples["mismatched"],
+                "status_mismatch_rows": report.samples["status_mismatch"],
+                "preview_limit": RECONCILE_PREVIEW_ROWS,
+            }
         )
-
-    for column_cells in ws.columns:
-        max_len = 0
-        col = column_cells[0].column
-        for c in column_cells:
-            val = str(c.value) if c.value else ""
-            max_len = max(max_len, len(val))
-        ws.column_dimensions[get_column_letter(col)].width = min(max_len + 2, 50)
-
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-
-    content_type = (
-        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response = HttpResponse(buffer.getvalue(), content_type=content_type)
-    response["Content-Disposition"] = (
-        'attachment; filename="pending_applications.xlsx"'
-    )
-    return response
+    return render(request, "admin/reconcile_settlement.html", context)
 
 
 
@@ -1646,270 +1889,94 @@ class CustomPasswordChangeView(PasswordChangeView):
 #Admin: Download PDF of Applicant Detail 
 #---------------------------------------  
 
-# views.py
-from django.http import HttpResponse
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from io import BytesIO
-from django.conf import settings
-import os
-
 def download_applicant_pdf(request, applicant_id):
-    # Import your actual models
-    from .models import Application, PersonalInfo, EducationalInfo, PaymentDetail
-    
-    # Get applicant data
-    applicant = Application.objects.get(pk=applicant_id)
-    per_info = PersonalInfo.objects.filter(user=applicant.user).first()
-    edu_info = EducationalInfo.objects.filter(user=applicant.user)
-    payment_info = PaymentDetail.objects.filter(application=applicant).first()
-    
-    # Create BytesIO buffer
-    buffer = BytesIO()
-    
-    # Create PDF
-    pdf = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        rightMargin=40,
-        leftMargin=40,
-        topMargin=40,
-        bottomMargin=40
+    dossiers = load_dossiers([applicant_id])
+    if not dossiers:
+        raise Http404("Application not found")
+    pdf = render_dossier(dossiers[0], image_cache_dir=settings.DOSSIER_IMAGE_CACHE_DIR)
+    response = HttpResponse(pdf, content_type='application/pdf')
+    response['Content-Disposition'] = (
+        f'attachment; filename="applicant_{dossiers[0]["application"]["application_no"]}.pdf"'
     )
-    
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'Title',
-        parent=styles['Heading1'],
-        fontSize=20,
-        textColor=colors.HexColor('#1a1a1a'),
-        spaceAfter=20,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
-    
-    section_style = ParagraphStyle(
-        'Section',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.white,
-        spaceAfter=12,
-        spaceBefore=12,
-        fontName='Helvetica-Bold',
-        backColor=colors.HexColor('#0d6efd')
+    return response
+
+
+#---------------------------------------
+# Payment receipt (student or admin)
+#---------------------------------------
+RECEIPT_CACHE_CONTROL = "private, max-age=31536000, immutable"
+RECEIPT_RETRY_AFTER = 5
+
+
+@require_GET
+@login_required
+def payment_receipt(request, pk):
+    """
+    The receipt PDF of a completed payment, for the paying student or an
+    admin. Receipts are written once (see receipts.py), so they are served
+    with a year-long immutable Cache-Control and a strong ETag. While the
+    receipt is still queued the answer is 202 with Retry-After.
+    """
+    payment = get_object_or_404(
+        PaymentDetail.objects.values(
+            "user_id", "application__user_id", "status", "receipt", "transaction_uuid"
+        ),
+        pk=pk,
     )
-    
-    # Title
-    title = Paragraph("Course Applicant Detail", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 20))
-    
-    # 1. Application Information Section
-    elements.append(Paragraph("Application Information", section_style))
-    app_data = [
-        ['Applicant:', applicant.user.get_full_name() or applicant.user.username],
-        ['Email:', applicant.user.email or '—'],
-        ['Mobile No.:', applicant.user.mobile or '—'],
-        ['User Created at:', str(applicant.user.user_created_at) if applicant.user.user_created_at else '—'],
-        ['Submitted:', applicant.submitted_at.strftime('%Y-%m-%d %H:%M:%S')],
-    ]
-    
-    app_table = Table(app_data, colWidths=[2*inch, 4.5*inch])
-    app_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f8f9fa')),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 8),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    elements.append(app_table)
-    elements.append(Spacer(1, 15))
-    
-    # 2. Personal Information Section with Profile Picture
-    if per_info:
-        elements.append(Paragraph("Personal Information", section_style))
-        
-        # Profile picture handling
-        profile_pic = None
-        if per_info.profile_pic:
-            try:
-                pic_path = per_info.profile_pic.path
-                if os.path.exists(pic_path):
-                    profile_pic = Image(pic_path, width=1.5*inch, height=1.5*inch)
-            except:
-                profile_pic = None
-        
-        personal_data = [
-            ['Address:', per_info.address or '—'],
-            ['Gender:', per_info.get_gender_display() if per_info.gender else '—'],
-            ['Date of Birth:', per_info.dob.strftime('%Y-%m-%d') if per_info.dob else '—'],
-            ['Father\'s Name:', per_info.father or '—'],
-            ['Mother\'s Name:', per_info.mother or '—'],
-            ['Grandfather\'s Name:', per_info.grandfather or '—'],
-            ['Citizenship No.:', per_info.citizenship_no or '—'],
-        ]
-        
-        # If profile pic exists, add it to the right side
-        if profile_pic:
-            per_table = Table(personal_data, colWidths=[2*inch, 3*inch])
-            per_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f8f9fa')),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 8),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-                ('TOPPADDING', (0, 0), (-1, -1), 6),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ]))
-            
-            combined_table = Table([[per_table, profile_pic]], colWidths=[5*inch, 1.8*inch])
-            combined_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('ALIGN', (1, 0), (1, 0), 'CENTER'),
-            ]))
-            elements.append(combined_table)
-        else:
-            per_table = Table(personal_data, colWidths=[2*inch, 4.5*inch])
-            per_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f8f9fa')),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 8),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-                ('TOPPADDING', (0, 0), (-1, -1), 6),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ]))
-            elements.append(per_table)
-        
-        elements.append(Spacer(1, 15))
-    
-    # 3. Educational Background Section
-    elements.append(Paragraph("Educational Background", section_style))
-    
-    if edu_info.exists():
-        edu_data = [['Level', 'Faculty', 'Course', 'University', 'College', 'Year', 'Grade/CGPA']]
-        
-        for edu in edu_info:
-            edu_data.append([
-                edu.level or '—',
-                edu.faculty or '—',
-                edu.course_name or '—',
-                edu.university_name or '—',
-                edu.college_name or '—',
-                str(edu.passed_year) if edu.passed_year else '—',
-                str(edu.grade_percent) if edu.grade_percent else '—',
-            ])
-        
-        edu_table = Table(edu_data, colWidths=[0.9*inch, 1*inch, 1*inch, 1.3*inch, 1.3*inch, 0.7*inch, 0.8*inch])
-        edu_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#d1ecf1')),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 4),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        elements.append(edu_table)
-    else:
-        elements.append(Paragraph("No educational information available.", styles['Normal']))
-    
-    elements.append(Spacer(1, 15))
-    
-    # 4. Application Status Section
-    elements.append(Paragraph("Application Status", section_style))
-    
-    status_data = [
-        ['Degree:', applicant.course.degree],
-        ['Course:', applicant.course.course_name],
-        ['Application No.:', applicant.application_no],
-        ['Submitted At:', str(applicant.submitted_at)],
-        ['Status:', applicant.application_status],
-    ]
-    
-    if applicant.application_status == 'approved' and applicant.approved_rejected_date:
-        status_data.append(['Approved Date:', str(applicant.approved_rejected_date)])
-    elif applicant.application_status == 'rejected':
-        if applicant.reason_to_reject:
-            status_data.append(['Rejection Reason:', applicant.reason_to_reject])
-        if applicant.approved_rejected_date:
-            status_data.append(['Rejection Date:', str(applicant.approved_rejected_date)])
-    
-    status_table = Table(status_data, colWidths=[2*inch, 4.5*inch])
-    status_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#fff3cd')),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 8),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    elements.append(status_table)
-    elements.append(Spacer(1, 15))
-    
-    # 5. Payment Details Section
-    elements.append(Paragraph("Payment Details", section_style))
-    
-    if payment_info:
-        payment_data = [
-            ['Transaction ID:', payment_info.transaction_uuid],
-            ['Status:', payment_info.status],
-            ['Payment Method:', payment_info.payment_method],
-            ['Amount:', str(payment_info.amount_paid)],
-            ['Payment Date:', str(payment_info.payment_date)],
-            ['Paid Course:', payment_info.application.course.course_name or '—'],
-        ]
-        
-        payment_table = Table(payment_data, colWidths=[2*inch, 4.5*inch])
-        payment_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#d4edda')),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 8),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        elements.append(payment_table)
+    owners = (payment["user_id"], payment["application__user_id"])
+    if not (_is_admin(request.user) or request.user.pk in owners):
+        raise Http404("Receipt not found")
+    if payment["status"] != "COMPLETE":
+        raise Http404("This payment has not been completed.")
+
+    name = payment["receipt"]
+    if not name:
+        # Rendered by the build_payment_receipts worker, never in a request.
+        job = request_receipt(pk)
+        if job is None or job.status == ReceiptJob.FAILED:
+            raise Http404("Receipt not found")
+        response = HttpResponse(
+            "Your receipt is being prepared. Please try again in a moment.",
+            status=202,
+            content_type="text/plain; charset=utf-8",
+        )
+        response["Retry-After"] = str(RECEIPT_RETRY_AFTER)
+        response["Cache-Control"] = "no-store"
+        return response
+
+    etag = receipt_etag(name)
+    if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+    if etag in if_none_match or "*" in if_none_match:
+        response = HttpResponse(status=304)
     else:
-        elements.append(Paragraph("No payment has been recorded for this application.", styles['Normal']))
-    
-    # Build PDF
-    pdf.build(elements)
-    
-    # Get PDF from buffer
-    buffer.seek(0)
-    response = HttpResponse(buffer.read(), content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="applicant_{applicant.application_no}.pdf"'
-    
+        response = FileResponse(
+            default_storage.open(name, "rb"),
+            content_type="application/pdf",
+            as_attachment=True,
+            filename=f"receipt_{payment['transaction_uuid']}.pdf",
+        )
+    response["ETag"] = etag
+    response["Cache-Control"] = RECEIPT_CACHE_CONTROL
     return response
 
+
+# -----------------------------
+# Uploaded files (see protected_media.py)
+# -----------------------------
+@require_safe
+def protected_media(request, name):
+    """
+    A file under MEDIA_URL: public course pictures for anyone, the rest for
+    its owner or an admin. Unknown and forbidden names are both a 404.
+    """
+    name = clean_media_name(name)
+    if name is None:
+        raise Http404("File not found")
+    user = request.user
+    if not (
+        is_public(name)
+        or (user.is_authenticated and _is_admin(user))
+        or owns_media(user, name)
+    ):
+        raise Http404("File not found")
+    return media_response(request, name)
@@ -106,8 +106,151 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",  # Required for allauth
+    "admissionapp.middleware.PaymentCallbackRecorderMiddleware",
 ]
 
+# Record eSewa/Khalti callbacks to this JSONL file for load-test replay
+# (python manage.py bench_payment_callbacks --replay <file>). Off when None.
+PAYMENT_CALLBACK_RECORD_PATH = config("PAYMENT_CALLBACK_RECORD_PATH", default=None)
+
+# Background export files (python manage.py run_export_worker) are deleted
+# this many hours after they are built.
+EXPORT_JOB_TTL_HOURS = config("EXPORT_JOB_TTL_HOURS", default=24, cast=int)
+
+# A running export job whose worker has not reported progress for this
+# long is taken to be dead: run_export_worker queues it again, or marks
+# it failed once it has been claimed EXPORT_JOB_MAX_ATTEMPTS times.
+EXPORT_JOB_LEASE_SECONDS = config("EXPORT_JOB_LEASE_SECONDS", default=600, cast=int)
+EXPORT_JOB_MAX_ATTEMPTS = config("EXPORT_JOB_MAX_ATTEMPTS", default=3, cast=int)
+
+# Receipt jobs (python manage.py build_payment_receipts) claimed longer
+# ago than this are taken to be orphaned by a dead worker and queued again,
+# until they have been claimed RECEIPT_JOB_MAX_ATTEMPTS times.
+RECEIPT_JOB_LEASE_SECONDS = config("RECEIPT_JOB_LEASE_SECONDS", default=120, cast=int)
+RECEIPT_JOB_MAX_ATTEMPTS = config("RECEIPT_JOB_MAX_ATTEMPTS", default=3, cast=int)
+
+# Same for rendition jobs (python manage.py build_renditions --queued).
+RENDITION_JOB_LEASE_SECONDS = config("RENDITION_JOB_LEASE_SECONDS", default=300, cast=int)
+RENDITION_JOB_MAX_ATTEMPTS = config("RENDITION_JOB_MAX_ATTEMPTS", default=3, cast=int)
+
+# Precomputed exports (python manage.py build_export_snapshots). Kept outside
+# MEDIA_ROOT because they list every applicant. --if-changed rebuilds once
+# more than EXPORT_SNAPSHOT_CHANGE_THRESHOLD applications changed.
+EXPORT_SNAPSHOT_DIR = config(
+    "EXPORT_SNAPSHOT_DIR", default=os.path.join(BASE_DIR, "export_snapshots")
+)
+EXPORT_SNAPSHOT_CHANGE_THRESHOLD = config(
+    "EXPORT_SNAPSHOT_CHANGE_THRESHOLD", default=50, cast=int
+)
+# Snapshots older than this are not served (the export is built live) and
+# --if-changed rebuilds them whatever the drift.
+EXPORT_SNAPSHOT_MAX_AGE_MINUTES = config(
+    "EXPORT_SNAPSHOT_MAX_AGE_MINUTES", default=26 * 60, cast=int
+)
+
+# Downscaled profile pictures embedded in applicant dossier PDFs, keyed by
+# the source file's path, size and mtime. Safe to delete at any time.
+DOSSIER_IMAGE_CACHE_DIR = config(
+    "DOSSIER_IMAGE_CACHE_DIR", default=os.path.join(BASE_DIR, "dossier_image_cache")
+)
+
+# Offer letter verification codes are HMAC-signed with this key (falls back
+# to SECRET_KEY). Rotating it invalidates every letter already issued.
+OFFER_LETTER_SIGNING_KEY = config("OFFER_LETTER_SIGNING_KEY", default=None)
+
+# Public base URL printed in documents generated outside a request
+# (python manage.py generate_offer_letters).
+SITE_URL = config("SITE_URL", default="http://127.0.0.1:8000")
+
+# Resumable uploads (uploads/ endpoints): chunks are kept here until the
+# upload is finalized and attached to a form. Not under MEDIA_ROOT, so
+# half-uploaded files are never served. Uploads untouched for
+# CHUNKED_UPLOAD_TTL_HOURS are removed by purge_chunked_uploads.
+CHUNKED_UPLOAD_DIR = config(
+    "CHUNKED_UPLOAD_DIR", default=os.path.join(BASE_DIR, "upload_chunks")
+)
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = config(
+    "CHUNKED_UPLOAD_MAX_CHUNK_SIZE", default=8 * 1024 * 1024, cast=int
+)
+CHUNKED_UPLOAD_TTL_HOURS = config("CHUNKED_UPLOAD_TTL_HOURS", default=24, cast=int)
+
+# Content-addressed documents (admissionapp/document_storage.py) that no
+# record references any more are deleted by gc_documents once they have
+# been unreferenced this long.
+DOCUMENT_GC_GRACE_HOURS = config("DOCUMENT_GC_GRACE_HOURS", default=24, cast=int)
+
+# Uploaded pictures (profile, course background) are rejected from their
+# header alone when larger than this, before anything decodes them, and
+# pictures above IMAGE_NORMALIZE_SIDE are downscaled before being stored.
+IMAGE_MAX_SIDE = config("IMAGE_MAX_SIDE", default=12000, cast=int)
+IMAGE_MAX_PIXELS = config("IMAGE_MAX_PIXELS", default=40_000_000, cast=int)
+IMAGE_NORMALIZE_SIDE = config("IMAGE_NORMALIZE_SIDE", default=2560, cast=int)
+
+# Optional: let browsers upload citizenship/educational documents straight
+# into an S3-compatible bucket (AWS, MinIO, ...) with presigned POSTs
+# (admissionapp/direct_uploads.py). Other documents stay in MEDIA_ROOT. Needs boto3 and
+# django-storages. Add a lifecycle rule expiring "incoming/" after a day.
+DIRECT_UPLOADS = config("DIRECT_UPLOADS", default=False, cast=bool)
+DIRECT_UPLOAD_EXPIRES = config("DIRECT_UPLOAD_EXPIRES", default=900, cast=int)
+DIRECT_UPLOAD_TOKEN_MAX_AGE = config(
+    "DIRECT_UPLOAD_TOKEN_MAX_AGE", default=24 * 3600, cast=int
+)
+# Lifetime of the presigned GET /media/ redirects owners to for a
+# document kept in the bucket.
+DIRECT_DOWNLOAD_EXPIRES = config("DIRECT_DOWNLOAD_EXPIRES", default=60, cast=int)
+if DIRECT_UPLOADS:
+    STORAGES = {
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {
+            "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+        },
+        "documents": {
+            "BACKEND": "storages.backends.s3.S3Storage",
+            "OPTIONS": {
+                "bucket_name": config("DOCUMENTS_BUCKET"),
+                "endpoint_url": config("DOCUMENTS_ENDPOINT_URL", default=None),
+                "region_name": config("DOCUMENTS_REGION", default=None),
+                "access_key": config("DOCUMENTS_ACCESS_KEY", default=None),
+                "secret_key": config("DOCUMENTS_SECRET_KEY", default=None),
+                "file_overwrite": False,
+                "querystring_auth": True,
+            },
+        },
+    }
+
+# Uploaded files no record references any more (replaced profile
+# pictures, documents, course backgrounds) are removed by gc_media once
+# they are this old. --quarantine moves them here instead of deleting them.
+MEDIA_GC_GRACE_HOURS = config("MEDIA_GC_GRACE_HOURS", default=24, cast=int)
+MEDIA_QUARANTINE_DIR = config(
+    "MEDIA_QUARANTINE_DIR", default=os.path.join(BASE_DIR, "media_quarantine")
+)
+
+# Uploaded files are served by admissionapp's protected_media view (owner
+# or admin only). In production let the web server do the transfer:
+# "nginx" sends X-Accel-Redirect to MEDIA_ACCEL_PREFIX (an internal
+# location aliased to MEDIA_ROOT), "sendfile" sends X-Sendfile (Apache
+# mod_xsendfile, lighttpd). Empty: Django streams the file itself.
+MEDIA_ACCEL = config("MEDIA_ACCEL", default="")
+MEDIA_ACCEL_PREFIX = config("MEDIA_ACCEL_PREFIX", default="/protected-media/")
+
+# Document uploads are inspected while they stream in: wrong file types are
+# skipped after the first chunk and oversized files abort the request at
+# MAX_UPLOAD_SIZE (see admissionapp/upload_handlers.py).
+FILE_UPLOAD_HANDLERS = [
+    "admissionapp.upload_handlers.InspectingMemoryFileUploadHandler",
+    "admissionapp.upload_handlers.InspectingTemporaryFileUploadHandler",
+]
+
+# Shared secret for machine consumers of /api/changes/ (sent as
+# "Authorization: Bearer <token>"). Admin sessions work without it.
+CHANGE_FEED_TOKEN = config("CHANGE_FEED_TOKEN", default=None)
+
+# Change-feed entries are numbered when they are inserted, not when their
+# transaction commits. The feed only hands out entries at least this old,
+# so a transaction that commits within it cannot land behind a watermark.
+CHANGE_FEED_SETTLE_SECONDS = config("CHANGE_FEED_SETTLE_SECONDS", default=5, cast=float)
+
 ROOT_URLCONF = "online_enrollment_system.urls"
 
 TEMPLATES = [
@@ -2,7 +2,8 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
+
+from admissionapp.views import protected_media
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -13,5 +14,7 @@ urlpatterns = [
     # path("pay/", include("payment.urls")),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Uploads are checked per request (owner or admin), in DEBUG or not.
+urlpatterns += [
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:name>", protected_media, name="protected_media"),
+]
@@ -0,0 +1,150 @@
+// Resumable chunked uploads (see admissionapp/chunked_uploads.py).
+//
+// A form with data-chunked-upload="<create url>" sends every chosen file
+// larger than data-chunked-threshold bytes in chunks before it is
+// submitted (only the inputs named in data-chunked-fields, if given), then
+// posts "<field>_upload=<id>" instead of the file. A failed
+// chunk is retried from the offset the server reports, and an interrupted
+// upload of the same file resumes after a page reload.
+(function () {
+    const CHUNK_SIZE = 4 * 1024 * 1024;
+    const MAX_RETRIES = 5;
+
+    class UploadRejected extends Error {}
+
+    function fileKey(file) {
+        return "chunked-upload:" + [file.name, file.size, file.lastModified].join(":");
+    }
+
+    async function rejected(response) {
+        let message = "Upload failed (" + response.status + ").";
+        try {
+            message = (await response.json()).error || message;
+        } catch (e) {}
+        return new UploadRejected(message);
+    }
+
+    async function serverOffset(url) {
+        const response = await fetch(url, {method: "HEAD", credentials: "same-origin"});
+        return response.ok ? parseInt(response.headers.get("Upload-Offset"), 10) : null;
+    }
+
+    async function startUpload(form, file, csrf) {
+        const saved = localStorage.getItem(fileKey(file));
+        if (saved) {
+            const offset = await serverOffset(saved).catch(() => null);
+            if (offset !== null) {
+                return {url: saved, offset: offset};
+            }
+            localStorage.removeItem(fileKey(file));
+        }
+        const body = new FormData();
+        body.append("filename", file.name);
+        body.append("content_type", file.type);
+        const response = await fetch(form.dataset.chunkedUpload, {
+            method: "POST",
+            body: body,
+            headers: {"Upload-Length": file.size, "X-CSRFToken": csrf},
+            credentials: "same-origin",
+        });
+        if (!response.ok) {
+            throw await rejected(response);
+        }
+        const url = response.headers.get("Location");
+        localStorage.setItem(fileKey(file), url);
+        return {url: url, offset: 0};
+    }
+
+    async function uploadFile(form, input, csrf, progress) {
+        const file = input.files[0];
+        let {url, offset} = await startUpload(form, file, csrf);
+        let failures = 0;
+        while (offset < file.size) {
+            progress(offset / file.size);
+            try {
+                const response = await fetch(url, {
+                    method: "PATCH",
+                    body: file.slice(offset, offset + CHUNK_SIZE),
+                    headers: {
+                        "Upload-Offset": offset,
+                        "Content-Type": "application/offset+octet-stream",
+                        "X-CSRFToken": csrf,
+                    },
+                    credentials: "same-origin",
+                });
+                if (response.status === 409 && response.headers.get("Upload-Offset")) {
+                    offset = parseInt(response.headers.get("Upload-Offset"), 10);
+                    continue;
+                }
+                if (!response.ok) {
+                    throw await rejected(response);
+                }
+                offset = parseInt(response.headers.get("Upload-Offset"), 10);
+                failures = 0;
+            } catch (err) {
+                if (err instanceof UploadRejected || ++failures > MAX_RETRIES) {
+                    throw err;
+                }
+                await new Promise((resolve) => setTimeout(resolve, 1000 * failures));
+                offset = (await serverOffset(url).catch(() => null)) ?? offset;
+            }
+        }
+        const response = await fetch(url + "finalize/", {
+            method: "POST",
+            headers: {"X-CSRFToken": csrf},
+            credentials: "same-origin",
+        });
+        if (!response.ok) {
+            localStorage.removeItem(fileKey(file));
+            throw await rejected(response);
+        }
+        localStorage.removeItem(fileKey(file));
+        progress(1);
+        return (await response.json()).id;
+    }
+
+    document.querySelectorAll("form[data-chunked-upload]").forEach((form) => {
+        const threshold = parseInt(form.dataset.chunkedThreshold || "0", 10);
+        const fields = (form.dataset.chunkedFields || "").split(",").filter(Boolean);
+        const csrf = form.querySelector("input[name=csrfmiddlewaretoken]").value;
+
+        form.addEventListener("submit", async (event) => {
+            const inputs = Array.from(form.querySelectorAll("input[type=file]")).filter(
+                (input) => input.name && (!fields.length || fields.includes(input.name)) &&
+                    input.files.length && input.files[0].size > threshold
+            );
+            if (!inputs.length) {
+                return;
+            }
+            event.preventDefault();
+            const button = form.querySelector("[type=submit]");
+            button.disabled = true;
+            try {
+                for (const input of inputs) {
+                    let status = input.parentNode.querySelector(".chunked-progress");
+                    if (!status) {
+                        status = document.createElement("div");
+                        status.className = "form-text chunked-progress";
+                        input.after(status);
+                    }
+                    const id = await uploadFile(form, input, csrf, (fraction) => {
+                        status.textContent = "Uploading… " + Math.floor(fraction * 100) + "%";
+                    });
+                    status.textContent = "Uploaded";
+                    const hidden = document.createElement("input");
+                    hidden.type = "hidden";
+                    hidden.name = input.name + "_upload";
+                    hidden.value = id;
+                    form.appendChild(hidden);
+                    // The file is already on the server; don't send it again.
+                    input.removeAttribute("name");
+                    input.required = false;
+                }
+                form.submit();
+            } catch (err) {
+                alert(err.message);
+                button.disabled = false;
+            }
+        });
+    });
+})();
@@ -0,0 +1,91 @@
+// Direct-to-bucket uploads (see admissionapp/direct_uploads.py).
+//
+// A form with data-direct-upload="<presign url>" and
+// data-direct-complete="<complete url>" uploads every chosen file of the
+// inputs named in data-direct-fields straight to the bucket before it is
+// submitted, then posts "<field>_direct=<token>" instead of the file.
+(function () {
+    async function failure(response) {
+        let message = "Upload failed (" + response.status + ").";
+        try {
+            message = (await response.json()).error || message;
+        } catch (e) {}
+        return new Error(message);
+    }
+
+    async function post(url, data, csrf) {
+        const body = new FormData();
+        Object.entries(data).forEach(([key, value]) => body.append(key, value));
+        const response = await fetch(url, {
+            method: "POST",
+            body: body,
+            headers: {"X-CSRFToken": csrf},
+            credentials: "same-origin",
+        });
+        if (!response.ok) {
+            throw await failure(response);
+        }
+        return response.json();
+    }
+
+    async function uploadFile(form, input, csrf) {
+        const file = input.files[0];
+        const presigned = await post(form.dataset.directUpload, {
+            field: input.name,
+            filename: file.name,
+            size: file.size,
+            content_type: file.type,
+        }, csrf);
+
+        const body = new FormData();
+        Object.entries(presigned.fields).forEach(([key, value]) => body.append(key, value));
+        body.append("file", file);  // must be the last field
+        const response = await fetch(presigned.url, {method: "POST", body: body});
+        if (!response.ok) {
+            throw new Error("The storage service refused the file (" + response.status + ").");
+        }
+        return (await post(form.dataset.directComplete, {token: presigned.token}, csrf)).token;
+    }
+
+    document.querySelectorAll("form[data-direct-upload]").forEach((form) => {
+        const fields = (form.dataset.directFields || "").split(",").filter(Boolean);
+        const csrf = form.querySelector("input[name=csrfmiddlewaretoken]").value;
+
+        form.addEventListener("submit", async (event) => {
+            const inputs = Array.from(form.querySelectorAll("input[type=file]")).filter(
+                (input) => fields.includes(input.name) && input.files.length
+            );
+            if (!inputs.length) {
+                return;
+            }
+            event.preventDefault();
+            const button = form.querySelector("[type=submit]");
+            button.disabled = true;
+            try {
+                for (const input of inputs) {
+                    let status = input.parentNode.querySelector(".direct-progress");
+                    if (!status) {
+                        status = document.createElement("div");
+                        status.className = "form-text direct-progress";
+                        input.after(status);
+                    }
+                    status.textContent = "Uploading…";
+                    const token = await uploadFile(form, input, csrf);
+                    status.textContent = "Uploaded";
+                    const hidden = document.createElement("input");
+                    hidden.type = "hidden";
+                    hidden.name = input.name + "_direct";
+                    hidden.value = token;
+                    form.appendChild(hidden);
+                    // The file is already in the bucket; don't send it again.
+                    input.removeAttribute("name");
+                    input.required = false;
+                }
+                form.submit();
+            } catch (err) {
+                alert(err.message);
+                button.disabled = false;
+            }
+        });
+    });
+})();